@@ -7,9 +7,12 @@ from pathlib import Path
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 
+from backend.api.response_cache import RunResponseCache
 from backend.api.routes import api_router
 from backend.event_bus import EventBus
 from backend.orchestrator.engine import RunOrchestrator
+from backend.orchestrator.recovery import RunRecovery
+from backend.serialization import FastJSONResponse, loads
 from backend.storage import Database
 
 
@@ -27,18 +30,132 @@ async def lifespan(app: FastAPI):
 
     db = Database(db_path)
     db.initialize()
-    bus = EventBus()
+    bus = EventBus(event_store=db)
+    await bus.start()
     orchestrator = RunOrchestrator(db=db, event_bus=bus, workspace_root=workspace_root)
+    response_cache = RunResponseCache()
+    bus.add_listener(response_cache.on_event)
+    recovery = RunRecovery(orchestrator)
 
     app.state.db = db
     app.state.event_bus = bus
     app.state.orchestrator = orchestrator
+    app.state.response_cache = response_cache
+    app.state.recovery = recovery
+
+    # Runs interrupted by a previous process resume from their last completed step.
+    await recovery.start()
 
     yield
 
+    recovery.close()
+    orchestrator.shutdown()
+    bus.close()
+    db.close()
+
+
+def _batch_window(windowMs: int | None) -> float | None:
+    return max(1, min(windowMs, 5000)) / 1000 if windowMs is not None else None
+
+
+def _snapshots(app: FastAPI, run_ids: list[str]) -> list[dict]:
+    """Snapshot messages for many runs, loading each kind of row with one batched query."""
+    db, orchestrator, bus = app.state.db, app.state.orchestrator, app.state.event_bus
+    runs = db.get_runs(run_ids)
+    run_ids = [run_id for run_id in run_ids if run_id in runs]
+    steps = db.list_steps_for_runs(run_ids)
+    artifacts = db.list_artifacts_for_runs(run_ids)
+    stats = orchestrator.get_stats_views(run_ids)
+    return [
+        {
+            "event": "snapshot",
+            "runId": run_id,
+            "seq": bus.current_seq(run_id),
+            "payload": {
+                "run": runs[run_id],
+                "steps": steps[run_id],
+                "artifacts": artifacts[run_id],
+                "stats": stats[run_id],
+                "queue": orchestrator.get_queue_view(run_id),
+            },
+        }
+        for run_id in run_ids
+    ]
+
+
+def _control_message_error(message: dict) -> str | None:
+    """Why a `/ws/stream` control message is malformed, or None if it is usable."""
+    for key in ("runIds", "projectIds"):
+        ids = message.get(key)
+        if ids is not None and not (isinstance(ids, list) and all(isinstance(item, str) for item in ids)):
+            return f"{key} must be a list of strings"
+    since = message.get("since")
+    if since is not None and not (
+        isinstance(since, dict)
+        and all(isinstance(seq, int) and not isinstance(seq, bool) for seq in since.values())
+    ):
+        return "since must map run ids to integer sequence numbers"
+    return None
+
+
+async def _handle_stream_control(
+    app: FastAPI,
+    websocket: WebSocket,
+    message: dict,
+    batched: bool,
+    window: float | None,
+) -> None:
+    bus = app.state.event_bus
+    error = _control_message_error(message)
+    if error is not None:
+        bus.connect(websocket, batched, window).send({"event": "error", "message": error})
+        return
+    action = message.get("action")
+    run_ids = list(message.get("runIds") or [])
+    project_ids = list(message.get("projectIds") or [])
+
+    if action == "unsubscribe":
+        for run_id in run_ids:
+            await bus.unsubscribe(run_id, websocket)
+        for project_id in project_ids:
+            await bus.unsubscribe_project(project_id, websocket)
+        bus.connect(websocket, batched, window).send(
+            {"event": "unsubscribed", "runIds": run_ids, "projectIds": project_ids}
+        )
+        return
+    if action != "subscribe":
+        bus.connect(websocket, batched, window).send({"event": "error", "message": f"Unknown action: {action}"})
+        return
+
+    for run_id in run_ids:
+        await bus.subscribe(run_id, websocket, batched=batched, window=window)
+    for project_id in project_ids:
+        await bus.subscribe_project(project_id, websocket, batched=batched, window=window)
+        run_ids.extend(run["id"] for run in app.state.db.list_project_runs(project_id))
+    subscriber = bus.connect(websocket, batched, window)
+
+    # Runs with a replayable `since` get their missed events; the rest share one snapshot pass.
+    since = message.get("since") or {}
+    needs_snapshot: list[str] = []
+    for run_id in dict.fromkeys(run_ids):
+        missed = bus.replay(run_id, since[run_id]) if run_id in since else None
+        if missed is None:
+            needs_snapshot.append(run_id)
+        else:
+            for text in missed:
+                subscriber.push(text)
+    subscriber.send({"event": "subscribed", "runIds": run_ids, "projectIds": project_ids})
+    for snapshot in _snapshots(app, needs_snapshot):
+        subscriber.send(snapshot)
+
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="OpenFARS API", version="0.1.0", lifespan=lifespan)
+    app = FastAPI(
+        title="OpenFARS API",
+        version="0.1.0",
+        lifespan=lifespan,
+        default_response_class=FastJSONResponse,
+    )
     app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
@@ -53,22 +170,44 @@ def create_app() -> FastAPI:
         return {"status": "ok"}
 
     @app.websocket("/ws/runs/{run_id}")
-    async def run_stream(websocket: WebSocket, run_id: str):
+    async def run_stream(
+        websocket: WebSocket,
+        run_id: str,
+        since: int | None = None,
+        mode: str = "events",
+        windowMs: int | None = None,
+    ):
         await websocket.accept()
-        await app.state.event_bus.subscribe(run_id, websocket)
-
-        # Push initial snapshot so frontend can render immediately.
-        run = app.state.db.get_run(run_id)
+        if mode not in ("events", "batched"):
+            await websocket.close(code=1008)
+            return
+        subscriber = await app.state.event_bus.subscribe(
+            run_id,
+            websocket,
+            batched=mode == "batched",
+            window=_batch_window(windowMs),
+        )
+
+        # Resuming clients get only the events they missed; everyone else (or a
+        # client whose gap is no longer retained) gets a full snapshot.
+        missed = app.state.event_bus.replay(run_id, since) if since is not None else None
+        if missed is not None:
+            for text in missed:
+                subscriber.push(text)
+
+        run = app.state.db.get_run(run_id) if missed is None else None
         if run:
-            await websocket.send_json(
+            subscriber.send(
                 {
                     "event": "snapshot",
+                    "seq": app.state.event_bus.current_seq(run_id),
                     "payload": {
                         "run": run,
                         "steps": app.state.db.list_steps(run_id),
-                        "jobs": app.state.db.list_jobs(run_id),
+                        "jobs": app.state.db.list_jobs(run_id, include_raw=False),
                         "artifacts": app.state.db.list_artifacts(run_id),
                         "stats": app.state.orchestrator.get_stats_view(run_id),
+                        "queue": app.state.orchestrator.get_queue_view(run_id),
                     },
                 }
             )
@@ -78,6 +217,33 @@ def create_app() -> FastAPI:
                 # Keep connection alive and allow optional ping/pong.
                 await websocket.receive_text()
         except WebSocketDisconnect:
+            pass
+        finally:
             await app.state.event_bus.unsubscribe(run_id, websocket)
 
+    @app.websocket("/ws/stream")
+    async def multiplexed_stream(websocket: WebSocket, mode: str = "events", windowMs: int | None = None):
+        await websocket.accept()
+        if mode not in ("events", "batched"):
+            await websocket.close(code=1008)
+            return
+        bus = app.state.event_bus
+        batched, window = mode == "batched", _batch_window(windowMs)
+        try:
+            while True:
+                try:
+                    message = loads(await websocket.receive_text())
+                except ValueError:
+                    message = None
+                if not isinstance(message, dict):
+                    error = {"event": "error", "message": "Expected a JSON object"}
+                    bus.connect(websocket, batched, window).send(error)
+                    continue
+                await _handle_stream_control(app, websocket, message, batched, window)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            # Any other error must not leak the subscriber and its queues either.
+            bus.disconnect(websocket)
+
     return app
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import itertools
+import os
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from backend.serialization import dumps_bytes
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    etag: str
+    body: bytes
+
+
+class RunResponseCache:
+    """Serialized run-scoped read responses, validated by per-run version counters.
+
+    Every event published for a run bumps its version; since the orchestrator
+    publishes an event after each mutation, a cached body is reused only while
+    nothing about the run has changed. ETags embed a per-process nonce so a restart
+    (which resets the counters) never revalidates a stale client copy.
+
+    Versions come from one cache-wide counter and are kept for at most `max_entries`
+    runs. A run whose version was evicted reads as the highest evicted version, which
+    is never lower than any ETag issued for it, so evicting only costs a rebuild.
+    """
+
+    def __init__(self, max_entries: int | None = None) -> None:
+        self.max_entries = max(1, max_entries or int(os.getenv("OPENFARS_RESPONSE_CACHE_SIZE", "4096")))
+        self.hits = 0
+        self.misses = 0
+        self._nonce = uuid.uuid4().hex[:8]
+        self._clock = itertools.count(1)
+        self._evicted_version = 0
+        self._versions: OrderedDict[str, int] = OrderedDict()
+        self._entries: OrderedDict[tuple[str, str], tuple[int, CachedResponse]] = OrderedDict()
+
+    def on_event(self, run_id: str, event: str, payload: dict[str, Any]) -> None:
+        """Event bus listener: any event means the run's state may have changed."""
+        self.bump(run_id)
+
+    def bump(self, run_id: str) -> None:
+        self._versions[run_id] = next(self._clock)
+        self._versions.move_to_end(run_id)
+        if len(self._versions) > self.max_entries:
+            _, version = self._versions.popitem(last=False)
+            self._evicted_version = max(self._evicted_version, version)
+
+    def get_or_build(
+        self,
+        run_id: str,
+        resource: str,
+        build: Callable[[], dict[str, Any] | None],
+    ) -> CachedResponse | None:
+        """The cached response for `resource`, rebuilding it if the run changed.
+
+        `build` returns the JSON payload, or None if the run does not exist.
+        """
+        version = self._versions.get(run_id)
+        if version is None:
+            version = self._evicted_version
+        else:
+            self._versions.move_to_end(run_id)
+        key = (run_id, resource)
+        cached = self._entries.get(key)
+        if cached is not None and cached[0] == version:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return cached[1]
+
+        self.misses += 1
+        payload = build()
+        if payload is None:
+            return None
+        response = CachedResponse(
+            etag=f'"{self._nonce}-{resource}-{version}"',
+            body=dumps_bytes(payload),
+        )
+        self._entries[key] = (version, response)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return response
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
@@ -1,8 +1,71 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException, Request
+import zlib
+from typing import Any, Callable, Iterator
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from backend.orchestrator.engine import BULK_CONTROL_ELIGIBLE
+from backend.serialization import FastJSONResponse, dumps_bytes
+from backend.storage import decode_job_cursor, encode_job_cursor
+
+from .response_cache import etag_matches
+from .schemas import (
+    CreateProjectRequest,
+    CreateRunRequest,
+    CreateRunsBatchRequest,
+    RunControlBatchRequest,
+    RunControlRequest,
+)
+
+MAX_BATCH_RUNS = 1000
+
+
+def _cached_run_response(
+    request: Request,
+    run_id: str,
+    resource: str,
+    build: Callable[[], dict[str, Any]],
+) -> Response:
+    """Serve a run-scoped read from the response cache, answering 304 when the client is current."""
+    db = request.app.state.db
+
+    def build_if_exists() -> dict[str, Any] | None:
+        return build() if db.get_run(run_id) else None
+
+    cached = request.app.state.response_cache.get_or_build(run_id, resource, build_if_exists)
+    if cached is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+def _ndjson_response(lines: Iterator[list[bytes]], filename: str, compress: bool) -> StreamingResponse:
+    """Stream batches of newline-terminated JSON lines, gzip-compressed on the fly if asked."""
+
+    def body() -> Iterator[bytes]:
+        compressor = zlib.compressobj(wbits=31) if compress else None
+        for batch in lines:
+            chunk = b"".join(batch)
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+        if compressor is not None:
+            yield compressor.flush()
+
+    if compress:
+        filename += ".gz"
+    return StreamingResponse(
+        body(),
+        media_type="application/gzip" if compress else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
-from .schemas import CreateProjectRequest, CreateRunRequest, RunControlRequest
 
 api_router = APIRouter(prefix="/api", tags=["openfars"])
 
@@ -19,15 +82,20 @@ async def list_projects(request: Request):
     return {"projects": projects}
 
 
+@api_router.get("/projects/summary")
+async def list_project_summaries(request: Request):
+    return {"projects": request.app.state.orchestrator.get_project_summaries()}
+
+
 @api_router.post("/projects/{project_id}/runs")
 async def create_run(project_id: str, payload: CreateRunRequest, request: Request):
     project = request.app.state.db.get_project(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    run = request.app.state.orchestrator.create_run(project_id)
+    run = request.app.state.orchestrator.create_run(project_id, step_cache=payload.stepCache)
     if payload.autoStart:
-        request.app.state.orchestrator.start_run(run["id"])
+        request.app.state.orchestrator.start_run(run["id"], priority=payload.priority)
     return {"run": request.app.state.db.get_run(run["id"])}
 
 
@@ -43,44 +111,178 @@ async def get_latest_run(project_id: str, request: Request):
     return {"run": run}
 
 
+@api_router.get("/projects/{project_id}/stats")
+async def get_project_stats(project_id: str, request: Request):
+    project = request.app.state.db.get_project(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return {"stats": request.app.state.orchestrator.get_project_stats_view(project_id)}
+
+
+@api_router.post("/runs/batch")
+async def create_runs_batch(payload: CreateRunsBatchRequest, request: Request):
+    if sum(spec.count for spec in payload.runs) > MAX_BATCH_RUNS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_RUNS} runs per batch")
+    db = request.app.state.db
+    missing = sorted({spec.projectId for spec in payload.runs if db.get_project(spec.projectId) is None})
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Project not found: {', '.join(missing)}")
+
+    specs = [spec for spec in payload.runs for _ in range(spec.count)]
+    orchestrator = request.app.state.orchestrator
+    runs = orchestrator.create_runs([spec.projectId for spec in specs], [spec.stepCache for spec in specs])
+    starts = [(run["id"], spec.priority) for run, spec in zip(runs, specs) if spec.autoStart]
+    orchestrator.start_runs([run_id for run_id, _ in starts], [priority for _, priority in starts])
+    started = db.get_runs([run["id"] for run in runs])
+    return {"runs": [started[run["id"]] for run in runs]}
+
+
+@api_router.post("/runs/control/batch")
+async def control_runs_batch(payload: RunControlBatchRequest, request: Request):
+    if payload.runIds is None and payload.projectId is None and payload.status is None:
+        raise HTTPException(status_code=400, detail="Provide runIds, projectId or status to select runs")
+    eligible = BULK_CONTROL_ELIGIBLE[payload.action]
+    statuses = [status for status in payload.status if status in eligible] if payload.status else list(eligible)
+    run_ids = request.app.state.db.find_run_ids(payload.runIds, payload.projectId, statuses) if statuses else []
+    await request.app.state.orchestrator.apply_control_many(run_ids, payload.action)
+    return {"action": payload.action, "runIds": run_ids}
+
+
+@api_router.get("/step-cache/stats")
+async def get_step_cache_stats(request: Request):
+    return {"stepCache": request.app.state.orchestrator.step_cache.stats()}
+
+
+@api_router.get("/objects/stats")
+async def get_object_stats(request: Request):
+    return {"objects": request.app.state.orchestrator.artifacts.object_stats()}
+
+
+@api_router.post("/objects/gc")
+async def collect_objects(request: Request, graceSeconds: int | None = Query(default=None, ge=0)):
+    # GC walks the store on disk, so keep it off the event loop.
+    result = await run_in_threadpool(request.app.state.orchestrator.artifacts.collect_garbage, graceSeconds)
+    return {"gc": result}
+
+
 @api_router.get("/runs/{run_id}")
 async def get_run(run_id: str, request: Request):
-    run = request.app.state.db.get_run(run_id)
-    if not run:
-        raise HTTPException(status_code=404, detail="Run not found")
-    return {"run": run}
+    return _cached_run_response(request, run_id, "run", lambda: {"run": request.app.state.db.get_run(run_id)})
 
 
 @api_router.get("/runs/{run_id}/steps")
 async def get_steps(run_id: str, request: Request):
-    run = request.app.state.db.get_run(run_id)
-    if not run:
-        raise HTTPException(status_code=404, detail="Run not found")
-    return {"steps": request.app.state.db.list_steps(run_id)}
+    return _cached_run_response(request, run_id, "steps", lambda: {"steps": request.app.state.db.list_steps(run_id)})
 
 
 @api_router.get("/runs/{run_id}/jobs")
-async def get_jobs(run_id: str, request: Request):
+async def get_jobs(
+    run_id: str,
+    request: Request,
+    limit: int = Query(default=200, ge=1, le=1000),
+    before: str | None = None,
+    after: str | None = None,
+    stepId: str | None = None,
+    level: str | None = None,
+    status: str | None = None,
+    source: str | None = None,
+    includeRaw: bool = True,
+):
     run = request.app.state.db.get_run(run_id)
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
-    return {"jobs": request.app.state.db.list_jobs(run_id)}
+
+    try:
+        before_key = decode_job_cursor(before) if before else None
+        after_key = decode_job_cursor(after) if after else None
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    jobs = request.app.state.db.list_jobs(
+        run_id,
+        limit=limit + 1,
+        before=before_key,
+        after=after_key,
+        step_id=stepId,
+        level=level,
+        status=status,
+        source=source,
+        include_raw=includeRaw,
+    )
+    has_more = len(jobs) > limit
+    if has_more:
+        # The extra row only signals another page in the direction of travel.
+        jobs = jobs[1:] if after_key and not before_key else jobs[:limit]
+    # Job pages are plain dicts; serialize them directly instead of via jsonable_encoder.
+    return FastJSONResponse(
+        {
+            "jobs": jobs,
+            "pageInfo": {
+                "hasMore": has_more,
+                "before": encode_job_cursor(jobs[-1]) if jobs else before,
+                "after": encode_job_cursor(jobs[0]) if jobs else after,
+            },
+        }
+    )
+
+
+@api_router.get("/runs/{run_id}/jobs/export")
+async def export_jobs(run_id: str, request: Request, includeRaw: bool = True, gzip: bool = False):
+    db = request.app.state.db
+    if not db.get_run(run_id):
+        raise HTTPException(status_code=404, detail="Run not found")
+    lines = ([dumps_bytes(job) + b"\n" for job in jobs] for jobs in db.iter_jobs(run_id, include_raw=includeRaw))
+    return _ndjson_response(lines, f"{run_id}-jobs.ndjson", gzip)
+
+
+@api_router.get("/runs/{run_id}/events/export")
+async def export_events(run_id: str, request: Request, gzip: bool = False):
+    db = request.app.state.db
+    if not db.get_run(run_id):
+        raise HTTPException(status_code=404, detail="Run not found")
+    # Events still held only in the bus's replay ring are persisted first.
+    request.app.state.event_bus.flush()
+    lines = ([message.encode("utf-8") + b"\n" for _, message in events] for events in db.iter_run_events(run_id))
+    return _ndjson_response(lines, f"{run_id}-events.ndjson", gzip)
+
+
+@api_router.get("/jobs/{job_id}/raw")
+async def get_job_raw(job_id: str, request: Request):
+    raw = request.app.state.db.get_job_raw(job_id)
+    if raw is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    # Blobs are content-addressed, so a job's full payload never changes.
+    return PlainTextResponse(raw, headers={"Cache-Control": "private, max-age=86400, immutable"})
 
 
 @api_router.get("/runs/{run_id}/artifacts")
 async def get_artifacts(run_id: str, request: Request):
+    return _cached_run_response(
+        request, run_id, "artifacts", lambda: {"artifacts": request.app.state.db.list_artifacts(run_id)}
+    )
+
+
+@api_router.get("/runs/{run_id}/stats")
+async def get_stats(run_id: str, request: Request):
+    return _cached_run_response(
+        request, run_id, "stats", lambda: {"stats": request.app.state.orchestrator.get_stats_view(run_id)}
+    )
+
+
+@api_router.get("/runs/{run_id}/stats/steps")
+async def get_step_stats(run_id: str, request: Request):
     run = request.app.state.db.get_run(run_id)
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
-    return {"artifacts": request.app.state.db.list_artifacts(run_id)}
+    return {"steps": request.app.state.orchestrator.get_step_stats_view(run_id)}
 
 
-@api_router.get("/runs/{run_id}/stats")
-async def get_stats(run_id: str, request: Request):
+@api_router.get("/runs/{run_id}/queue")
+async def get_queue(run_id: str, request: Request):
     run = request.app.state.db.get_run(run_id)
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
-    return {"stats": request.app.state.orchestrator.get_stats_view(run_id)}
+    return {"queue": request.app.state.orchestrator.get_queue_view(run_id)}
 
 
 @api_router.post("/runs/{run_id}/control")
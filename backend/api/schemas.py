@@ -11,12 +11,33 @@ class CreateProjectRequest(BaseModel):
 
 class CreateRunRequest(BaseModel):
     autoStart: bool = True
+    priority: int = Field(default=0, ge=-100, le=100)
+    stepCache: bool = True
 
 
 class RunControlRequest(BaseModel):
     action: Literal["pause", "resume", "cancel", "retry"]
 
 
+class BatchRunSpec(BaseModel):
+    projectId: str
+    count: int = Field(default=1, ge=1, le=1000)
+    autoStart: bool = True
+    priority: int = Field(default=0, ge=-100, le=100)
+    stepCache: bool = True
+
+
+class CreateRunsBatchRequest(BaseModel):
+    runs: list[BatchRunSpec] = Field(min_length=1, max_length=1000)
+
+
+class RunControlBatchRequest(BaseModel):
+    action: Literal["pause", "resume", "cancel"]
+    runIds: list[str] | None = Field(default=None, max_length=10000)
+    projectId: str | None = None
+    status: list[str] | None = None
+
+
 class ProjectModel(BaseModel):
     id: str
     name: str
@@ -34,6 +55,7 @@ class RunModel(BaseModel):
     updatedAt: str
     startedAt: str | None = None
     endedAt: str | None = None
+    stepCache: bool = True
 
 
 class StepModel(BaseModel):
@@ -59,7 +81,8 @@ class JobModel(BaseModel):
     workedFor: str
     source: str
     level: str
-    raw: str
+    raw: str | None = None
+    rawRef: str | None = None
     createdAt: str
 
 
@@ -82,3 +105,13 @@ class StatsModel(BaseModel):
     elapsedTime: str
     tokenCostUsd: float
     gpuHours: float
+
+
+class QueueModel(BaseModel):
+    runId: str
+    state: Literal["queued", "running", "paused", "idle"]
+    position: int | None = None
+    queued: int
+    running: int
+    maxRunning: int
+    maxRunningPerProject: int
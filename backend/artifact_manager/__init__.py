@@ -0,0 +1 @@
+"""Artifact manager package."""
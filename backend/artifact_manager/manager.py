@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Iterable
+
+from backend.artifact_manager.object_store import ObjectStore
+from backend.storage import Database
+
+HASH_BUFFER_BYTES = 1024 * 1024
+# A fingerprint is trusted only if the file was last modified this long before it was
+# hashed: a rewrite within the filesystem's timestamp granularity can keep size and
+# mtime unchanged, so such "racy" entries are rehashed once more (as git does).
+RACY_WINDOW_NS = 2_000_000_000
+
+Fingerprint = tuple[str, int, int, int, str, int]
+ObjectRef = tuple[str, str, int]
+
+
+def file_sha256(path: Path, buffer_size: int = HASH_BUFFER_BYTES) -> str:
+    digest = hashlib.sha256()
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    with path.open("rb", buffering=0) as fh:
+        while read := fh.readinto(buffer):
+            digest.update(view[:read])
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class FileDigest:
+    path: Path
+    size: int
+    sha256: str
+
+
+class ArtifactManager:
+    """Hashes, registers and deduplicates step artifacts.
+
+    Files are hashed concurrently on a dedicated pool with large read buffers (hashlib
+    releases the GIL while digesting them). A file whose path, size, mtime and inode
+    match its recorded fingerprint reuses the stored sha256 instead of being read again.
+
+    With an `object_root`, ingested files become hardlinks of read-only objects in an
+    `ObjectStore`; `object_refs` rows record which paths share each object and keep
+    its refcount, and `collect_garbage` removes objects nothing needs any more.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        artifact_root: Path,
+        object_root: Path | None = None,
+        max_workers: int | None = None,
+    ) -> None:
+        self.db = db
+        self.artifact_root = artifact_root
+        self.objects = ObjectStore(object_root, hasher=self._sha256) if object_root is not None else None
+        self.gc_grace_seconds = int(os.getenv("OPENFARS_OBJECT_GC_GRACE_S", "3600"))
+        self.max_workers = max(1, max_workers or int(os.getenv("OPENFARS_HASH_WORKERS", "4")))
+        self.hashed = 0
+        self.reused = 0
+        self._counter_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="openfars-hash")
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def record_path(self, path: Path) -> str:
+        """The path an artifact is recorded under: relative to the artifact root."""
+        try:
+            return str(path.relative_to(self.artifact_root))
+        except ValueError:
+            return path.name
+
+    def digest(self, path: Path) -> FileDigest:
+        return self.digests([path])[0]
+
+    def digests(self, paths: Iterable[Path]) -> list[FileDigest]:
+        digests, fingerprints = self._digest(list(paths))
+        self.db.put_fingerprints(fingerprints)
+        return digests
+
+    def ingest(self, paths: Iterable[Path]) -> list[FileDigest]:
+        """Digest `paths` and share their content through the object store."""
+        digests, fingerprints = self._digest(list(paths))
+        fingerprints, refs = self._store(digests, fingerprints)
+        self.db.put_fingerprints(fingerprints, refs)
+        return digests
+
+    def register(self, run_id: str, step_id: str | None, paths: Iterable[Path]) -> list[dict[str, Any]]:
+        """Ingest `paths` and record them as artifacts of the step, in one transaction."""
+        paths = list(paths)
+        if not paths:
+            return []
+        digests, fingerprints = self._digest(paths)
+        fingerprints, refs = self._store(digests, fingerprints)
+        return self.db.add_artifacts(
+            run_id,
+            step_id,
+            [(self.record_path(item.path), item.size, item.sha256) for item in digests],
+            fingerprints,
+            refs,
+        )
+
+    def materialize(self, sha256: str, size: int, target: Path) -> bool:
+        """Place the stored content `sha256` at `target`; False if it is not in the store."""
+        if self.objects is None:
+            return False
+        source = self.objects.object_path(sha256)
+        if not source.is_file() or source.stat().st_size != size:
+            return False
+        # Read-only does not stop root or a chmod; fingerprints keep this check cheap.
+        if self.digest(source).sha256 != sha256:
+            self.objects.quarantine(sha256)
+            return False
+        if not self.objects.materialize(sha256, target):
+            return False
+        if self.objects.is_linked(target, sha256):
+            self.db.put_object_refs([(str(target.resolve()), sha256, size)])
+        return True
+
+    def release(self, directory: Path) -> None:
+        """Turn files under `directory` shared with objects into private copies.
+
+        Objects are read-only and shared, so a step that is about to run again in its
+        workspace gets writable files it can overwrite without touching other runs.
+        """
+        if self.objects is None:
+            return
+        refs = self.db.list_object_refs(str(directory.resolve()) + os.sep)
+        for path, sha256 in refs:
+            if self.objects.is_linked(Path(path), sha256):
+                self.objects.detach(Path(path))
+        self.db.remove_object_refs([path for path, _ in refs])
+
+    def collect_garbage(self, grace_seconds: int | None = None) -> dict[str, int]:
+        """Drop refs to files that are gone or changed, then delete unneeded objects.
+
+        Objects younger than the grace period are kept, so content being ingested
+        concurrently is never removed underneath it.
+        """
+        result = {"refsDropped": 0, "objectsDeleted": 0, "bytesFreed": 0}
+        if self.objects is None:
+            return result
+        grace = self.gc_grace_seconds if grace_seconds is None else grace_seconds
+
+        stale = [path for path, sha256 in self.db.list_object_refs() if not self.objects.is_linked(Path(path), sha256)]
+        self.db.remove_object_refs(stale)
+        result["refsDropped"] = len(stale)
+
+        # Object files without a row are left behind when a process stops between
+        # linking a file and recording it; linking updates ctime, so age them by it.
+        cutoff_ts = time.time() - grace
+        on_disk = list(self.objects.iter_objects())
+        known = self.db.known_objects([sha256 for sha256, _ in on_disk])
+        unrecorded = [sha256 for sha256, path in on_disk if sha256 not in known and path.stat().st_ctime < cutoff_ts]
+
+        cutoff = (datetime.now(timezone.utc) - timedelta(seconds=grace)).isoformat()
+        candidates = [sha256 for sha256, _ in self.db.list_collectable_objects(cutoff)] + unrecorded
+        # The link count, checked under the store lock, is the final word: an object a
+        # file still shares (a concurrent ingest, an untracked copy) is kept.
+        deleted: list[str] = []
+        for sha256 in candidates:
+            freed = self.objects.delete_unshared(sha256)
+            if freed is not None:
+                deleted.append(sha256)
+                result["bytesFreed"] += freed
+        self.db.delete_objects(deleted)
+        result["objectsDeleted"] = len(deleted)
+        return result
+
+    def object_stats(self) -> dict[str, Any]:
+        summary = self.db.object_store_summary()
+        return {
+            "enabled": self.objects is not None,
+            **summary,
+            "savedBytes": summary["logicalBytes"] - summary["storedBytes"],
+        }
+
+    def _sha256(self, path: Path) -> str:
+        return self.digest(path).sha256
+
+    def _digest(self, paths: list[Path]) -> tuple[list[FileDigest], list[Fingerprint]]:
+        """Digests of `paths`, plus fingerprint rows for the files that had to be hashed."""
+        stats = [path.stat() for path in paths]
+        keys = [str(path.resolve()) for path in paths]
+        known = self.db.get_fingerprints(list(dict.fromkeys(keys)))
+        hashes: list[str | None] = [None] * len(paths)
+        pending: list[int] = []
+        for index, (key, stat) in enumerate(zip(keys, stats)):
+            fingerprint = known.get(key)
+            if (
+                fingerprint is not None
+                and fingerprint["size"] == stat.st_size
+                and fingerprint["mtimeNs"] == stat.st_mtime_ns
+                and fingerprint["inode"] == stat.st_ino
+                and stat.st_mtime_ns + RACY_WINDOW_NS < fingerprint["recordedNs"]
+            ):
+                hashes[index] = fingerprint["sha256"]
+            else:
+                pending.append(index)
+
+        recorded_ns = time.time_ns()
+        targets = [paths[index] for index in pending]
+        computed = self._pool.map(file_sha256, targets) if len(targets) > 1 else map(file_sha256, targets)
+        fingerprints: list[Fingerprint] = []
+        for index, sha256 in zip(pending, computed):
+            hashes[index] = sha256
+            stat = stats[index]
+            fingerprints.append((keys[index], stat.st_size, stat.st_mtime_ns, stat.st_ino, sha256, recorded_ns))
+
+        with self._counter_lock:
+            self.hashed += len(pending)
+            self.reused += len(paths) - len(pending)
+        return [FileDigest(path, stat.st_size, sha256) for path, stat, sha256 in zip(paths, stats, hashes)], fingerprints
+
+    def _store(
+        self,
+        digests: list[FileDigest],
+        fingerprints: list[Fingerprint],
+    ) -> tuple[list[Fingerprint], list[ObjectRef]]:
+        """Ingest digested files into the object store; return updated fingerprints and refs."""
+        if self.objects is None:
+            return fingerprints, []
+        hashed = {row[0]: row for row in fingerprints}
+        rows: list[Fingerprint] = []
+        refs: list[ObjectRef] = []
+        for item in digests:
+            key = str(item.path.resolve())
+            linked = self.objects.ingest(item.path, item.sha256)
+            if linked:
+                refs.append((key, item.sha256, item.size))
+            if key in hashed:
+                # Linking to an existing object swaps the file's inode for the object's.
+                stat = item.path.stat() if linked else None
+                rows.append(
+                    (key, stat.st_size, stat.st_mtime_ns, stat.st_ino, item.sha256, hashed[key][5])
+                    if stat is not None
+                    else hashed[key]
+                )
+        return rows, refs
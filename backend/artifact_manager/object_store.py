@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import os
+import shutil
+import stat
+import threading
+import uuid
+from pathlib import Path
+from typing import Callable, Iterator
+
+READ_ONLY = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+
+
+class ObjectStore:
+    """Content-addressed files under `root/<sha256[:2]>/<sha256[2:]>`.
+
+    Objects are read-only and shared with workspaces through hardlinks, so identical
+    outputs of many runs occupy disk once. Where a hardlink is impossible (another
+    filesystem) files are copied instead. This class only touches the filesystem;
+    `ArtifactManager` keeps the database references in step.
+
+    `lock` serializes linking against `delete_unshared`, so garbage collection never
+    unlinks an object a concurrent ingest is sharing. An existing object is checked
+    with `hasher` before a file is linked to it; one whose content no longer matches
+    its name is moved to `quarantine/` and replaced.
+    """
+
+    def __init__(self, root: Path, hasher: Callable[[Path], str]) -> None:
+        self.root = root
+        self.hasher = hasher
+        self.lock = threading.Lock()
+
+    def object_path(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256[2:]
+
+    def ingest(self, path: Path, sha256: str) -> bool:
+        """Make `path` share the object for `sha256`, creating the object from it if needed.
+
+        Returns whether `path` is now a hardlink of the object. The caller guarantees
+        that `sha256` is the digest of the file's current content.
+        """
+        target = self.object_path(sha256)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with self.lock:
+            if target.exists() and not os.path.samefile(path, target) and not self._intact(target, sha256):
+                self._quarantine(target)
+            try:
+                os.link(path, target)
+            except FileExistsError:
+                pass
+            except OSError:
+                # No hardlinks across filesystems: keep a copy so the content stays available.
+                if not target.exists():
+                    self._copy(path, target, read_only=True)
+                return False
+            else:
+                os.chmod(target, READ_ONLY)
+                return True
+
+            if os.path.samefile(path, target):
+                return True
+            try:
+                self._link(target, path)
+            except OSError:
+                return False
+            return True
+
+    def materialize(self, sha256: str, target: Path) -> bool:
+        """Place the object for `sha256` at `target`; False if the object is missing."""
+        source = self.object_path(sha256)
+        if not source.is_file():
+            return False
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with self.lock:
+            if not source.is_file():
+                return False
+            if target.exists() and os.path.samefile(source, target):
+                return True
+            try:
+                self._link(source, target)
+            except OSError:
+                self._copy(source, target, read_only=False)
+            return True
+
+    def detach(self, path: Path) -> None:
+        """Replace a hardlinked `path` with a private, writable copy of its content."""
+        if path.is_file():
+            self._copy(path, path, read_only=False)
+
+    def is_linked(self, path: Path, sha256: str) -> bool:
+        try:
+            return os.path.samefile(path, self.object_path(sha256))
+        except OSError:
+            return False
+
+    def quarantine(self, sha256: str) -> None:
+        """Move aside an object whose content no longer matches its name."""
+        with self.lock:
+            if self.object_path(sha256).exists():
+                self._quarantine(self.object_path(sha256))
+
+    def delete_unshared(self, sha256: str) -> int | None:
+        """Remove an object no other file links to; None if it is shared and was kept."""
+        path = self.object_path(sha256)
+        with self.lock:
+            try:
+                info = path.stat()
+            except FileNotFoundError:
+                return 0
+            if info.st_nlink > 1:
+                return None
+            path.unlink()
+        return info.st_size
+
+    def iter_objects(self) -> Iterator[tuple[str, Path]]:
+        if not self.root.is_dir():
+            return
+        for prefix in self.root.iterdir():
+            if len(prefix.name) != 2 or not prefix.is_dir():
+                continue
+            for path in prefix.iterdir():
+                if not path.name.startswith("."):
+                    yield prefix.name + path.name, path
+
+    def _intact(self, target: Path, sha256: str) -> bool:
+        try:
+            return self.hasher(target) == sha256
+        except OSError:
+            return False
+
+    def _quarantine(self, target: Path) -> None:
+        # Kept for inspection rather than deleted: files linked to it share the damage.
+        quarantine = self.root / "quarantine"
+        quarantine.mkdir(parents=True, exist_ok=True)
+        os.replace(target, quarantine / f"{target.parent.name}{target.name}.{uuid.uuid4().hex[:8]}")
+
+    @staticmethod
+    def _link(source: Path, target: Path) -> None:
+        # Link beside the target, then rename over it, so `target` is never missing.
+        temporary = target.with_name(f".{target.name}.{uuid.uuid4().hex[:8]}.tmp")
+        os.link(source, temporary)
+        try:
+            os.replace(temporary, target)
+        except OSError:
+            temporary.unlink(missing_ok=True)
+            raise
+
+    @staticmethod
+    def _copy(source: Path, target: Path, read_only: bool) -> None:
+        temporary = target.with_name(f".{target.name}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            shutil.copyfile(source, temporary)
+            if read_only:
+                os.chmod(temporary, READ_ONLY)
+            os.replace(temporary, target)
+        finally:
+            temporary.unlink(missing_ok=True)
@@ -0,0 +1,97 @@
+"""Hot query latency as the jobs table grows.
+
+    python -m backend.benchmarks.job_queries --jobs 10000000 --runs 1000
+
+Jobs are inserted in batches; at each checkpoint the median latency of the indexed
+access paths is measured. The script fails if the latency at the largest size is
+more than `--max-ratio` times the latency at the first checkpoint.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from backend.storage import Database
+
+
+def median_ms(fn: Callable[[], Any], samples: int) -> float:
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def checkpoints(total: int, first: int) -> list[int]:
+    points = []
+    size = first
+    while size < total:
+        points.append(size)
+        size *= 10
+    points.append(total)
+    return points
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=10_000_000)
+    parser.add_argument("--runs", type=int, default=1000)
+    parser.add_argument("--projects", type=int, default=50)
+    parser.add_argument("--samples", type=int, default=50)
+    parser.add_argument("--max-ratio", type=float, default=3.0)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / "bench.db", write_buffer_size=50_000)
+        db.initialize()
+        projects = [db.create_project(f"bench {index}")["id"] for index in range(args.projects)]
+        run_ids = [
+            db.create_run(rng.choice(projects), [{"key": "bench", "number": 1, "title": "Bench"}])["id"]
+            for _ in range(args.runs)
+        ]
+
+        queries: dict[str, Callable[[], Any]] = {
+            "list_jobs": lambda: db.list_jobs(rng.choice(run_ids)),
+            "list_project_runs": lambda: db.list_project_runs(rng.choice(projects)),
+            "list_artifacts": lambda: db.list_artifacts(rng.choice(run_ids)),
+            "list_steps": lambda: db.list_steps(rng.choice(run_ids)),
+            "list_projects": db.list_projects,
+        }
+        results: dict[str, list[float]] = {name: [] for name in queries}
+
+        inserted = 0
+        print(f"{'jobs':>12}  " + "  ".join(f"{name:>18}" for name in queries))
+        # Start measuring once every run holds a full `list_jobs` page, so the
+        # comparison isolates table growth from result-set growth.
+        for target in checkpoints(args.jobs, first=max(10_000, args.runs * 200)):
+            while inserted < target:
+                run_id = run_ids[inserted % len(run_ids)]
+                db.add_job(run_id, None, "Bench", f"line {inserted}", "running", "<1s", "bench", "info", "")
+                inserted += 1
+            db.flush()
+            row = []
+            for name, query in queries.items():
+                latency = median_ms(query, args.samples)
+                results[name].append(latency)
+                row.append(f"{latency:>15.3f} ms")
+            print(f"{inserted:>12}  " + "  ".join(row))
+        db.close()
+
+    failed = [name for name, series in results.items() if series[-1] > series[0] * args.max_ratio]
+    if failed:
+        print(f"latency grew more than {args.max_ratio}x for: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+    print("latency flat across table sizes")
+
+
+if __name__ == "__main__":
+    main()
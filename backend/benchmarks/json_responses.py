@@ -0,0 +1,69 @@
+"""Cost of turning a `list_jobs` page into an HTTP response body.
+
+    python -m backend.benchmarks.json_responses --jobs 10000 --repeat 20
+
+Compares FastAPI's default path for a returned dict (`jsonable_encoder` followed by
+`JSONResponse`) with returning a `FastJSONResponse` directly, which is what the
+jobs route does. The fast path uses orjson when installed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from backend.serialization import FAST_JSON, FastJSONResponse
+from backend.storage import Database
+
+
+def populate(db: Database, jobs: int) -> str:
+    project = db.create_project("bench")
+    run = db.create_run(project["id"], [{"key": "bench", "number": 1, "title": "Bench"}])
+    for index in range(jobs):
+        db.add_job(run["id"], None, "Bench", f"line {index} " + "x" * 120, "running", "<1s", "bench", "info", "")
+    db.flush()
+    return run["id"]
+
+
+def best_of(repeat: int, fn: Callable[[], Any]) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / "bench.db")
+        db.initialize()
+        run_id = populate(db, args.jobs)
+
+        query_ms = best_of(args.repeat, lambda: db.list_jobs(run_id, limit=args.jobs, include_raw=False))
+        payload = {"jobs": db.list_jobs(run_id, limit=args.jobs, include_raw=False)}
+        default_ms = best_of(args.repeat, lambda: JSONResponse(jsonable_encoder(payload)).body)
+        fast_ms = best_of(args.repeat, lambda: FastJSONResponse(payload).body)
+        db.close()
+
+    print(f"rows: {args.jobs}  serializer: {'orjson' if FAST_JSON else 'stdlib json'}")
+    print(f"{'list_jobs query':>28}  {query_ms:>8.1f} ms")
+    print(f"{'jsonable_encoder + json':>28}  {default_ms:>8.1f} ms  (query + encode {query_ms + default_ms:.1f} ms)")
+    print(f"{'FastJSONResponse':>28}  {fast_ms:>8.1f} ms  (query + encode {query_ms + fast_ms:.1f} ms)")
+    print(f"{'encode speedup':>28}  {default_ms / fast_ms:>8.1f}x")
+    print(f"{'end-to-end speedup':>28}  {(query_ms + default_ms) / (query_ms + fast_ms):>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Extracting the `<openfars_result>` block from large Codex output.
+
+    python -m backend.benchmarks.result_parser --mb 100
+
+Compares the previous approach (buffer all output, then one non-greedy regex over
+the whole string) with `ResultBlockScanner` fed 64 KiB chunks as the runner reads
+them. The synthetic output is mostly log noise in which the agent echoes the
+result format a few times; the regex matches from the first echoed open tag to the
+real close tag, so it walks most of the output and returns an invalid block.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from backend.codex_runner.parser import ResultBlockScanner, validate_result_payload
+
+RESULT_PATTERN = re.compile(r"<openfars_result>\s*(\{.*?\})\s*</openfars_result>", re.DOTALL)
+CHUNK_CHARS = 64 * 1024
+
+
+def synthesize(megabytes: int, stray_tags: int) -> str:
+    line = "[codex] reading papers/chunk.md and drafting notes for the next step ...\n"
+    noise = line * (megabytes * 1024 * 1024 // len(line))
+    stride = max(1, len(noise) // (stray_tags + 1))
+    parts = []
+    for index in range(stray_tags):
+        parts.append(noise[index * stride : (index + 1) * stride])
+        parts.append("Format: <openfars_result>\n{\"status\": ...\n")
+    parts.append(noise[stray_tags * stride :])
+    result = {"status": "success", "summary": "done", "artifacts": ["notes.md"], "metrics": {}, "next_inputs": {}}
+    parts.append(f"<openfars_result>\n{json.dumps(result)}\n</openfars_result>\n")
+    return "".join(parts)
+
+
+def regex_parse(raw: str) -> str:
+    match = RESULT_PATTERN.search(raw)
+    if not match:
+        return "missing"
+    try:
+        return validate_result_payload(json.loads(match.group(1))).summary
+    except ValueError:
+        return f"invalid ({len(match.group(1)) / (1024 * 1024):.0f} MiB block)"
+
+
+def scanner_parse(raw: str) -> Any:
+    scanner = ResultBlockScanner()
+    for start in range(0, len(raw), CHUNK_CHARS):
+        scanner.feed(raw[start : start + CHUNK_CHARS])
+    return scanner.result()
+
+
+def measure(fn: Callable[[], Any]) -> tuple[float, float]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed * 1000, peak / (1024 * 1024)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=int, default=100)
+    parser.add_argument("--stray-tags", type=int, default=8)
+    args = parser.parse_args()
+
+    raw = synthesize(args.mb, args.stray_tags)
+    regex_result = regex_parse(raw)
+    assert scanner_parse(raw).summary == "done"
+
+    # The regex path also needs the whole output held in memory, which the
+    # runner no longer does; the peak below only covers the parse itself.
+    regex_ms, regex_mb = measure(lambda: regex_parse(raw))
+    scanner_ms, scanner_mb = measure(lambda: scanner_parse(raw))
+
+    print(f"output: {len(raw) / (1024 * 1024):.0f} MiB  stray open tags: {args.stray_tags}")
+    print(f"{'regex over full output':>26}  {regex_ms:>9.1f} ms  peak {regex_mb:>7.2f} MiB (+ {len(raw) / (1024 * 1024):.0f} MiB buffered)")
+    print(f"{'chunked scanner':>26}  {scanner_ms:>9.1f} ms  peak {scanner_mb:>7.2f} MiB")
+    print(f"{'speedup':>26}  {regex_ms / scanner_ms:>9.1f}x")
+    print(f"{'regex result':>26}  {regex_result}")
+
+
+if __name__ == "__main__":
+    main()
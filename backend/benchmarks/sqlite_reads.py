@@ -0,0 +1,79 @@
+"""Read throughput of `Database` as reader threads increase.
+
+    python -m backend.benchmarks.sqlite_reads --runs 20 --jobs-per-run 2000 --seconds 2
+
+`--serialized` wraps every read in one global lock, which reproduces the former
+single-connection design and serves as the baseline.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+from backend.storage import Database
+
+
+def populate(db: Database, runs: int, jobs_per_run: int) -> list[str]:
+    project = db.create_project("bench")
+    run_ids: list[str] = []
+    for _ in range(runs):
+        run = db.create_run(project["id"], [{"key": "bench", "number": 1, "title": "Bench"}])
+        run_ids.append(run["id"])
+        for index in range(jobs_per_run):
+            db.add_job(run["id"], None, "Bench", f"line {index}", "running", "<1s", "bench", "info", "x" * 200)
+    return run_ids
+
+
+def measure(db: Database, run_ids: list[str], threads: int, seconds: float, serialized: bool) -> float:
+    global_lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+    counts = [0] * threads
+
+    def worker(slot: int) -> None:
+        rng = random.Random(slot)
+        while time.perf_counter() < deadline:
+            run_id = rng.choice(run_ids)
+            with global_lock if serialized else nullcontext():
+                db.get_run(run_id)
+                db.list_jobs(run_id)
+            counts[slot] += 1
+
+    pool = [threading.Thread(target=worker, args=(slot,)) for slot in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return sum(counts) / seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--jobs-per-run", type=int, default=2000)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--serialized", action="store_true", help="serialize reads behind one lock (baseline)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / "bench.db")
+        db.initialize()
+        run_ids = populate(db, args.runs, args.jobs_per_run)
+
+        print(f"{'threads':>7}  {'reads/s':>10}  {'speedup':>7}")
+        baseline: float | None = None
+        for threads in args.threads:
+            rate = measure(db, run_ids, threads, args.seconds, args.serialized)
+            baseline = baseline or rate
+            print(f"{threads:>7}  {rate:>10.1f}  {rate / baseline:>6.2f}x")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,12 @@
 from __future__ import annotations
 
 import json
-import re
 from dataclasses import dataclass
 from typing import Any
 
-RESULT_PATTERN = re.compile(
-    r"<openfars_result>\s*(\{.*?\})\s*</openfars_result>",
-    re.DOTALL,
-)
+RESULT_OPEN_TAG = "<openfars_result>"
+RESULT_CLOSE_TAG = "</openfars_result>"
+RESULT_STATUSES = {"success", "failed"}
 
 
 @dataclass
@@ -21,20 +19,134 @@ class ParsedResult:
 
 
 def parse_openfars_result(raw_output: str) -> ParsedResult:
-    """Parse structured result emitted by Codex CLI in `<openfars_result>` block."""
-    match = RESULT_PATTERN.search(raw_output)
-    if not match:
-        raise ValueError("Missing <openfars_result> block in Codex output")
+    """Parse structured result emitted by Codex CLI in `<openfars_result>` block.
+
+    When the output contains several blocks, the last valid one wins.
+    """
+    scanner = ResultBlockScanner(max_block_chars=len(raw_output))
+    scanner.feed(raw_output)
+    return scanner.result()
 
-    payload = json.loads(match.group(1))
+
+def validate_result_payload(payload: Any) -> ParsedResult:
+    """Check a decoded result block against the result schema."""
+    if not isinstance(payload, dict):
+        raise ValueError("Result block must be a JSON object")
     status = payload.get("status")
-    if status not in {"success", "failed"}:
+    if status not in RESULT_STATUSES:
         raise ValueError("Invalid result status")
+    summary = payload.get("summary", "")
+    artifacts = payload.get("artifacts", [])
+    metrics = payload.get("metrics", {})
+    next_inputs = payload.get("next_inputs", {})
+    if not isinstance(summary, str):
+        raise ValueError("Result summary must be a string")
+    if not isinstance(artifacts, list) or not all(isinstance(item, str) for item in artifacts):
+        raise ValueError("Result artifacts must be a list of paths")
+    if not isinstance(metrics, dict):
+        raise ValueError("Result metrics must be an object")
+    if not isinstance(next_inputs, dict):
+        raise ValueError("Result next_inputs must be an object")
 
     return ParsedResult(
         status=status,
-        summary=str(payload.get("summary", "")),
-        artifacts=list(payload.get("artifacts", [])),
-        metrics=dict(payload.get("metrics", {})),
-        next_inputs=dict(payload.get("next_inputs", {})),
+        summary=summary,
+        artifacts=list(artifacts),
+        metrics=dict(metrics),
+        next_inputs=dict(next_inputs),
     )
+
+
+def _partial_tag_length(text: str, start: int, tag: str) -> int:
+    """Length of the longest suffix of `text[start:]` that is a proper prefix of `tag`."""
+    for length in range(min(len(tag) - 1, len(text) - start), 0, -1):
+        if text.endswith(tag[:length]):
+            return length
+    return 0
+
+
+class ResultBlockScanner:
+    """Chunk-fed state machine that keeps only the last valid `<openfars_result>` block.
+
+    Chunks may split tags anywhere. Output outside a block is discarded as it is
+    scanned and at most a tag's length of it is carried between chunks, so memory is
+    bounded by `max_block_chars` regardless of how much the process prints. Each
+    block is decoded and validated when it closes; invalid ones are skipped.
+    """
+
+    def __init__(self, max_block_chars: int = 1_000_000) -> None:
+        self.max_block_chars = max_block_chars
+        self._carry = ""
+        self._current: list[str] | None = None
+        self._current_size = 0
+        self._in_block = False
+        self._last_result: ParsedResult | None = None
+        self._last_error: str | None = None
+
+    def feed(self, chunk: str) -> None:
+        text = self._carry + chunk if self._carry else chunk
+        self._carry = ""
+        position = 0
+        while True:
+            if not self._in_block:
+                start = text.find(RESULT_OPEN_TAG, position)
+                if start < 0:
+                    keep = _partial_tag_length(text, position, RESULT_OPEN_TAG)
+                    self._carry = text[len(text) - keep :] if keep else ""
+                    return
+                self._in_block = True
+                self._current = []
+                self._current_size = 0
+                position = start + len(RESULT_OPEN_TAG)
+                continue
+
+            end = text.find(RESULT_CLOSE_TAG, position)
+            reopen = text.find(RESULT_OPEN_TAG, position, None if end < 0 else end)
+            if reopen >= 0:
+                # A stray open tag (e.g. prose mentioning the tag) restarts the block.
+                self._current = []
+                self._current_size = 0
+                position = reopen + len(RESULT_OPEN_TAG)
+                continue
+            if end < 0:
+                keep = max(
+                    _partial_tag_length(text, position, RESULT_CLOSE_TAG),
+                    _partial_tag_length(text, position, RESULT_OPEN_TAG),
+                )
+                self._append(text[position : len(text) - keep])
+                self._carry = text[len(text) - keep :] if keep else ""
+                return
+            self._append(text[position:end])
+            self._close_block()
+            position = end + len(RESULT_CLOSE_TAG)
+
+    def feed_line(self, line: str) -> None:
+        self.feed(line)
+
+    def result(self) -> ParsedResult:
+        if self._last_result is not None:
+            return self._last_result
+        if self._last_error is not None:
+            raise ValueError(f"Invalid <openfars_result> block: {self._last_error}")
+        raise ValueError("Missing <openfars_result> block in Codex output")
+
+    def _append(self, text: str) -> None:
+        if self._current is None or not text:
+            return
+        self._current_size += len(text)
+        if self._current_size > self.max_block_chars:
+            # Oversized blocks cannot be valid results; drop them instead of buffering.
+            self._current = None
+            self._last_error = "block exceeds size limit"
+            return
+        self._current.append(text)
+
+    def _close_block(self) -> None:
+        block, self._current = self._current, None
+        self._in_block = False
+        if block is None:
+            return
+        try:
+            self._last_result = validate_result_payload(json.loads("".join(block)))
+        except ValueError as exc:
+            self._last_error = str(exc)
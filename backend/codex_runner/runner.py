@@ -1,16 +1,28 @@
 from __future__ import annotations
 
-import hashlib
+import asyncio
+import codecs
 import json
 import os
 import shutil
-import subprocess
 import time
+from collections import deque
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, Awaitable, Callable
 
-from .parser import parse_openfars_result
+from .parser import ResultBlockScanner, parse_openfars_result
+
+STREAM_CHUNK_BYTES = 64 * 1024
+MAX_LINE_CHARS = 64 * 1024
+MAX_LOG_CONTENT_CHARS = 4_000
+# Bump when the adapter changes how steps are prompted or results are read, so
+# cached step results from the previous behaviour are no longer reused.
+RUNNER_VERSION = "1"
+# Written to each step workspace before the step runs; Codex is pointed at it.
+TASK_SPEC_FILE = "task_spec.json"
+
+LogSink = Callable[[list[dict[str, str]]], Awaitable[None]]
 
 
 @dataclass
@@ -23,12 +35,21 @@ class StepExecutionResult:
     retriable: bool
 
 
+def write_task_spec(workspace_dir: Path, task_spec: dict[str, Any]) -> Path:
+    """Write the step's task spec into its workspace and return the file."""
+    task_file = workspace_dir / TASK_SPEC_FILE
+    task_file.write_text(json.dumps(task_spec, indent=2, ensure_ascii=False), encoding="utf-8")
+    return task_file
+
+
 class CodexRunner:
     """Codex CLI adapter with default mock mode for local bootstrap."""
 
     def __init__(self) -> None:
         self.mode = os.getenv("OPENFARS_CODEX_MODE", "mock").lower()
         self.command = os.getenv("OPENFARS_CODEX_COMMAND", "codex")
+        self.log_flush_interval = int(os.getenv("OPENFARS_LOG_FLUSH_MS", "250")) / 1000
+        self.log_batch_lines = 200
 
     def run_step(
         self,
@@ -39,6 +60,7 @@ class CodexRunner:
         soft_timeout: int = 120,
         hard_timeout: int = 180,
     ) -> StepExecutionResult:
+        """Run one step; real mode expects `task_spec` already written with `write_task_spec`."""
         if self.mode != "real":
             return self._run_mock(task_spec=task_spec, step_key=step_key, workspace_dir=workspace_dir, attempt=attempt)
 
@@ -46,7 +68,7 @@ class CodexRunner:
             return self._run_mock(task_spec=task_spec, step_key=step_key, workspace_dir=workspace_dir, attempt=attempt)
 
         return self._run_real(
-            task_spec=task_spec,
+            task_file=workspace_dir / TASK_SPEC_FILE,
             workspace_dir=workspace_dir,
             soft_timeout=soft_timeout,
             hard_timeout=hard_timeout,
@@ -143,36 +165,103 @@ class CodexRunner:
 
     def _run_real(
         self,
-        task_spec: dict[str, Any],
+        task_file: Path,
         workspace_dir: Path,
         soft_timeout: int,
         hard_timeout: int,
     ) -> StepExecutionResult:
-        task_file = workspace_dir / "task_spec.json"
-        task_file.write_text(json.dumps(task_spec, indent=2, ensure_ascii=False), encoding="utf-8")
+        # Blocking callers get the same streaming implementation; streamed log
+        # batches are returned with the result instead of being pushed live.
+        return asyncio.run(
+            self.run_step_streaming(
+                task_file=task_file,
+                workspace_dir=workspace_dir,
+                soft_timeout=soft_timeout,
+                hard_timeout=hard_timeout,
+            )
+        )
+
+    def version(self) -> str:
+        """Identifies what produces step results, for keying cached ones."""
+        backend = self.command if self.streams_output() else "mock"
+        return f"openfars-runner/{RUNNER_VERSION} {backend}"
+
+    def streams_output(self) -> bool:
+        """Whether steps run as a native asyncio subprocess with live log streaming."""
+        return self.mode == "real" and shutil.which(self.command) is not None
+
+    async def run_step_streaming(
+        self,
+        task_file: Path,
+        workspace_dir: Path,
+        on_logs: LogSink | None = None,
+        soft_timeout: int = 120,
+        hard_timeout: int = 180,
+    ) -> StepExecutionResult:
+        """Run Codex CLI as an asyncio subprocess, streaming stdout/stderr in batches.
 
-        start = time.time()
-        process = subprocess.Popen(
-            [self.command, "run", str(task_file)],
+        Lines are grouped into log entries and handed to `on_logs` as soon as a batch
+        fills up or `log_flush_interval` elapses. Only the current batch, a bounded
+        output tail and the pending `<openfars_result>` block are held in memory.
+        `task_file` is the spec written by `write_task_spec`.
+        """
+        streamed: list[dict[str, str]] = []
+
+        async def emit(logs: list[dict[str, str]]) -> None:
+            if on_logs is None:
+                streamed.extend(logs)
+            else:
+                await on_logs(logs)
+
+        start = time.monotonic()
+        process = await asyncio.create_subprocess_exec(
+            self.command,
+            "run",
+            str(task_file),
             cwd=workspace_dir,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
         )
 
+        stdout_batcher = _LogBatcher(emit, start, level="info", max_lines=self.log_batch_lines)
+        stderr_batcher = _LogBatcher(emit, start, level="warning", max_lines=self.log_batch_lines)
+        stdout_scanner = ResultBlockScanner()
+        stderr_scanner = ResultBlockScanner()
+        tail = _OutputTail(max_chars=10_000)
+
+        async def flush_periodically() -> None:
+            while True:
+                await asyncio.sleep(self.log_flush_interval)
+                await stdout_batcher.flush()
+                await stderr_batcher.flush()
+
+        flusher = asyncio.create_task(flush_periodically())
         try:
-            stdout, stderr = process.communicate(timeout=soft_timeout)
-        except subprocess.TimeoutExpired:
-            process.terminate()
+            pumps = asyncio.gather(
+                _pump_lines(process.stdout, stdout_batcher, stdout_scanner, tail),
+                _pump_lines(process.stderr, stderr_batcher, stderr_scanner, tail),
+                process.wait(),
+            )
             try:
-                stdout, stderr = process.communicate(timeout=max(1, hard_timeout - soft_timeout))
-            except subprocess.TimeoutExpired:
+                await asyncio.wait_for(pumps, timeout=soft_timeout)
+            except asyncio.TimeoutError:
+                process.terminate()
+                try:
+                    await asyncio.wait_for(process.wait(), timeout=max(1, hard_timeout - soft_timeout))
+                except asyncio.TimeoutError:
+                    process.kill()
+                    await process.wait()
+        finally:
+            flusher.cancel()
+            if process.returncode is None:
                 process.kill()
-                stdout, stderr = process.communicate()
+                await process.wait()
 
-        elapsed = max(0.1, time.time() - start)
-        raw_output = f"{stdout}\n{stderr}".strip()
-        logs = [
+        await stdout_batcher.flush()
+        await stderr_batcher.flush()
+
+        elapsed = max(0.1, time.monotonic() - start)
+        logs = streamed + [
             {
                 "title": "Codex Runner",
                 "content": "Codex CLI execution finished",
@@ -180,7 +269,7 @@ class CodexRunner:
                 "workedFor": f"{elapsed:.1f}s",
                 "source": "codex-cli",
                 "level": "info" if process.returncode == 0 else "error",
-                "raw": raw_output[:10_000],
+                "raw": tail.text(),
             }
         ]
 
@@ -194,7 +283,21 @@ class CodexRunner:
                 retriable=True,
             )
 
-        parsed = parse_openfars_result(raw_output)
+        try:
+            parsed = stdout_scanner.result()
+        except ValueError:
+            try:
+                parsed = stderr_scanner.result()
+            except ValueError as exc:
+                return StepExecutionResult(
+                    status="failed",
+                    summary=str(exc),
+                    logs=logs,
+                    artifacts=[],
+                    metrics={"tokens": 0, "cost_usd": 0, "token_cost_usd": 0, "gpu_hours": 0},
+                    retriable=True,
+                )
+
         artifact_paths: list[Path] = []
         for rel_path in parsed.artifacts:
             candidate = (workspace_dir / rel_path).resolve()
@@ -211,12 +314,89 @@ class CodexRunner:
         )
 
 
-def file_sha256(path: Path) -> str:
-    digest = hashlib.sha256()
-    with path.open("rb") as fh:
-        while True:
-            chunk = fh.read(8192)
-            if not chunk:
-                break
-            digest.update(chunk)
-    return digest.hexdigest()
+class _LogBatcher:
+    """Collects output lines of one stream and emits them as job log entries."""
+
+    def __init__(self, emit: LogSink, started_at: float, level: str, max_lines: int) -> None:
+        self._emit = emit
+        self._started_at = started_at
+        self._level = level
+        self._max_lines = max_lines
+        self._lines: list[str] = []
+        self._lock = asyncio.Lock()
+
+    async def add(self, line: str) -> None:
+        self._lines.append(line)
+        if len(self._lines) >= self._max_lines:
+            await self.flush()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            if not self._lines:
+                return
+            lines, self._lines = self._lines, []
+            text = "\n".join(lines)
+            await self._emit(
+                [
+                    {
+                        "title": "Codex Output",
+                        "content": text[:MAX_LOG_CONTENT_CHARS],
+                        "status": "running",
+                        "workedFor": f"{time.monotonic() - self._started_at:.1f}s",
+                        "source": "codex-cli",
+                        "level": self._level,
+                        "raw": text,
+                    }
+                ]
+            )
+
+
+class _OutputTail:
+    """Keeps the last `max_chars` characters of combined output for the summary log."""
+
+    def __init__(self, max_chars: int) -> None:
+        self._max_chars = max_chars
+        self._lines: deque[str] = deque()
+        self._size = 0
+
+    def append(self, line: str) -> None:
+        line = line[-self._max_chars :]
+        self._lines.append(line)
+        self._size += len(line) + 1
+        while self._size > self._max_chars and len(self._lines) > 1:
+            self._size -= len(self._lines.popleft()) + 1
+
+    def text(self) -> str:
+        return "\n".join(self._lines)
+
+
+async def _pump_lines(
+    stream: asyncio.StreamReader | None,
+    batcher: _LogBatcher,
+    scanner: ResultBlockScanner,
+    tail: _OutputTail,
+) -> None:
+    if stream is None:
+        return
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    while True:
+        chunk = await stream.read(STREAM_CHUNK_BYTES)
+        text = decoder.decode(chunk, final=not chunk)
+        scanner.feed(text)
+        pending += text
+        *lines, pending = pending.split("\n")
+        if not chunk and pending:
+            lines.append(pending)
+            pending = ""
+        elif len(pending) > MAX_LINE_CHARS:
+            # Split pathological newline-free output so buffering stays bounded.
+            lines.append(pending)
+            pending = ""
+        for line in lines:
+            line = line.rstrip("\r")
+            tail.append(line)
+            await batcher.add(line)
+        if not chunk:
+            return
+
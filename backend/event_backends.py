@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sqlite3
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from backend.storage import Database
+
+logger = logging.getLogger(__name__)
+
+# After these events a run's replay ring is spilled to the store and released.
+TERMINAL_EVENTS = {"run_completed", "run_failed"}
+# Finished runs whose in-memory sequence and ring are kept, least recently finished
+# evicted first; a later event for an evicted run starts from the store again.
+FINISHED_RUNS_RETAINED = 256
+
+# Called with (run_id, event, serialized message) for events published elsewhere.
+RemoteDelivery = Callable[[str, str, str], None]
+
+
+class EventBackend(ABC):
+    """Sequencing, retention and cross-process delivery strategy behind `EventBus`."""
+
+    @abstractmethod
+    def append(self, run_id: str, event: str, timestamp: str, encode: Callable[[int], str]) -> tuple[int, str]:
+        """Assign the next seq of `run_id`, serialize the event with it and retain it."""
+
+    async def append_async(
+        self,
+        run_id: str,
+        event: str,
+        timestamp: str,
+        encode: Callable[[int], str],
+    ) -> tuple[int, str]:
+        """`append` for callers on the event loop; backends that block override it."""
+        return self.append(run_id, event, timestamp, encode)
+
+    @abstractmethod
+    def current_seq(self, run_id: str) -> int:
+        """The seq of the latest event of `run_id`, 0 if it has none."""
+
+    @abstractmethod
+    def replay(self, run_id: str, since: int) -> list[str] | None:
+        """Serialized events with seq > `since`, or None if they can no longer be replayed."""
+
+    async def start(self, deliver: RemoteDelivery) -> None:
+        """Begin delivering events published by other processes."""
+
+    def flush(self) -> None:
+        """Persist anything still held only in memory."""
+
+    def close(self) -> None:
+        self.flush()
+
+
+class InMemoryEventBackend(EventBackend):
+    """Single-process backend: sequence numbers and a replay ring live in memory.
+
+    The latest `replay_size` events of each run stay in memory; older ones are spilled
+    to `store` in batches so they remain replayable. Per-run state of the last
+    `finished_retained` finished runs is kept; older finished runs are forgotten.
+    """
+
+    def __init__(
+        self,
+        replay_size: int,
+        store: Database | None = None,
+        finished_retained: int = FINISHED_RUNS_RETAINED,
+    ) -> None:
+        self.replay_size = max(1, replay_size)
+        self.store = store
+        self.finished_retained = max(0, finished_retained)
+        self._seq: dict[str, int] = {}
+        self._rings: dict[str, deque[tuple[int, str, str, str]]] = {}
+        self._finished: OrderedDict[str, None] = OrderedDict()
+
+    def append(self, run_id: str, event: str, timestamp: str, encode: Callable[[int], str]) -> tuple[int, str]:
+        seq = self.current_seq(run_id) + 1
+        self._seq[run_id] = seq
+        text = encode(seq)
+        ring = self._rings.setdefault(run_id, deque())
+        ring.append((seq, text, event, timestamp))
+        if event in TERMINAL_EVENTS:
+            self._spill(run_id, len(ring))
+            self._finish(run_id)
+        else:
+            # A retried run is live again.
+            self._finished.pop(run_id, None)
+            if len(ring) > self.replay_size + self._spill_batch:
+                self._spill(run_id, self._spill_batch)
+        return seq, text
+
+    def current_seq(self, run_id: str) -> int:
+        seq = self._seq.get(run_id)
+        if seq is None:
+            seq = self.store.max_event_seq(run_id) if self.store is not None else 0
+            self._seq[run_id] = seq
+        return seq
+
+    def replay(self, run_id: str, since: int) -> list[str] | None:
+        current = self.current_seq(run_id)
+        if since > current or since < 0:
+            return None
+        ring = self._rings.get(run_id, deque())
+        oldest_in_memory = ring[0][0] if ring else current + 1
+
+        messages: list[tuple[int, str]] = []
+        if since + 1 < oldest_in_memory:
+            if self.store is None:
+                return None
+            messages.extend(self.store.list_run_events(run_id, since, limit=oldest_in_memory - since - 1))
+        messages.extend((seq, text) for seq, text, _, _ in ring if seq > since)
+        return _contiguous(messages, since, current)
+
+    def flush(self) -> None:
+        for run_id in list(self._rings):
+            self._spill(run_id, len(self._rings[run_id]))
+
+    @property
+    def _spill_batch(self) -> int:
+        return max(1, self.replay_size // 4)
+
+    def _finish(self, run_id: str) -> None:
+        self._finished[run_id] = None
+        self._finished.move_to_end(run_id)
+        while len(self._finished) > self.finished_retained:
+            evicted, _ = self._finished.popitem(last=False)
+            self._seq.pop(evicted, None)
+            self._rings.pop(evicted, None)
+
+    def _spill(self, run_id: str, count: int) -> None:
+        ring = self._rings.get(run_id)
+        if not ring or self.store is None:
+            # Without a store, keep at most `replay_size` events.
+            while ring and len(ring) > self.replay_size:
+                ring.popleft()
+            return
+        spilled = [ring.popleft() for _ in range(min(count, len(ring)))]
+        self.store.append_run_events([(run_id, seq, event, text, timestamp) for seq, text, event, timestamp in spilled])
+        if not ring:
+            del self._rings[run_id]
+
+
+class SQLiteEventBackend(EventBackend):
+    """Cross-process backend: every event is written to `run_events` and tailed.
+
+    Sequence numbers are assigned inside the SQLite write transaction, so they stay
+    gapless per run across uvicorn workers sharing the database file. Each process
+    polls for rows written by other processes and hands them to the local bus.
+
+    Publishing from the event loop writes on a single dedicated thread: the loop is
+    not blocked on SQLite's write lock, and events are still delivered in seq order.
+    """
+
+    # Ceiling for the tail's backoff while the database keeps failing.
+    MAX_TAIL_BACKOFF_S = 5.0
+
+    def __init__(self, store: Database, poll_interval: float) -> None:
+        self.store = store
+        self.poll_interval = poll_interval
+        self.origin = uuid.uuid4().hex
+        self._tail_task: asyncio.Task[None] | None = None
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="openfars-events")
+
+    def append(self, run_id: str, event: str, timestamp: str, encode: Callable[[int], str]) -> tuple[int, str]:
+        return self.store.append_run_event_sequenced(run_id, event, timestamp, self.origin, encode)
+
+    async def append_async(
+        self,
+        run_id: str,
+        event: str,
+        timestamp: str,
+        encode: Callable[[int], str],
+    ) -> tuple[int, str]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writer, self.append, run_id, event, timestamp, encode)
+
+    def current_seq(self, run_id: str) -> int:
+        return self.store.max_event_seq(run_id)
+
+    def replay(self, run_id: str, since: int) -> list[str] | None:
+        current = self.current_seq(run_id)
+        if since > current or since < 0:
+            return None
+        return _contiguous(self.store.list_run_events(run_id, since, limit=current - since), since, current)
+
+    async def start(self, deliver: RemoteDelivery) -> None:
+        if self._tail_task is None:
+            last_id = self.store.max_event_id()
+            self._tail_task = asyncio.create_task(self._tail(deliver, last_id))
+
+    def close(self) -> None:
+        if self._tail_task is not None:
+            self._tail_task.cancel()
+            self._tail_task = None
+        self._writer.shutdown(wait=True)
+
+    async def _tail(self, deliver: RemoteDelivery, last_id: int) -> None:
+        delay = self.poll_interval
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                rows = self.store.list_events_after_id(last_id, exclude_origin=self.origin)
+            except sqlite3.Error:
+                # A transient failure (locked or busy database) must not end cross-process delivery.
+                logger.exception("Reading run_events failed; retrying in %.2fs", delay)
+                delay = min(max(delay, self.poll_interval) * 2, self.MAX_TAIL_BACKOFF_S)
+                continue
+            delay = self.poll_interval
+            for event_id, run_id, event, text in rows:
+                last_id = event_id
+                try:
+                    deliver(run_id, event, text)
+                except Exception:
+                    logger.exception("Delivering remote event %s of run %s failed", event_id, run_id)
+
+
+def create_event_backend(
+    kind: str | None = None,
+    store: Database | None = None,
+    replay_size: int | None = None,
+) -> EventBackend:
+    """Build the backend selected by `OPENFARS_EVENT_BACKEND` (`memory` or `sqlite`)."""
+    kind = (kind or os.getenv("OPENFARS_EVENT_BACKEND", "memory")).lower()
+    if kind == "memory":
+        return InMemoryEventBackend(
+            replay_size=replay_size or int(os.getenv("OPENFARS_EVENT_REPLAY_SIZE", "500")),
+            store=store,
+        )
+    if kind == "sqlite":
+        if store is None:
+            raise ValueError("The sqlite event backend requires a database")
+        return SQLiteEventBackend(store, poll_interval=int(os.getenv("OPENFARS_EVENT_POLL_MS", "50")) / 1000)
+    raise ValueError(f"Unknown event backend: {kind}")
+
+
+def _contiguous(messages: list[tuple[int, str]], since: int, current: int) -> list[str] | None:
+    if len(messages) != current - since or (messages and messages[0][0] != since + 1):
+        return None
+    return [text for _, text in messages]
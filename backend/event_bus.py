@@ -1,55 +1,427 @@
 from __future__ import annotations
 
 import asyncio
-from collections import defaultdict
+import os
+from collections import defaultdict, deque
 from datetime import datetime, timezone
-from typing import Any
+from typing import Any, Callable
 
 from fastapi import WebSocket
 
+from backend.event_backends import EventBackend, create_event_backend
+from backend.serialization import dumps, loads
+from backend.storage import Database
+
+OVERFLOW_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+
+# Events whose payload is a full replacement of earlier state for the same entity;
+# under the `coalesce` policy a queued older copy can be dropped in favour of the new one.
+COALESCIBLE_EVENTS = {"step_updated", "stats_updated", "run_queued"}
+
+# Payload entries carrying the full current state of an entity; batched subscribers
+# receive only the fields that changed since the client last saw that entity.
+DELTA_ENTITIES = ("run", "step", "stats")
+
+# Subscription topics are run ids, or this prefix plus a project id.
+PROJECT_TOPIC_PREFIX = "project:"
+
+
+def _project_topic(project_id: str) -> str:
+    return f"{PROJECT_TOPIC_PREFIX}{project_id}"
+
+
+def _coalesce_key(event: str, payload: dict[str, Any]) -> str | None:
+    if event not in COALESCIBLE_EVENTS:
+        return None
+    for entity in ("step", "run", "stats", "queue"):
+        item = payload.get(entity)
+        if isinstance(item, dict):
+            return f"{event}:{entity}:{item.get('id') or item.get('runId')}"
+    return event
+
+
+class Subscriber:
+    """One websocket with a bounded outbound queue drained by a dedicated writer task."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        max_queue: int,
+        overflow: str,
+        on_closed: Callable[[Subscriber], None],
+    ) -> None:
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.dropped = 0
+        self.closed = False
+        self._on_closed = on_closed
+        self._queue: deque[tuple[str | None, str]] = deque()
+        self._wakeup = asyncio.Event()
+        self._writer = asyncio.create_task(self._drain())
+
+    def push(self, text: str, key: str | None = None) -> None:
+        """Queue a pre-serialized message without waiting for the socket."""
+        if self.closed or not self._make_room(key):
+            return
+        self._queue.append((key, text))
+        self._wakeup.set()
+
+    def deliver(self, run_id: str, message: dict[str, Any], text: str, key: str | None) -> None:
+        """Hand a published event to this subscriber; `text` is `message` serialized."""
+        self.push(text, key)
+
+    def send(self, message: dict[str, Any]) -> None:
+        self.push(dumps(message))
+
+    def close(self, code: int = 1000) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.clear()
+        self._writer.cancel()
+        self._on_closed(self)
+        if code != 1000:
+            asyncio.create_task(self._close_socket(code))
+
+    async def _close_socket(self, code: int) -> None:
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+    def _make_room(self, key: str | None) -> bool:
+        """Apply the overflow policy if the queue is full; False if that closed the subscriber."""
+        if len(self._queue) < self.max_queue:
+            return True
+        if self.overflow == "disconnect":
+            self.close(code=1013)
+            return False
+        self.dropped += 1
+        if not (self.overflow == "coalesce" and self._drop_queued(key)):
+            self._queue.popleft()
+        self._on_dropped()
+        return True
+
+    def _on_dropped(self) -> None:
+        """Called after a queued message was discarded to make room."""
+
+    def _drop_queued(self, key: str | None) -> bool:
+        if key is None:
+            return False
+        for index, (queued_key, _) in enumerate(self._queue):
+            if queued_key == key:
+                del self._queue[index]
+                return True
+        return False
+
+    async def _drain(self) -> None:
+        try:
+            while True:
+                while not self._queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                _, text = self._queue.popleft()
+                await self.websocket.send_text(text)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # The peer is gone; stop queueing for it.
+            self.closed = True
+            self._queue.clear()
+            self._on_closed(self)
+
+
+class BatchingSubscriber(Subscriber):
+    """Subscriber for the opt-in `batched` websocket mode.
+
+    Events are collected for `window` seconds and sent as a single `batch` frame.
+    Within a window a newer coalescible event replaces the older one for the same
+    entity, and `run`/`step`/`stats` payloads are reduced to the fields that changed
+    since the client last saw that entity (named in the event's `partial` list).
+    When a queued frame is discarded on overflow the client's view is unknown, so the
+    remembered state is reset and entities are sent in full again.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        max_queue: int,
+        overflow: str,
+        on_closed: Callable[[Subscriber], None],
+        window: float,
+    ) -> None:
+        super().__init__(websocket, max_queue, overflow, on_closed)
+        self.window = window
+        self._pending: dict[tuple[Any, ...], tuple[str, dict[str, Any]]] = {}
+        self._known: dict[tuple[str, str, str], dict[str, Any]] = {}
+        self._flush_handle: asyncio.TimerHandle | None = None
+
+    def deliver(self, run_id: str, message: dict[str, Any], text: str, key: str | None) -> None:
+        if self.closed:
+            return
+        slot = (run_id, key) if key is not None else (run_id, message["seq"])
+        # Re-inserting moves a superseding event to its own (latest) position.
+        self._pending.pop(slot, None)
+        self._pending[slot] = (run_id, message)
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.window, self.flush_batch)
+
+    def send(self, message: dict[str, Any]) -> None:
+        if message.get("event") == "snapshot":
+            self._remember_snapshot(message["payload"])
+        super().send(message)
+
+    def flush_batch(self) -> None:
+        self._flush_handle = None
+        if self.closed or not self._pending:
+            return
+        # Make room before encoding: if an older frame is discarded, this one must not
+        # be a delta against state the client never receives.
+        if not self._make_room(None):
+            return
+        events = [self._encode_delta(run_id, message) for run_id, message in self._pending.values()]
+        self._pending.clear()
+        self.push(dumps({"event": "batch", "events": events}))
+
+    def close(self, code: int = 1000) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._pending.clear()
+        super().close(code)
+
+    def _on_dropped(self) -> None:
+        self._known.clear()
+
+    def _encode_delta(self, run_id: str, message: dict[str, Any]) -> dict[str, Any]:
+        payload = dict(message["payload"])
+        partial: list[str] = []
+        for entity in DELTA_ENTITIES:
+            item = payload.get(entity)
+            if not isinstance(item, dict):
+                continue
+            known = self._remember(run_id, entity, item)
+            if known is None:
+                continue
+            changed = {field: value for field, value in item.items() if known.get(field) != value}
+            if "id" in item:
+                changed["id"] = item["id"]
+            payload[entity] = changed
+            partial.append(entity)
+
+        encoded = {**message, "runId": run_id, "payload": payload}
+        if partial:
+            encoded["partial"] = partial
+        return encoded
+
+    def _remember(self, run_id: str, entity: str, item: dict[str, Any]) -> dict[str, Any] | None:
+        ident = (run_id, entity, str(item.get("id", "")))
+        known = self._known.get(ident)
+        self._known[ident] = item
+        return known
+
+    def _remember_snapshot(self, payload: dict[str, Any]) -> None:
+        run = payload.get("run")
+        if not isinstance(run, dict):
+            return
+        self._remember(run["id"], "run", run)
+        for step in payload.get("steps") or ():
+            self._remember(run["id"], "step", step)
+        if isinstance(payload.get("stats"), dict):
+            self._remember(run["id"], "stats", payload["stats"])
+
 
 class EventBus:
-    """In-memory pub/sub event bus for run-scoped websocket streams."""
+    """Pub/sub event bus for run-scoped websocket streams.
 
-    def __init__(self) -> None:
-        self._subscribers: dict[str, set[WebSocket]] = defaultdict(set)
-        self._lock = asyncio.Lock()
+    Publishing serializes each event once and only enqueues it per subscriber, so a
+    slow websocket never delays the publisher; overflow is handled per subscriber
+    according to `overflow` (`drop_oldest`, `coalesce` or `disconnect`).
 
-    async def subscribe(self, run_id: str, websocket: WebSocket) -> None:
-        async with self._lock:
-            self._subscribers[run_id].add(websocket)
+    Sequence numbers, replay retention and delivery of events published by other
+    processes are delegated to an `EventBackend` (in-memory by default, SQLite for
+    multi-worker deployments).
+    """
+
+    def __init__(
+        self,
+        max_queue: int | None = None,
+        overflow: str | None = None,
+        replay_size: int | None = None,
+        event_store: Database | None = None,
+        backend: EventBackend | None = None,
+    ) -> None:
+        self.max_queue = max(1, max_queue or int(os.getenv("OPENFARS_WS_QUEUE_SIZE", "1000")))
+        self.batch_window = int(os.getenv("OPENFARS_WS_BATCH_MS", "50")) / 1000
+        self.overflow = overflow or os.getenv("OPENFARS_WS_OVERFLOW", "drop_oldest")
+        if self.overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown websocket overflow policy: {self.overflow}")
+        self.store = event_store
+        self.backend = backend or create_event_backend(store=event_store, replay_size=replay_size)
+        self._run_projects: dict[str, str] = {}
+        self._project_topics = 0
+        self._subscribers: dict[str, set[Subscriber]] = defaultdict(set)
+        self._by_socket: dict[WebSocket, Subscriber] = {}
+        self._topics: dict[Subscriber, set[str]] = defaultdict(set)
+        self._listeners: list[Callable[[str, str, dict[str, Any]], None]] = []
+
+    async def start(self) -> None:
+        await self.backend.start(self._deliver_remote)
+
+    def add_listener(self, listener: Callable[[str, str, dict[str, Any]], None]) -> None:
+        """Call `listener(run_id, event, payload)` for every event, local or remote."""
+        self._listeners.append(listener)
+
+    async def subscribe(
+        self,
+        run_id: str,
+        websocket: WebSocket,
+        batched: bool = False,
+        window: float | None = None,
+    ) -> Subscriber:
+        """Subscribe `websocket` to `run_id`; `batched` opts into windowed, delta-encoded frames."""
+        subscriber = self._subscriber_for(websocket, batched, window)
+        self._add_topic(run_id, subscriber)
+        return subscriber
+
+    async def subscribe_project(
+        self,
+        project_id: str,
+        websocket: WebSocket,
+        batched: bool = False,
+        window: float | None = None,
+    ) -> Subscriber:
+        """Subscribe `websocket` to every run of `project_id`, including runs created later."""
+        subscriber = self._subscriber_for(websocket, batched, window)
+        self._add_topic(_project_topic(project_id), subscriber)
+        return subscriber
 
     async def unsubscribe(self, run_id: str, websocket: WebSocket) -> None:
-        async with self._lock:
-            if run_id in self._subscribers and websocket in self._subscribers[run_id]:
-                self._subscribers[run_id].remove(websocket)
-            if run_id in self._subscribers and not self._subscribers[run_id]:
-                del self._subscribers[run_id]
+        await self._unsubscribe_topic(run_id, websocket)
+
+    async def unsubscribe_project(self, project_id: str, websocket: WebSocket) -> None:
+        await self._unsubscribe_topic(_project_topic(project_id), websocket)
+
+    def bind_run(self, run_id: str, project_id: str) -> None:
+        """Record the project of `run_id` so project subscribers receive its events."""
+        self._run_projects[run_id] = project_id
 
     async def publish(self, run_id: str, event: str, payload: dict[str, Any]) -> None:
-        async with self._lock:
-            subscribers = list(self._subscribers.get(run_id, set()))
+        timestamp = datetime.now(timezone.utc).isoformat()
+        message: dict[str, Any] = {"event": event, "runId": run_id, "payload": payload, "timestamp": timestamp}
+
+        def encode(seq: int) -> str:
+            message["seq"] = seq
+            return dumps(message)
 
+        seq, text = await self.backend.append_async(run_id, event, timestamp, encode)
+        message["seq"] = seq
+        self._deliver(run_id, message, text)
+
+    def current_seq(self, run_id: str) -> int:
+        return self.backend.current_seq(run_id)
+
+    def replay(self, run_id: str, since: int) -> list[str] | None:
+        """Serialized events with seq > `since`, or None if they can no longer be replayed."""
+        return self.backend.replay(run_id, since)
+
+    def flush(self) -> None:
+        """Persist events still held only in memory (used on shutdown)."""
+        self.backend.flush()
+
+    def _deliver(self, run_id: str, message: dict[str, Any], text: str) -> None:
+        event, payload = message["event"], message["payload"]
+        for listener in self._listeners:
+            listener(run_id, event, payload)
+        subscribers = set(self._subscribers.get(run_id, ()))
+        if self._project_topics:
+            project_id = self._project_of(run_id)
+            if project_id is not None:
+                subscribers.update(self._subscribers.get(_project_topic(project_id), ()))
         if not subscribers:
             return
+        key = _coalesce_key(event, payload)
+        for subscriber in subscribers:
+            subscriber.deliver(run_id, message, text, key)
+
+    def _project_of(self, run_id: str) -> str | None:
+        project_id = self._run_projects.get(run_id)
+        if project_id is None and self.store is not None:
+            # Runs started by another worker are resolved once, on their first event.
+            run = self.store.get_run(run_id)
+            if run:
+                project_id = self._run_projects[run_id] = run["projectId"]
+        return project_id
+
+    def _deliver_remote(self, run_id: str, event: str, text: str) -> None:
+        if not self._listeners and not self._project_topics and run_id not in self._subscribers:
+            return
+        self._deliver(run_id, loads(text), text)
+
+    def subscriber_count(self, run_id: str) -> int:
+        return len(self._subscribers.get(run_id, ()))
+
+    def close(self) -> None:
+        for subscriber in list(self._by_socket.values()):
+            subscriber.close()
+        self.backend.close()
+
+    def connect(self, websocket: WebSocket, batched: bool = False, window: float | None = None) -> Subscriber:
+        """The live subscriber of `websocket`, created if needed, with or without topics."""
+        return self._subscriber_for(websocket, batched, window)
+
+    def disconnect(self, websocket: WebSocket) -> None:
+        subscriber = self._by_socket.get(websocket)
+        if subscriber is not None:
+            subscriber.close()
+
+    def _subscriber_for(self, websocket: WebSocket, batched: bool, window: float | None) -> Subscriber:
+        subscriber = self._by_socket.get(websocket)
+        if subscriber is None or subscriber.closed:
+            if batched:
+                subscriber = BatchingSubscriber(
+                    websocket,
+                    self.max_queue,
+                    self.overflow,
+                    self._discard,
+                    window=self.batch_window if window is None else window,
+                )
+            else:
+                subscriber = Subscriber(websocket, self.max_queue, self.overflow, self._discard)
+            self._by_socket[websocket] = subscriber
+        return subscriber
+
+    def _add_topic(self, topic: str, subscriber: Subscriber) -> None:
+        if topic.startswith(PROJECT_TOPIC_PREFIX) and topic not in self._subscribers:
+            self._project_topics += 1
+        self._subscribers[topic].add(subscriber)
+        self._topics[subscriber].add(topic)
+
+    async def _unsubscribe_topic(self, topic: str, websocket: WebSocket) -> None:
+        subscriber = self._by_socket.get(websocket)
+        if subscriber is None:
+            return
+        self._remove_topic(topic, subscriber)
+        if not self._topics.get(subscriber):
+            subscriber.close()
+
+    def _remove_topic(self, topic: str, subscriber: Subscriber) -> None:
+        subscribers = self._subscribers.get(topic)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[topic]
+                if topic.startswith(PROJECT_TOPIC_PREFIX):
+                    self._project_topics -= 1
+        topics = self._topics.get(subscriber)
+        if topics is not None:
+            topics.discard(topic)
+            if not topics:
+                del self._topics[subscriber]
 
-        message = {
-            "event": event,
-            "payload": payload,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-        }
-
-        dead: list[WebSocket] = []
-        for socket in subscribers:
-            try:
-                await socket.send_json(message)
-            except Exception:
-                dead.append(socket)
-
-        if dead:
-            async with self._lock:
-                for socket in dead:
-                    if socket in self._subscribers.get(run_id, set()):
-                        self._subscribers[run_id].remove(socket)
-                if run_id in self._subscribers and not self._subscribers[run_id]:
-                    del self._subscribers[run_id]
+    def _discard(self, subscriber: Subscriber) -> None:
+        for topic in list(self._topics.get(subscriber, ())):
+            self._remove_topic(topic, subscriber)
+        if self._by_socket.get(subscriber.websocket) is subscriber:
+            del self._by_socket[subscriber.websocket]
@@ -2,16 +2,40 @@ from __future__ import annotations
 
 import asyncio
 import json
+import os
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
+from functools import partial
 from pathlib import Path
 from typing import Any
 
-from backend.codex_runner.runner import CodexRunner, file_sha256
+from backend.artifact_manager.manager import ArtifactManager
+from backend.codex_runner.runner import TASK_SPEC_FILE, CodexRunner, StepExecutionResult, write_task_spec
 from backend.event_bus import EventBus
-from backend.orchestrator.state_machine import STEP_DEFINITIONS
+from backend.orchestrator.scheduler import RunScheduler
+from backend.orchestrator.state_machine import STEP_DEFINITIONS, STEP_DEPENDENCIES, STEP_UPSTREAM
+from backend.orchestrator.step_cache import StepCache, step_cache_key
 from backend.storage import Database, now_iso
 
 
+STATS_VIEW_CACHE_SIZE = 1024
+
+# Control actions that can be applied to many runs at once, with their reply message.
+BULK_CONTROL_ACTIONS = {
+    "pause": "Run paused",
+    "resume": "Run resumed",
+    "cancel": "Run cancellation requested",
+}
+# Statuses a run must have for a filtered bulk action to touch it.
+BULK_CONTROL_ELIGIBLE = {
+    "pause": ("pending", "running"),
+    "resume": ("paused",),
+    "cancel": ("pending", "running", "paused"),
+}
+
+
 @dataclass
 class RunControl:
     resume_event: asyncio.Event = field(default_factory=asyncio.Event)
@@ -20,17 +44,59 @@ class RunControl:
 
 
 class RunOrchestrator:
-    def __init__(self, db: Database, event_bus: EventBus, workspace_root: Path) -> None:
+    def __init__(
+        self,
+        db: Database,
+        event_bus: EventBus,
+        workspace_root: Path,
+        max_step_workers: int | None = None,
+        max_running_runs: int | None = None,
+        max_runs_per_project: int | None = None,
+    ) -> None:
         self.db = db
         self.event_bus = event_bus
         self.workspace_root = workspace_root
         self.runner = CodexRunner()
+        # Recorded on every run this orchestrator launches, so recovery can tell which
+        # runs belong to a worker that is gone.
+        self.worker_id = f"worker_{uuid.uuid4().hex[:10]}"
+        self.artifacts = ArtifactManager(
+            db,
+            artifact_root=workspace_root.parent,
+            object_root=workspace_root / ".objects",
+        )
+        self.step_cache = StepCache(db, self.artifacts)
         self.max_retries = 2
+        self.max_step_workers = max(1, max_step_workers or int(os.getenv("OPENFARS_STEP_WORKERS", "8")))
         self._controls: dict[str, RunControl] = {}
+        self._stats_views: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._background_tasks: set[asyncio.Task[None]] = set()
+        self.event_bus.add_listener(self._on_event)
+        # Step execution blocks (subprocess I/O, workspace writes), so it runs in a
+        # bounded pool; the semaphore caps in-flight steps across all runs.
+        self._step_executor = ThreadPoolExecutor(
+            max_workers=self.max_step_workers,
+            thread_name_prefix="openfars-step",
+        )
+        self._step_slots = asyncio.Semaphore(self.max_step_workers)
+        self.scheduler = RunScheduler(
+            launch=self._launch_run,
+            max_running=max_running_runs or int(os.getenv("OPENFARS_MAX_RUNNING_RUNS", "16")),
+            max_running_per_project=max_runs_per_project or int(os.getenv("OPENFARS_MAX_RUNS_PER_PROJECT", "4")),
+            on_positions_changed=self._on_queue_positions_changed,
+            resume=self._resume_run,
+        )
+
+    def shutdown(self) -> None:
+        self._step_executor.shutdown(wait=False, cancel_futures=True)
+        self.artifacts.shutdown()
 
-    def create_run(self, project_id: str) -> dict[str, Any]:
-        run = self.db.create_run(
-            project_id,
+    def create_run(self, project_id: str, step_cache: bool = True) -> dict[str, Any]:
+        return self.create_runs([project_id], [step_cache])[0]
+
+    def create_runs(self, project_ids: list[str], step_cache: list[bool] | None = None) -> list[dict[str, Any]]:
+        return self.db.create_runs(
+            project_ids,
             [
                 {
                     "key": step.key,
@@ -40,44 +106,82 @@ class RunOrchestrator:
                 }
                 for step in STEP_DEFINITIONS
             ],
+            step_cache,
         )
-        return run
 
-    def start_run(self, run_id: str) -> None:
-        control = self._controls.setdefault(run_id, RunControl())
-        control.resume_event.set()
-        control.cancel_requested = False
+    def start_run(self, run_id: str, priority: int = 0) -> None:
+        self.start_runs([run_id], [priority])
+
+    def start_runs(self, run_ids: list[str], priorities: list[int] | None = None) -> None:
+        """Submit runs to the scheduler, recording their queued state in one transaction.
+
+        The queued state lets recovery submit the runs again if this worker stops
+        before the scheduler launches them.
+        """
+        submit: dict[str, int] = {}
+        for run_id, priority in zip(run_ids, priorities or [0] * len(run_ids)):
+            control = self._controls.setdefault(run_id, RunControl())
+            control.cancel_requested = False
 
-        if control.task and not control.task.done():
+            # A paused run's task is still alive; it waits in the queue for a slot again.
+            if control.task and not control.task.done() and not self.scheduler.is_suspended(run_id):
+                control.resume_event.set()
+                continue
+            if not self.scheduler.is_queued(run_id):
+                submit[run_id] = priority
+        if not submit:
             return
 
-        control.task = asyncio.create_task(self._execute_run(run_id))
+        runs = self.db.get_runs(list(submit))
+        queued_at = now_iso()
+        self.db.update_runs(
+            {
+                run_id: {"queued_at": queued_at, "queue_priority": priority, "worker_id": self.worker_id}
+                for run_id, priority in submit.items()
+                if run_id in runs
+            }
+        )
+        # Highest priority first: each submit may take a free slot right away.
+        for run_id, priority in sorted(submit.items(), key=lambda item: -item[1]):
+            if run_id in runs:
+                self.event_bus.bind_run(run_id, runs[run_id]["projectId"])
+                self.scheduler.submit(run_id, runs[run_id]["projectId"], priority)
 
-    async def apply_control(self, run_id: str, action: str) -> dict[str, Any]:
+    def get_queue_view(self, run_id: str) -> dict[str, Any]:
+        return self.scheduler.queue_info(run_id)
+
+    def _on_event(self, run_id: str, event: str, payload: dict[str, Any]) -> None:
+        # Stats views published by any worker (including remote ones) refresh the cache.
+        if event == "stats_updated" and isinstance(payload.get("stats"), dict):
+            self._cache_stats_view(run_id, payload["stats"])
+
+    def _resume_run(self, run_id: str) -> None:
+        self.db.update_run(run_id, queued_at=None)
+        self._controls.setdefault(run_id, RunControl()).resume_event.set()
+
+    def _launch_run(self, run_id: str) -> asyncio.Task[Any]:
         control = self._controls.setdefault(run_id, RunControl())
+        control.task = asyncio.create_task(self._execute_run(run_id))
+        return control.task
 
-        if action == "pause":
-            control.resume_event.clear()
-            self.db.update_run(run_id, status="paused")
-            await self._publish_run_state(run_id)
-            return {"status": "ok", "message": "Run paused"}
+    def _on_queue_positions_changed(self, positions: dict[str, int]) -> None:
+        # One task per refresh publishes every moved run. The loop only keeps weak
+        # references to tasks, so it is held until done.
+        queues = [self.scheduler.queue_info(run_id) for run_id in positions]
+        task = asyncio.create_task(self._publish_queue_positions(queues))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
 
-        if action == "resume":
-            control.resume_event.set()
-            run = self.db.get_run(run_id)
-            if run and run["status"] in {"paused", "pending"}:
-                self.db.update_run(run_id, status="running")
-            if control.task is None or control.task.done():
-                self.start_run(run_id)
-            await self._publish_run_state(run_id)
-            return {"status": "ok", "message": "Run resumed"}
+    async def _publish_queue_positions(self, queues: list[dict[str, Any]]) -> None:
+        for queue in queues:
+            await self.event_bus.publish(queue["runId"], "run_queued", {"queue": queue})
 
-        if action == "cancel":
-            control.cancel_requested = True
-            control.resume_event.set()
-            self.db.update_run(run_id, status="failed", ended_at=now_iso())
-            await self._publish_run_state(run_id)
-            return {"status": "ok", "message": "Run cancellation requested"}
+    async def apply_control(self, run_id: str, action: str) -> dict[str, Any]:
+        control = self._controls.setdefault(run_id, RunControl())
+
+        if action in BULK_CONTROL_ACTIONS:
+            await self.apply_control_many([run_id], action)
+            return {"status": "ok", "message": BULK_CONTROL_ACTIONS[action]}
 
         if action == "retry":
             self.db.reset_failed_steps_for_retry(run_id)
@@ -89,8 +193,63 @@ class RunOrchestrator:
 
         return {"status": "error", "message": f"Unknown action: {action}"}
 
+    async def apply_control_many(self, run_ids: list[str], action: str) -> None:
+        """Pause, resume or cancel `run_ids`, writing every status change in one transaction."""
+        controls = [self._controls.setdefault(run_id, RunControl()) for run_id in run_ids]
+        if action == "pause":
+            for run_id, control in zip(run_ids, controls):
+                control.resume_event.clear()
+                # A paused run gives up its place in the queue, or its slot if it was
+                # executing; resume re-submits it.
+                if not self.scheduler.remove(run_id):
+                    self.scheduler.suspend(run_id)
+            self.db.update_runs({run_id: {"status": "paused", "queued_at": None} for run_id in run_ids})
+        elif action == "resume":
+            self.start_runs(run_ids)
+            runs = self.db.get_runs(run_ids)
+            # Runs waiting for a scheduler slot stay pending until launched.
+            self.db.update_runs(
+                {
+                    run_id: {"status": "running" if self.scheduler.is_running(run_id) else "pending"}
+                    for run_id in run_ids
+                    if run_id in runs and runs[run_id]["status"] in {"paused", "pending"}
+                }
+            )
+        elif action == "cancel":
+            for run_id, control in zip(run_ids, controls):
+                control.cancel_requested = True
+                self.scheduler.remove(run_id)
+                control.resume_event.set()
+            ended_at = now_iso()
+            self.db.update_runs(
+                {run_id: {"status": "failed", "ended_at": ended_at, "queued_at": None} for run_id in run_ids}
+            )
+        else:
+            raise ValueError(f"Unsupported bulk action: {action}")
+
+        runs = self.db.get_runs(run_ids)
+        for run_id in run_ids:
+            if run_id in runs:
+                await self.event_bus.publish(run_id, "step_updated", {"run": runs[run_id]})
+
     def get_stats_view(self, run_id: str) -> dict[str, Any]:
-        stats = self.db.get_stats(run_id)
+        cached = self._stats_views.get(run_id)
+        if cached is not None:
+            self._stats_views.move_to_end(run_id)
+            return cached
+        return self._stats_view_from(run_id, self.db.get_stats(run_id))
+
+    def get_stats_views(self, run_ids: list[str]) -> dict[str, dict[str, Any]]:
+        """Stats views for many runs, loading every cache miss in one query."""
+        views = {run_id: self._stats_views[run_id] for run_id in run_ids if run_id in self._stats_views}
+        missing = [run_id for run_id in run_ids if run_id not in views]
+        if missing:
+            stats = self.db.get_stats_for_runs(missing)
+            for run_id in missing:
+                views[run_id] = self._stats_view_from(run_id, stats.get(run_id))
+        return views
+
+    def _stats_view_from(self, run_id: str, stats: dict[str, Any] | None) -> dict[str, Any]:
         if not stats:
             return {
                 "runId": run_id,
@@ -102,8 +261,43 @@ class RunOrchestrator:
                 "tokenCostUsd": 0,
                 "gpuHours": 0,
             }
+        view = {"runId": run_id, **self._format_stats(stats)}
+        self._cache_stats_view(run_id, view)
+        return view
+
+    def _cache_stats_view(self, run_id: str, view: dict[str, Any]) -> None:
+        self._stats_views[run_id] = view
+        self._stats_views.move_to_end(run_id)
+        if len(self._stats_views) > STATS_VIEW_CACHE_SIZE:
+            self._stats_views.popitem(last=False)
+
+    def get_project_stats_view(self, project_id: str) -> dict[str, Any]:
+        totals = self.db.aggregate_stats(project_id)
+        return {"projectId": project_id, "runs": totals["runs"], **self._format_stats(totals)}
+
+    def get_project_summaries(self) -> list[dict[str, Any]]:
+        return [
+            {
+                **summary["project"],
+                "latestRun": summary["latestRun"],
+                "currentStep": summary["currentStep"],
+                "stats": {
+                    "projectId": summary["project"]["id"],
+                    "runs": summary["runs"],
+                    **self._format_stats(summary["totals"]),
+                },
+            }
+            for summary in self.db.list_project_summaries()
+        ]
+
+    def get_step_stats_view(self, run_id: str) -> list[dict[str, Any]]:
+        return [
+            {"stepKey": item["stepKey"], "attempts": item["attempts"], **self._format_stats(item)}
+            for item in self.db.list_step_metrics(run_id)
+        ]
+
+    def _format_stats(self, stats: dict[str, Any]) -> dict[str, Any]:
         return {
-            "runId": run_id,
             "hypothesis": stats["hypothesis"],
             "papers": stats["papers"],
             "tokens": self._format_tokens(stats["tokens"]),
@@ -123,112 +317,52 @@ class RunOrchestrator:
 
         if run["startedAt"] is None:
             self.db.update_run(run_id, started_at=now_iso())
-        self.db.update_run(run_id, status="running")
+        self.db.update_run(run_id, status="running", worker_id=self.worker_id, queued_at=None)
 
         run = self.db.get_run(run_id)
         if run:
             await self.event_bus.publish(run_id, "run_started", {"run": run})
 
         steps = self.db.list_steps(run_id)
-        start_index = next((idx for idx, step in enumerate(steps) if step["status"] != "completed"), len(steps))
-
-        for index in range(start_index, len(steps)):
-            await control.resume_event.wait()
-            if control.cancel_requested:
-                self.db.update_run(run_id, status="failed", ended_at=now_iso())
-                run = self.db.get_run(run_id)
-                if run:
-                    await self.event_bus.publish(run_id, "run_failed", {"run": run, "reason": "cancelled"})
-                return
-
-            step = steps[index]
-            step_id = step["id"]
-            step_key = step["stepKey"]
-
-            success = False
-            attempt = 0
-            while not success and attempt <= self.max_retries:
-                if control.cancel_requested:
-                    await self._fail_run(run_id, reason="cancelled")
-                    return
-
-                attempt += 1
-                self.db.update_run(run_id, status="running", current_step_index=index)
-                self.db.update_step(step_id, status="running", started_at=now_iso(), ended_at=None, error_message=None)
-
-                current_step = self.db.get_step_by_key(run_id, step_key)
-                if current_step:
-                    await self.event_bus.publish(run_id, "step_updated", {"step": current_step})
-
-                result = self._execute_step(run, run_id, step_key, attempt)
-
-                for log in result.logs:
-                    job = self.db.add_job(
-                        run_id=run_id,
-                        step_id=step_id,
-                        title=log["title"],
-                        content=log["content"],
-                        status=log["status"],
-                        worked_for=log["workedFor"],
-                        source=log["source"],
-                        level=log["level"],
-                        raw=log["raw"],
-                    )
-                    await self.event_bus.publish(run_id, "job_log_appended", {"job": job})
-
-                self._update_stats(run_id, step_key, result.metrics)
-                await self.event_bus.publish(run_id, "stats_updated", {"stats": self.get_stats_view(run_id)})
-
-                for artifact_path in result.artifacts:
-                    try:
-                        rel_path = artifact_path.relative_to(self.workspace_root.parent)
-                    except ValueError:
-                        rel_path = artifact_path.name
-                    artifact = self.db.add_artifact(
-                        run_id=run_id,
-                        step_id=step_id,
-                        path=str(rel_path),
-                        size=artifact_path.stat().st_size,
-                        sha256=file_sha256(artifact_path),
-                    )
-                    await self.event_bus.publish(run_id, "artifact_created", {"artifact": artifact})
-
-                if control.cancel_requested:
-                    self.db.update_step(step_id, status="error", ended_at=now_iso(), error_message="Run cancelled by user")
-                    failed_step = self.db.get_step_by_key(run_id, step_key)
-                    if failed_step:
-                        await self.event_bus.publish(run_id, "step_updated", {"step": failed_step})
-                    await self._fail_run(run_id, reason="cancelled")
-                    return
-
-                if result.status == "success":
-                    self.db.update_step(step_id, status="completed", ended_at=now_iso(), error_message=None)
-                    completed_step = self.db.get_step_by_key(run_id, step_key)
-                    if completed_step:
-                        await self.event_bus.publish(run_id, "step_updated", {"step": completed_step})
-                    success = True
-                    continue
-
-                if result.retriable and attempt <= self.max_retries:
-                    self.db.update_step(
-                        step_id,
-                        status="error",
-                        error_message=f"{result.summary}; retry {attempt}/{self.max_retries}",
-                    )
-                    failed_step = self.db.get_step_by_key(run_id, step_key)
-                    if failed_step:
-                        await self.event_bus.publish(run_id, "step_updated", {"step": failed_step})
-                    await asyncio.sleep(0.4)
-                    continue
-
-                self.db.update_step(step_id, status="error", ended_at=now_iso(), error_message=result.summary)
-                failed_step = self.db.get_step_by_key(run_id, step_key)
-                if failed_step:
-                    await self.event_bus.publish(run_id, "step_updated", {"step": failed_step})
-                await self._fail_run(run_id, reason=result.summary)
-                return
-
-            steps = self.db.list_steps(run_id)
+        completed = {step["stepKey"] for step in steps if step["status"] == "completed"}
+        waiting = [step for step in steps if step["status"] != "completed"]
+        in_flight: dict[asyncio.Task[str | None], dict[str, Any]] = {}
+        failure: str | None = None
+
+        # Topological execution: every step whose dependencies have completed is
+        # started right away, so independent steps run concurrently.
+        while waiting or in_flight:
+            if failure is None:
+                for step in [step for step in waiting if STEP_DEPENDENCIES.get(step["stepKey"], frozenset()) <= completed]:
+                    waiting.remove(step)
+                    task = asyncio.create_task(self._run_step(run, run_id, step, steps.index(step), control))
+                    in_flight[task] = step
+            if not in_flight:
+                break
+
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            crashed = False
+            for task in done:
+                step = in_flight.pop(task)
+                error = task.exception()
+                if error is not None:
+                    crashed = True
+                    reason = f"{step['stepKey']} raised {type(error).__name__}: {error}"
+                    self.db.update_step(step["id"], status="error", ended_at=now_iso(), error_message=reason)
+                else:
+                    reason = task.result()
+                if reason is None:
+                    completed.add(step["stepKey"])
+                elif failure is None:
+                    failure = reason
+            if crashed:
+                await self._cancel_steps(in_flight)
+
+        if failure is None and waiting:
+            failure = "unsatisfiable step dependencies"
+        if failure is not None:
+            await self._fail_run(run_id, reason=failure)
+            return
 
         self.db.update_run(run_id, status="completed", ended_at=now_iso(), current_step_index=len(steps) - 1)
         run = self.db.get_run(run_id)
@@ -244,20 +378,257 @@ class RunOrchestrator:
                 },
             )
 
+    async def _run_step(
+        self,
+        run: dict[str, Any],
+        run_id: str,
+        step: dict[str, Any],
+        index: int,
+        control: RunControl,
+    ) -> str | None:
+        """Execute one step with retries; return None on success or the failure reason."""
+        await control.resume_event.wait()
+        if control.cancel_requested:
+            return "cancelled"
+
+        step_id = step["id"]
+        step_key = step["stepKey"]
+
+        attempt = 0
+        while attempt <= self.max_retries:
+            if control.cancel_requested:
+                return "cancelled"
+
+            attempt += 1
+            self.db.update_run(run_id, status="running", current_step_index=index)
+            self.db.update_step(step_id, status="running", started_at=now_iso(), ended_at=None, error_message=None)
+
+            current_step = self.db.get_step_by_key(run_id, step_key)
+            if current_step:
+                await self.event_bus.publish(run_id, "step_updated", {"step": current_step})
+
+            result = await self._execute_step_cached(run, run_id, step_id, step_key, attempt)
+            await self._append_logs(run_id, step_id, result.logs)
+
+            self._update_stats(run_id, step_id, step_key, attempt, result.metrics)
+            # Durable point: the attempt's logs and stats hit disk before it is reported.
+            self.db.flush()
+            await self.event_bus.publish(run_id, "stats_updated", {"stats": self.get_stats_view(run_id)})
+
+            if result.artifacts:
+                # Hashing reads every file, so registration runs off the event loop.
+                artifacts = await asyncio.get_running_loop().run_in_executor(
+                    self._step_executor,
+                    partial(self.artifacts.register, run_id, step_id, result.artifacts),
+                )
+                for artifact in artifacts:
+                    await self.event_bus.publish(run_id, "artifact_created", {"artifact": artifact})
+
+            if control.cancel_requested:
+                self.db.update_step(step_id, status="error", ended_at=now_iso(), error_message="Run cancelled by user")
+                failed_step = self.db.get_step_by_key(run_id, step_key)
+                if failed_step:
+                    await self.event_bus.publish(run_id, "step_updated", {"step": failed_step})
+                return "cancelled"
+
+            if result.status == "success":
+                self.db.update_step(step_id, status="completed", ended_at=now_iso(), error_message=None)
+                completed_step = self.db.get_step_by_key(run_id, step_key)
+                if completed_step:
+                    await self.event_bus.publish(run_id, "step_updated", {"step": completed_step})
+                return None
+
+            if result.retriable and attempt <= self.max_retries:
+                self.db.update_step(
+                    step_id,
+                    status="error",
+                    error_message=f"{result.summary}; retry {attempt}/{self.max_retries}",
+                )
+                failed_step = self.db.get_step_by_key(run_id, step_key)
+                if failed_step:
+                    await self.event_bus.publish(run_id, "step_updated", {"step": failed_step})
+                await asyncio.sleep(0.4)
+                continue
+
+            self.db.update_step(step_id, status="error", ended_at=now_iso(), error_message=result.summary)
+            failed_step = self.db.get_step_by_key(run_id, step_key)
+            if failed_step:
+                await self.event_bus.publish(run_id, "step_updated", {"step": failed_step})
+            return result.summary
+
+        return "retries exhausted"
+
+    def step_workspace(self, run: dict[str, Any], run_id: str, step_key: str) -> Path:
+        return self.workspace_root / run["projectId"] / run_id / step_key
+
     async def _publish_run_state(self, run_id: str) -> None:
         run = self.db.get_run(run_id)
         if run:
             await self.event_bus.publish(run_id, "step_updated", {"run": run})
 
+    async def _cancel_steps(self, in_flight: dict[asyncio.Task[str | None], dict[str, Any]]) -> None:
+        """Cancel sibling steps after one crashed; they are marked failed so retry reruns them."""
+        for task in in_flight:
+            task.cancel()
+        await asyncio.gather(*in_flight, return_exceptions=True)
+        ended_at = now_iso()
+        for step in in_flight.values():
+            self.db.update_step(step["id"], status="error", ended_at=ended_at, error_message="cancelled")
+        in_flight.clear()
+
     async def _fail_run(self, run_id: str, reason: str) -> None:
         self.db.update_run(run_id, status="failed", ended_at=now_iso())
         failed_run = self.db.get_run(run_id)
         if failed_run:
             await self.event_bus.publish(run_id, "run_failed", {"run": failed_run, "reason": reason})
 
-    def _execute_step(self, run: dict[str, Any], run_id: str, step_key: str, attempt: int):
-        workspace_dir = self.workspace_root / run["projectId"] / run_id / step_key
+    async def _append_logs(self, run_id: str, step_id: str, logs: list[dict[str, str]]) -> None:
+        for log in logs:
+            job = self.db.add_job(
+                run_id=run_id,
+                step_id=step_id,
+                title=log["title"],
+                content=log["content"],
+                status=log["status"],
+                worked_for=log["workedFor"],
+                source=log["source"],
+                level=log["level"],
+                raw=log["raw"],
+            )
+            await self.event_bus.publish(run_id, "job_log_appended", {"job": job})
+
+    async def _execute_step_cached(
+        self,
+        run: dict[str, Any],
+        run_id: str,
+        step_id: str,
+        step_key: str,
+        attempt: int,
+    ) -> StepExecutionResult:
+        """Reuse a cached result for the step if one matches, otherwise execute and cache it."""
+        if not (self.step_cache.enabled and run.get("stepCache", True)):
+            return await self._execute_step_off_loop(run, run_id, step_id, step_key, attempt)
+
+        loop = asyncio.get_running_loop()
+        key, cached = await loop.run_in_executor(
+            self._step_executor,
+            partial(self._lookup_cached_step, run, run_id, step_key, attempt),
+        )
+        if cached is not None:
+            return cached
+
+        result = await self._execute_step_off_loop(run, run_id, step_id, step_key, attempt)
+        if result.status == "success":
+            await loop.run_in_executor(
+                self._step_executor,
+                partial(
+                    self.step_cache.store,
+                    key,
+                    step_key,
+                    self.runner.version(),
+                    self.step_workspace(run, run_id, step_key),
+                    result,
+                ),
+            )
+        return result
+
+    def _lookup_cached_step(
+        self,
+        run: dict[str, Any],
+        run_id: str,
+        step_key: str,
+        attempt: int,
+    ) -> tuple[str, StepExecutionResult | None]:
+        workspace_dir, task_spec = self._prepare_step(run, run_id, step_key)
+        key = step_cache_key(task_spec, self._step_inputs(run_id, step_key), self.runner.version())
+        cached = self.step_cache.lookup(key, workspace_dir)
+        if cached is None:
+            return key, None
+
+        # Reused results cost no tokens; the original execution's metrics are not re-billed.
+        result = StepExecutionResult(
+            status="success",
+            summary=cached.summary,
+            logs=[
+                {
+                    "title": "Step Cache",
+                    "content": f"Reused cached result for {step_key}: {cached.summary}",
+                    "status": "completed",
+                    "workedFor": "<1s",
+                    "source": "step-cache",
+                    "level": "info",
+                    "raw": json.dumps({"key": key, "metrics": cached.metrics}, ensure_ascii=False),
+                }
+            ],
+            artifacts=cached.artifacts,
+            metrics={},
+            retriable=False,
+        )
+        self._write_checkpoint(workspace_dir, step_key, attempt, result)
+        return key, result
+
+    def _step_inputs(self, run_id: str, step_key: str) -> list[tuple[str, str]]:
+        """`(step key, sha256)` of the run's artifacts produced by steps upstream of `step_key`."""
+        upstream = STEP_UPSTREAM.get(step_key, frozenset())
+        if not upstream:
+            return []
+        step_keys = {step["id"]: step["stepKey"] for step in self.db.list_steps(run_id)}
+        return [
+            (step_keys[artifact["stepId"]], artifact["sha256"])
+            for artifact in self.db.list_artifacts(run_id)
+            if step_keys.get(artifact["stepId"]) in upstream
+        ]
+
+    async def _execute_step_off_loop(
+        self,
+        run: dict[str, Any],
+        run_id: str,
+        step_id: str,
+        step_key: str,
+        attempt: int,
+    ) -> StepExecutionResult:
+        loop = asyncio.get_running_loop()
+        async with self._step_slots:
+            if self.runner.streams_output():
+                # Real Codex runs as a native asyncio subprocess; its output is
+                # persisted as job logs while the step is still running. Workspace
+                # file I/O around it still goes to the pool.
+                workspace_dir, _task_spec = await loop.run_in_executor(
+                    self._step_executor,
+                    partial(self._prepare_step, run, run_id, step_key),
+                )
+                result = await self.runner.run_step_streaming(
+                    task_file=workspace_dir / TASK_SPEC_FILE,
+                    workspace_dir=workspace_dir,
+                    on_logs=partial(self._append_logs, run_id, step_id),
+                )
+                await loop.run_in_executor(
+                    self._step_executor,
+                    partial(self._write_checkpoint, workspace_dir, step_key, attempt, result),
+                )
+                return result
+
+            return await loop.run_in_executor(
+                self._step_executor,
+                partial(self._execute_step, run, run_id, step_key, attempt),
+            )
+
+    def _execute_step(self, run: dict[str, Any], run_id: str, step_key: str, attempt: int) -> StepExecutionResult:
+        workspace_dir, task_spec = self._prepare_step(run, run_id, step_key)
+        result = self.runner.run_step(
+            task_spec=task_spec,
+            step_key=step_key,
+            workspace_dir=workspace_dir,
+            attempt=attempt,
+        )
+        self._write_checkpoint(workspace_dir, step_key, attempt, result)
+        return result
+
+    def _prepare_step(self, run: dict[str, Any], run_id: str, step_key: str) -> tuple[Path, dict[str, Any]]:
+        workspace_dir = self.step_workspace(run, run_id, step_key)
         workspace_dir.mkdir(parents=True, exist_ok=True)
+        # Files left by an earlier attempt may be read-only links into the object store.
+        self.artifacts.release(workspace_dir)
 
         task_spec = {
             "goal": f"Complete step {step_key}",
@@ -276,30 +647,28 @@ class RunOrchestrator:
             "acceptance_checks": ["emit_openfars_result_block"],
         }
 
-        task_file = workspace_dir / "task_spec.json"
-        task_file.write_text(json.dumps(task_spec, indent=2, ensure_ascii=False), encoding="utf-8")
-
-        result = self.runner.run_step(
-            task_spec=task_spec,
-            step_key=step_key,
-            workspace_dir=workspace_dir,
-            attempt=attempt,
-        )
+        write_task_spec(workspace_dir, task_spec)
+        return workspace_dir, task_spec
 
+    @staticmethod
+    def _write_checkpoint(workspace_dir: Path, step_key: str, attempt: int, result: StepExecutionResult) -> None:
+        root = workspace_dir.resolve()
+        artifacts = []
+        for path in result.artifacts:
+            try:
+                artifacts.append(path.resolve().relative_to(root).as_posix())
+            except ValueError:
+                continue
         checkpoint = {
             "step": step_key,
             "attempt": attempt,
             "status": result.status,
             "summary": result.summary,
+            "artifacts": artifacts,
         }
         (workspace_dir / "step_state.json").write_text(json.dumps(checkpoint, indent=2), encoding="utf-8")
-        return result
-
-    def _update_stats(self, run_id: str, step_key: str, metrics: dict[str, Any]) -> None:
-        stats = self.db.get_stats(run_id)
-        if not stats:
-            return
 
+    def _update_stats(self, run_id: str, step_id: str, step_key: str, attempt: int, metrics: dict[str, Any]) -> None:
         hypothesis_increment = 0
         papers_increment = 0
         if step_key == "topic_scoping":
@@ -309,16 +678,20 @@ class RunOrchestrator:
         elif step_key in {"hypothesis_generation", "experiment_planning"}:
             hypothesis_increment = 18
 
-        updated = {
-            "hypothesis": stats["hypothesis"] + hypothesis_increment,
-            "papers": stats["papers"] + papers_increment,
-            "tokens": stats["tokens"] + int(metrics.get("tokens", 0)),
-            "cost_usd": stats["costUsd"] + float(metrics.get("cost_usd", 0.0)),
-            "elapsed_seconds": stats["elapsedSeconds"] + 12,
-            "token_cost_usd": stats["tokenCostUsd"] + float(metrics.get("token_cost_usd", 0.0)),
-            "gpu_hours": stats["gpuHours"] + float(metrics.get("gpu_hours", 0.0)),
-        }
-        self.db.update_stats(run_id, **updated)
+        self._stats_views.pop(run_id, None)
+        self.db.record_step_metrics(
+            run_id,
+            step_id,
+            step_key,
+            attempt,
+            hypothesis=hypothesis_increment,
+            papers=papers_increment,
+            tokens=int(metrics.get("tokens", 0)),
+            cost_usd=float(metrics.get("cost_usd", 0.0)),
+            elapsed_seconds=12,
+            token_cost_usd=float(metrics.get("token_cost_usd", 0.0)),
+            gpu_hours=float(metrics.get("gpu_hours", 0.0)),
+        )
 
     @staticmethod
     def _format_tokens(value: int) -> str:
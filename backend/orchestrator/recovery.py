@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from backend.orchestrator.engine import RunOrchestrator
+from backend.storage import now_iso
+
+logger = logging.getLogger(__name__)
+
+# Step statuses that mean an attempt was in flight when the worker stopped. `error`
+# here is a failed attempt waiting for its retry, since the run itself is unfinished.
+INTERRUPTED_STEP_STATUSES = ("running", "error")
+
+
+class RunRecovery:
+    """Take over runs left unfinished by a worker that stopped.
+
+    Each orchestrator heartbeats a `workers` row, and runs record the worker that
+    launched them. On start and on every heartbeat, unfinished runs whose worker has
+    no recent heartbeat are claimed and their interrupted steps reconciled with the
+    `step_state.json` checkpoints. Running and queued runs are then resubmitted to the
+    scheduler with their queue priority, which bounds how many execute at once; paused
+    ones stay paused until resumed. Completed steps are never executed again.
+    """
+
+    def __init__(
+        self,
+        orchestrator: RunOrchestrator,
+        heartbeat_interval: float | None = None,
+        stale_after: float | None = None,
+    ) -> None:
+        self.orchestrator = orchestrator
+        self.db = orchestrator.db
+        self.heartbeat_interval = heartbeat_interval or float(os.getenv("OPENFARS_WORKER_HEARTBEAT_S", "10"))
+        # A worker is presumed gone after missing a few heartbeats.
+        self.stale_after = stale_after or 3 * self.heartbeat_interval
+        self._heartbeat_task: asyncio.Task[None] | None = None
+
+    async def start(self) -> list[str]:
+        """Register this worker, recover orphaned runs and keep heartbeating."""
+        self.db.heartbeat_worker(self.orchestrator.worker_id)
+        recovered = await self.recover()
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        return recovered
+
+    def close(self) -> None:
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+        # Leaving releases this worker's unfinished runs to the others right away.
+        self.db.remove_worker(self.orchestrator.worker_id)
+
+    async def recover(self) -> list[str]:
+        """Claim and resume orphaned runs; return their ids."""
+        loop = asyncio.get_running_loop()
+        claimed = await loop.run_in_executor(None, self._claim_and_reconcile)
+        resumed = [(run["id"], priority) for run, priority in claimed if run["status"] != "paused"]
+        self.orchestrator.start_runs([run_id for run_id, _ in resumed], [priority for _, priority in resumed])
+        for run, _priority in claimed:
+            await self.orchestrator.event_bus.publish(run["id"], "step_updated", {"run": run})
+        return [run["id"] for run, _priority in claimed]
+
+    async def _heartbeat(self) -> None:
+        # A failed beat (e.g. `database is locked`) must not end the loop: without
+        # heartbeats other workers would claim and re-execute this worker's runs.
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                self.db.heartbeat_worker(self.orchestrator.worker_id)
+                await self.recover()
+            except Exception:
+                logger.exception("Worker heartbeat of %s failed; retrying", self.orchestrator.worker_id)
+
+    def _claim_and_reconcile(self) -> list[tuple[dict[str, Any], int]]:
+        stale_before = (datetime.now(timezone.utc) - timedelta(seconds=self.stale_after)).isoformat()
+        runs = self.db.claim_orphaned_runs(self.orchestrator.worker_id, stale_before)
+        for run in runs:
+            self._reconcile_run(run)
+        current = self.db.get_runs([run["id"] for run in runs])
+        return [(current[run["id"]], run["queuePriority"]) for run in runs if run["id"] in current]
+
+    def _reconcile_run(self, run: dict[str, Any]) -> None:
+        run_id = run["id"]
+        recorded = {artifact["path"] for artifact in self.db.list_artifacts(run_id)}
+        for step in self.db.list_steps(run_id):
+            if step["status"] not in INTERRUPTED_STEP_STATUSES:
+                continue
+            checkpoint = self._read_checkpoint(run, step["stepKey"])
+            if self._attempt_finished(run_id, step["stepKey"], checkpoint):
+                self._complete_step(run, step, checkpoint, recorded)
+            else:
+                self.db.update_step(step["id"], status="pending", started_at=None, ended_at=None, error_message=None)
+        if run["status"] == "running":
+            # `_execute_run` marks it running again once the scheduler launches it.
+            self.db.update_run(run_id, status="pending")
+
+    def _attempt_finished(self, run_id: str, step_key: str, checkpoint: dict[str, Any] | None) -> bool:
+        # The checkpoint is written before the attempt's logs, stats and artifacts are
+        # recorded; the metrics ledger entry proves the orchestrator got that far.
+        if not checkpoint or checkpoint.get("status") != "success":
+            return False
+        return self.db.has_step_metrics(run_id, step_key, int(checkpoint.get("attempt", 0)))
+
+    def _complete_step(
+        self,
+        run: dict[str, Any],
+        step: dict[str, Any],
+        checkpoint: dict[str, Any],
+        recorded: set[str],
+    ) -> None:
+        workspace_dir = self.orchestrator.step_workspace(run, run["id"], step["stepKey"])
+        artifacts = self.orchestrator.artifacts
+        missing = [
+            path
+            for path in (workspace_dir / name for name in checkpoint.get("artifacts", []))
+            if path.is_file() and artifacts.record_path(path) not in recorded
+        ]
+        artifacts.register(run["id"], step["id"], missing)
+        self.db.update_step(step["id"], status="completed", ended_at=now_iso(), error_message=None)
+
+    def _read_checkpoint(self, run: dict[str, Any], step_key: str) -> dict[str, Any] | None:
+        path = self.orchestrator.step_workspace(run, run["id"], step_key) / "step_state.json"
+        try:
+            checkpoint = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return checkpoint if isinstance(checkpoint, dict) else None
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Callable
+
+
+@dataclass
+class QueuedRun:
+    run_id: str
+    project_id: str
+    priority: int
+    seq: int
+
+    def sort_key(self) -> tuple[int, int]:
+        return (-self.priority, self.seq)
+
+
+class RunScheduler:
+    """Admission control for runs with global and per-project slot limits.
+
+    Pending runs wait in per-project priority queues. When a slot frees up the next
+    run is taken from the eligible project with the fewest running runs (fair share),
+    then by priority, then FIFO.
+
+    A paused run is `suspend`ed: its task stays alive but its slot goes to the queue.
+    Submitting it again queues it like any other run; once dispatched, `resume` is
+    called instead of launching a second task.
+    """
+
+    def __init__(
+        self,
+        launch: Callable[[str], asyncio.Task[Any]],
+        max_running: int,
+        max_running_per_project: int,
+        on_positions_changed: Callable[[dict[str, int]], None] | None = None,
+        resume: Callable[[str], None] | None = None,
+    ) -> None:
+        self._launch = launch
+        self._resume = resume
+        self.max_running = max(1, max_running)
+        self.max_running_per_project = max(1, max_running_per_project)
+        self._on_positions_changed = on_positions_changed
+        self._queues: dict[str, list[QueuedRun]] = defaultdict(list)
+        self._queued: dict[str, QueuedRun] = {}
+        self._running: dict[str, str] = {}
+        self._running_per_project: dict[str, int] = defaultdict(int)
+        self._suspended: dict[str, str] = {}
+        self._seq = itertools.count()
+        self._positions: dict[str, int] = {}
+
+    def submit(self, run_id: str, project_id: str, priority: int = 0) -> None:
+        if run_id in self._queued or run_id in self._running:
+            return
+        entry = QueuedRun(run_id=run_id, project_id=project_id, priority=priority, seq=next(self._seq))
+        self._queued[run_id] = entry
+        self._queues[project_id].append(entry)
+        self._queues[project_id].sort(key=QueuedRun.sort_key)
+        self._dispatch()
+
+    def remove(self, run_id: str) -> bool:
+        entry = self._queued.pop(run_id, None)
+        if entry is None:
+            return False
+        queue = self._queues[entry.project_id]
+        queue.remove(entry)
+        if not queue:
+            del self._queues[entry.project_id]
+        self._dispatch()
+        return True
+
+    def suspend(self, run_id: str) -> bool:
+        """Give a running run's slot back to the queue until it is submitted again."""
+        project_id = self._running.get(run_id)
+        if project_id is None:
+            return False
+        self._free_slot(run_id)
+        self._suspended[run_id] = project_id
+        self._dispatch()
+        return True
+
+    def is_suspended(self, run_id: str) -> bool:
+        return run_id in self._suspended
+
+    def is_queued(self, run_id: str) -> bool:
+        return run_id in self._queued
+
+    def is_running(self, run_id: str) -> bool:
+        return run_id in self._running
+
+    def queue_position(self, run_id: str) -> int | None:
+        """1-based position in the projected dispatch order, or None if not queued."""
+        return self._positions.get(run_id)
+
+    def queue_info(self, run_id: str) -> dict[str, Any]:
+        if run_id in self._running:
+            state = "running"
+        elif run_id in self._queued:
+            state = "queued"
+        elif run_id in self._suspended:
+            state = "paused"
+        else:
+            state = "idle"
+        return {
+            "runId": run_id,
+            "state": state,
+            "position": self._positions.get(run_id),
+            "queued": len(self._queued),
+            "running": len(self._running),
+            "maxRunning": self.max_running,
+            "maxRunningPerProject": self.max_running_per_project,
+        }
+
+    def _dispatch(self) -> None:
+        while len(self._running) < self.max_running:
+            entry = self._next_eligible()
+            if entry is None:
+                break
+            self._start(entry)
+        self._refresh_positions()
+
+    def _next_eligible(self) -> QueuedRun | None:
+        best: QueuedRun | None = None
+        best_key: tuple[int, int, int] | None = None
+        for project_id, queue in self._queues.items():
+            running = self._running_per_project[project_id]
+            if running >= self.max_running_per_project:
+                continue
+            head = queue[0]
+            key = (running, *head.sort_key())
+            if best_key is None or key < best_key:
+                best, best_key = head, key
+        return best
+
+    def _start(self, entry: QueuedRun) -> None:
+        del self._queued[entry.run_id]
+        queue = self._queues[entry.project_id]
+        queue.pop(0)
+        if not queue:
+            del self._queues[entry.project_id]
+
+        self._running[entry.run_id] = entry.project_id
+        self._running_per_project[entry.project_id] += 1
+        if self._suspended.pop(entry.run_id, None) is not None:
+            # The run's task is still alive, waiting to be resumed.
+            if self._resume is not None:
+                self._resume(entry.run_id)
+            return
+        task = self._launch(entry.run_id)
+        task.add_done_callback(lambda _task: self._release(entry.run_id))
+
+    def _release(self, run_id: str) -> None:
+        if self._suspended.pop(run_id, None) is not None:
+            # Finished while paused (e.g. cancelled); it may have been queued to resume.
+            self.remove(run_id)
+            return
+        if self._free_slot(run_id):
+            self._dispatch()
+
+    def _free_slot(self, run_id: str) -> bool:
+        project_id = self._running.pop(run_id, None)
+        if project_id is None:
+            return False
+        self._running_per_project[project_id] -= 1
+        if self._running_per_project[project_id] <= 0:
+            del self._running_per_project[project_id]
+        return True
+
+    def _refresh_positions(self) -> None:
+        # Project the dispatch order assuming no run finishes: repeatedly pick the
+        # project with the fewest (running + already projected) runs.
+        heap: list[tuple[int, int, int, str, int]] = []
+        for project_id, queue in self._queues.items():
+            head = queue[0]
+            heapq.heappush(heap, (self._running_per_project[project_id], *head.sort_key(), project_id, 0))
+
+        positions: dict[str, int] = {}
+        while heap:
+            load, _priority, _seq, project_id, index = heapq.heappop(heap)
+            queue = self._queues[project_id]
+            positions[queue[index].run_id] = len(positions) + 1
+            if index + 1 < len(queue):
+                head = queue[index + 1]
+                heapq.heappush(heap, (load + 1, *head.sort_key(), project_id, index + 1))
+
+        changed = {run_id: pos for run_id, pos in positions.items() if self._positions.get(run_id) != pos}
+        self._positions = positions
+        if changed and self._on_positions_changed is not None:
+            self._on_positions_changed(changed)
@@ -9,20 +9,63 @@ class StepDefinition:
     number: int
     title: str
     codex_enabled: bool
+    depends_on: tuple[str, ...] = ()
 
 
 STEP_DEFINITIONS: list[StepDefinition] = [
     StepDefinition("topic_scoping", 1, "Topic Scoping", False),
     StepDefinition("literature_review", 2, "Literature Review", False),
-    StepDefinition("hypothesis_generation", 3, "Hypothesis Generation", True),
-    StepDefinition("experiment_planning", 4, "Experiment Planning", True),
-    StepDefinition("code_and_execute", 5, "Code and Execute", True),
-    StepDefinition("result_analysis", 6, "Result Analysis", True),
-    StepDefinition("paper_drafting", 7, "Paper Drafting", True),
-    StepDefinition("final_packaging", 8, "Final Packaging", False),
+    StepDefinition("hypothesis_generation", 3, "Hypothesis Generation", True, ("topic_scoping", "literature_review")),
+    StepDefinition("experiment_planning", 4, "Experiment Planning", True, ("hypothesis_generation",)),
+    StepDefinition("code_and_execute", 5, "Code and Execute", True, ("experiment_planning",)),
+    StepDefinition("result_analysis", 6, "Result Analysis", True, ("code_and_execute",)),
+    StepDefinition("paper_drafting", 7, "Paper Drafting", True, ("result_analysis",)),
+    StepDefinition("final_packaging", 8, "Final Packaging", False, ("paper_drafting",)),
 ]
 
 
+def topological_order(steps: list[StepDefinition]) -> list[StepDefinition]:
+    """Order steps so every step follows its dependencies; raise on unknown keys or cycles."""
+    by_key = {step.key: step for step in steps}
+    ordered: list[StepDefinition] = []
+    visiting: set[str] = set()
+    done: set[str] = set()
+
+    def visit(step: StepDefinition) -> None:
+        if step.key in done:
+            return
+        if step.key in visiting:
+            raise ValueError(f"Step dependency cycle at {step.key}")
+        visiting.add(step.key)
+        for dependency in step.depends_on:
+            if dependency not in by_key:
+                raise ValueError(f"Step {step.key} depends on unknown step {dependency}")
+            visit(by_key[dependency])
+        visiting.remove(step.key)
+        done.add(step.key)
+        ordered.append(step)
+
+    for step in sorted(steps, key=lambda item: item.number):
+        visit(step)
+    return ordered
+
+
+STEP_DEPENDENCIES: dict[str, frozenset[str]] = {
+    step.key: frozenset(step.depends_on) for step in topological_order(STEP_DEFINITIONS)
+}
+
+
+def _upstream_steps() -> dict[str, frozenset[str]]:
+    upstream: dict[str, frozenset[str]] = {}
+    for step in topological_order(STEP_DEFINITIONS):
+        upstream[step.key] = frozenset(step.depends_on).union(*(upstream[key] for key in step.depends_on))
+    return upstream
+
+
+# Every step a step transitively depends on, i.e. whose outputs it may read.
+STEP_UPSTREAM: dict[str, frozenset[str]] = _upstream_steps()
+
+
 def step_definitions_as_dict() -> list[dict[str, object]]:
     return [
         {
@@ -30,6 +73,7 @@ def step_definitions_as_dict() -> list[dict[str, object]]:
             "number": step.number,
             "title": step.title,
             "codex_enabled": step.codex_enabled,
+            "depends_on": list(step.depends_on),
         }
         for step in STEP_DEFINITIONS
     ]
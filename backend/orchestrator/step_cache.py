@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+from backend.artifact_manager.manager import ArtifactManager
+from backend.codex_runner.runner import StepExecutionResult
+from backend.storage import Database
+
+# Task spec context that only identifies which run a step belongs to, not what it
+# computes; it is the only part of the spec left out of the key. The project stays
+# in: results are never shared between projects.
+RUN_SCOPED_CONTEXT = ("run_id",)
+
+
+def step_cache_key(task_spec: dict[str, Any], inputs: list[tuple[str, str]], runner_version: str) -> str:
+    """Content hash of everything that determines a step's result.
+
+    The key covers the whole task spec Codex is given (goal, constraints, allowed
+    actions, expected outputs, acceptance checks and the context minus
+    `RUN_SCOPED_CONTEXT`), the `(producing step key, sha256)` pairs of the upstream
+    artifacts the step can read, and `runner_version`. Changing any spec field is a
+    miss. Specs are currently built from the project and step alone, so a step with no
+    upstream artifacts is reused across a project's runs until the spec template or
+    `RUNNER_VERSION` changes; runs created with `stepCache: false` always execute.
+    """
+    spec = dict(task_spec)
+    context = spec.get("context")
+    if isinstance(context, dict):
+        spec["context"] = {key: value for key, value in context.items() if key not in RUN_SCOPED_CONTEXT}
+    material = json.dumps(
+        {"spec": spec, "inputs": sorted(inputs), "runner": runner_version},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CachedStep:
+    summary: str
+    metrics: dict[str, Any]
+    artifacts: list[Path]
+
+
+class StepCache:
+    """Reuse successful step results whose task spec, inputs and runner are unchanged.
+
+    Entries live in the `step_cache` table and hold the parsed result, its metrics and
+    references to the artifacts it produced. Stored artifacts are ingested into the
+    object store, and a hit links them into the new step workspace from there (copying
+    the recorded source, after checking its hash, when the store has no such object);
+    an entry whose artifacts are gone or changed is dropped. Entries expire
+    `ttl_seconds` after they were stored and the least recently used are evicted
+    beyond `max_entries`.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        artifacts: ArtifactManager,
+        enabled: bool | None = None,
+        ttl_seconds: int | None = None,
+        max_entries: int | None = None,
+    ) -> None:
+        self.db = db
+        self.artifacts = artifacts
+        self.artifact_root = artifacts.artifact_root.resolve()
+        self.enabled = enabled if enabled is not None else os.getenv("OPENFARS_STEP_CACHE", "1") != "0"
+        self.ttl_seconds = ttl_seconds or int(os.getenv("OPENFARS_STEP_CACHE_TTL_S", str(7 * 24 * 3600)))
+        self.max_entries = max(1, max_entries or int(os.getenv("OPENFARS_STEP_CACHE_MAX_ENTRIES", "10000")))
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.saved_tokens = 0
+        self.saved_cost_usd = 0.0
+        # Lookups and stores run on step worker threads.
+        self._lock = threading.Lock()
+
+    def lookup(self, key: str, workspace_dir: Path) -> CachedStep | None:
+        """The cached result for `key` with its artifacts restored into `workspace_dir`."""
+        entry = self.db.get_step_cache_entry(key)
+        if entry is not None and entry["createdAt"] < self._expiry_cutoff():
+            self.db.delete_step_cache_entry(key)
+            entry = None
+        artifacts = self._restore_artifacts(entry["result"]["artifacts"], workspace_dir) if entry else None
+        if entry is None or artifacts is None:
+            if entry is not None:
+                self.db.delete_step_cache_entry(key)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        self.db.touch_step_cache_entry(key)
+        result = entry["result"]
+        metrics = result.get("metrics", {})
+        with self._lock:
+            self.hits += 1
+            self.saved_tokens += int(metrics.get("tokens", 0))
+            self.saved_cost_usd += float(metrics.get("cost_usd", 0.0))
+        return CachedStep(summary=result["summary"], metrics=metrics, artifacts=artifacts)
+
+    def store(
+        self,
+        key: str,
+        step_key: str,
+        runner_version: str,
+        workspace_dir: Path,
+        result: StepExecutionResult,
+    ) -> None:
+        """Remember a successful result; results with artifacts outside the workspace are skipped."""
+        if result.status != "success":
+            return
+        artifacts = []
+        workspace_dir = workspace_dir.resolve()
+        for item in self.artifacts.ingest(path.resolve() for path in result.artifacts):
+            try:
+                name = item.path.relative_to(workspace_dir).as_posix()
+                source = item.path.relative_to(self.artifact_root).as_posix()
+            except ValueError:
+                return
+            artifacts.append({"name": name, "path": source, "size": item.size, "sha256": item.sha256})
+
+        self.db.put_step_cache_entry(
+            key,
+            step_key,
+            runner_version,
+            {"status": result.status, "summary": result.summary, "metrics": result.metrics, "artifacts": artifacts},
+        )
+        evicted = self.db.evict_step_cache(self._expiry_cutoff(), self.max_entries)
+        with self._lock:
+            self.stores += 1
+            self.evictions += evicted
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            counters = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "savedTokens": self.saved_tokens,
+                "savedCostUsd": round(self.saved_cost_usd, 4),
+            }
+        stored = self.db.step_cache_summary()
+        return {
+            "enabled": self.enabled,
+            "entries": stored["entries"],
+            "totalHits": stored["hits"],
+            "ttlSeconds": self.ttl_seconds,
+            "maxEntries": self.max_entries,
+            **counters,
+        }
+
+    def _restore_artifacts(self, artifacts: list[dict[str, Any]], workspace_dir: Path) -> list[Path] | None:
+        restored: list[Path] = []
+        for artifact in artifacts:
+            target = workspace_dir / artifact["name"]
+            if self.artifacts.materialize(artifact["sha256"], artifact["size"], target):
+                restored.append(target)
+                continue
+            source = self.artifact_root / artifact["path"]
+            if not source.is_file() or source.stat().st_size != artifact["size"]:
+                return None
+            # Fingerprints make this check free for sources unchanged since they were hashed.
+            if self.artifacts.digest(source).sha256 != artifact["sha256"]:
+                return None
+            if source.resolve() != target.resolve():
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(source, target)
+            restored.append(target)
+        return restored
+
+    def _expiry_cutoff(self) -> str:
+        return (datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)).isoformat()
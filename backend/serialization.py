@@ -0,0 +1,52 @@
+"""JSON encoding for API responses and websocket messages.
+
+Uses orjson when it is installed (and `OPENFARS_JSON` is not `stdlib`), falling back
+to the standard library otherwise. Both produce compact UTF-8 JSON.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without the optional dependency
+    orjson = None
+
+if os.getenv("OPENFARS_JSON", "").lower() == "stdlib":
+    orjson = None
+
+FAST_JSON = orjson is not None
+
+
+def dumps_bytes(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps(value: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def loads(data: str | bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """`JSONResponse` rendered with `dumps_bytes`.
+
+    Returning one directly from a route also skips FastAPI's `jsonable_encoder`
+    pass, which dominates the cost of large payloads made of plain dicts.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content)
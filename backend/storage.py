@@ -1,192 +1,574 @@
 from __future__ import annotations
 
+import base64
+import hashlib
+import json
+import os
 import sqlite3
 import threading
+import time
 import uuid
+import zlib
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterator
+
+
+JOB_COLUMNS = "id, run_id, step_id, time, title, content, status, worked_for, source, level, raw, raw_ref, created_at"
+
+# Job `raw` payloads longer than this move to the content-addressed `blobs` table;
+# the job row keeps the first `RAW_PREVIEW_CHARS` characters and the blob hash.
+RAW_INLINE_MAX_CHARS = 512
+RAW_PREVIEW_CHARS = 200
+
+STATS_COUNTERS = (
+    "hypothesis",
+    "papers",
+    "tokens",
+    "cost_usd",
+    "elapsed_seconds",
+    "token_cost_usd",
+    "gpu_hours",
+)
+
+
+# Stay well below SQLITE_MAX_VARIABLE_NUMBER when expanding `IN (...)` lists.
+IN_CLAUSE_CHUNK = 500
 
 
 def now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+def encode_blob(text: str) -> tuple[str, int, str, bytes]:
+    """`(sha256, size, encoding, data)` for storing `text` in `blobs`, gzip-compressed when that helps."""
+    data = text.encode("utf-8")
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    compressed = compressor.compress(data) + compressor.flush()
+    if len(compressed) < len(data):
+        return hashlib.sha256(data).hexdigest(), len(data), "gzip", compressed
+    return hashlib.sha256(data).hexdigest(), len(data), "identity", data
+
+
+def decode_blob(encoding: str, data: bytes) -> str:
+    return (zlib.decompress(data, 31) if encoding == "gzip" else data).decode("utf-8")
+
+
+def encode_job_cursor(job: dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(f"{job['createdAt']}|{job['id']}".encode()).decode()
+
+
+def decode_job_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        created_at, job_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("Invalid job cursor") from exc
+    return created_at, job_id
+
+
+# Row-value assignments that rebuild parts of a `project_rollups` row from the source
+# tables. Used by the backfill migration and to refresh one project after a write.
+ROLLUP_LATEST_ASSIGNMENT = """
+    (latest_run_id, latest_run_status, latest_run_created_at,
+     current_step_key, current_step_title, current_step_number, current_step_status) = (
+        SELECT r.id, r.status, r.created_at, st.step_key, st.title, st.number, st.status
+        FROM runs r LEFT JOIN steps st ON st.run_id = r.id AND st.number = r.current_step_index + 1
+        WHERE r.project_id = project_rollups.project_id
+        ORDER BY r.created_at DESC, r.rowid DESC LIMIT 1
+    )
+"""
+ROLLUP_TOTALS_ASSIGNMENT = f"""
+    (runs, {", ".join(STATS_COUNTERS)}) = (
+        SELECT COUNT(*), {", ".join(f"COALESCE(SUM(s.{key}), 0)" for key in STATS_COUNTERS)}
+        FROM runs r LEFT JOIN stats s ON s.run_id = r.id
+        WHERE r.project_id = project_rollups.project_id
+    )
+"""
+
+# Schema migrations applied in order by `Database.initialize`; the applied version is
+# tracked in `PRAGMA user_version`. Append new entries, never edit released ones.
+MIGRATIONS: list[tuple[int, str]] = [
+    (
+        1,
+        """
+    CREATE TABLE IF NOT EXISTS projects (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        status TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS runs (
+        id TEXT PRIMARY KEY,
+        project_id TEXT NOT NULL,
+        status TEXT NOT NULL,
+        current_step_index INTEGER NOT NULL DEFAULT 0,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        started_at TEXT,
+        ended_at TEXT,
+        FOREIGN KEY(project_id) REFERENCES projects(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS steps (
+        id TEXT PRIMARY KEY,
+        run_id TEXT NOT NULL,
+        step_key TEXT NOT NULL,
+        number INTEGER NOT NULL,
+        title TEXT NOT NULL,
+        status TEXT NOT NULL,
+        started_at TEXT,
+        ended_at TEXT,
+        error_message TEXT,
+        updated_at TEXT NOT NULL,
+        UNIQUE(run_id, step_key),
+        FOREIGN KEY(run_id) REFERENCES runs(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        run_id TEXT NOT NULL,
+        step_id TEXT,
+        time TEXT NOT NULL,
+        title TEXT NOT NULL,
+        content TEXT NOT NULL,
+        status TEXT NOT NULL,
+        worked_for TEXT NOT NULL,
+        source TEXT NOT NULL,
+        level TEXT NOT NULL,
+        raw TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        FOREIGN KEY(run_id) REFERENCES runs(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS artifacts (
+        id TEXT PRIMARY KEY,
+        run_id TEXT NOT NULL,
+        step_id TEXT,
+        path TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        sha256 TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        FOREIGN KEY(run_id) REFERENCES runs(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS stats (
+        run_id TEXT PRIMARY KEY,
+        hypothesis INTEGER NOT NULL DEFAULT 0,
+        papers INTEGER NOT NULL DEFAULT 0,
+        tokens INTEGER NOT NULL DEFAULT 0,
+        cost_usd REAL NOT NULL DEFAULT 0,
+        elapsed_seconds INTEGER NOT NULL DEFAULT 0,
+        token_cost_usd REAL NOT NULL DEFAULT 0,
+        gpu_hours REAL NOT NULL DEFAULT 0,
+        updated_at TEXT NOT NULL,
+        FOREIGN KEY(run_id) REFERENCES runs(id)
+    );
+    """,
+    ),
+    (
+        2,
+        """
+    CREATE INDEX IF NOT EXISTS idx_jobs_run_created ON jobs (run_id, created_at, id);
+    CREATE INDEX IF NOT EXISTS idx_steps_run_number ON steps (run_id, number);
+    CREATE INDEX IF NOT EXISTS idx_artifacts_run_created ON artifacts (run_id, created_at);
+    CREATE INDEX IF NOT EXISTS idx_runs_project_created
+        ON runs (project_id, created_at, id, status, current_step_index, updated_at, started_at, ended_at);
+    CREATE INDEX IF NOT EXISTS idx_projects_updated ON projects (updated_at, id, name, status, created_at);
+    """,
+    ),
+    (
+        3,
+        """
+    CREATE TABLE IF NOT EXISTS step_metrics (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        run_id TEXT NOT NULL,
+        step_id TEXT,
+        step_key TEXT NOT NULL,
+        attempt INTEGER NOT NULL,
+        hypothesis INTEGER NOT NULL DEFAULT 0,
+        papers INTEGER NOT NULL DEFAULT 0,
+        tokens INTEGER NOT NULL DEFAULT 0,
+        cost_usd REAL NOT NULL DEFAULT 0,
+        elapsed_seconds INTEGER NOT NULL DEFAULT 0,
+        token_cost_usd REAL NOT NULL DEFAULT 0,
+        gpu_hours REAL NOT NULL DEFAULT 0,
+        created_at TEXT NOT NULL,
+        FOREIGN KEY(run_id) REFERENCES runs(id)
+    );
+    CREATE INDEX IF NOT EXISTS idx_step_metrics_run ON step_metrics (run_id, step_key);
+    """,
+    ),
+    (
+        4,
+        """
+    CREATE TABLE IF NOT EXISTS run_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        run_id TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        event TEXT NOT NULL,
+        message TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        UNIQUE(run_id, seq)
+    );
+    """,
+    ),
+    (
+        5,
+        """
+    ALTER TABLE run_events ADD COLUMN origin TEXT NOT NULL DEFAULT '';
+    """,
+    ),
+    (
+        6,
+        f"""
+    CREATE TABLE IF NOT EXISTS project_rollups (
+        project_id TEXT PRIMARY KEY,
+        runs INTEGER NOT NULL DEFAULT 0,
+        latest_run_id TEXT,
+        latest_run_status TEXT,
+        latest_run_created_at TEXT,
+        current_step_key TEXT,
+        current_step_title TEXT,
+        current_step_number INTEGER,
+        current_step_status TEXT,
+        hypothesis INTEGER NOT NULL DEFAULT 0,
+        papers INTEGER NOT NULL DEFAULT 0,
+        tokens INTEGER NOT NULL DEFAULT 0,
+        cost_usd REAL NOT NULL DEFAULT 0,
+        elapsed_seconds INTEGER NOT NULL DEFAULT 0,
+        token_cost_usd REAL NOT NULL DEFAULT 0,
+        gpu_hours REAL NOT NULL DEFAULT 0,
+        updated_at TEXT NOT NULL,
+        FOREIGN KEY(project_id) REFERENCES projects(id)
+    );
+    INSERT OR IGNORE INTO project_rollups (project_id, updated_at) SELECT id, updated_at FROM projects;
+    UPDATE project_rollups SET {ROLLUP_TOTALS_ASSIGNMENT};
+    UPDATE project_rollups SET {ROLLUP_LATEST_ASSIGNMENT};
+    """,
+    ),
+    (
+        7,
+        """
+    CREATE TABLE IF NOT EXISTS blobs (
+        sha256 TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        encoding TEXT NOT NULL,
+        data BLOB NOT NULL,
+        created_at TEXT NOT NULL
+    );
+    ALTER TABLE jobs ADD COLUMN raw_ref TEXT;
+    """,
+    ),
+    (
+        8,
+        """
+    CREATE TABLE IF NOT EXISTS step_cache (
+        key TEXT PRIMARY KEY,
+        step_key TEXT NOT NULL,
+        runner_version TEXT NOT NULL,
+        result TEXT NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0,
+        created_at TEXT NOT NULL,
+        last_used_at TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_step_cache_created ON step_cache (created_at);
+    CREATE INDEX IF NOT EXISTS idx_step_cache_last_used ON step_cache (last_used_at);
+    ALTER TABLE runs ADD COLUMN step_cache INTEGER NOT NULL DEFAULT 1;
+    """,
+    ),
+    (
+        9,
+        """
+    CREATE TABLE IF NOT EXISTS workers (
+        id TEXT PRIMARY KEY,
+        started_at TEXT NOT NULL,
+        heartbeat_at TEXT NOT NULL
+    );
+    ALTER TABLE runs ADD COLUMN worker_id TEXT;
+    CREATE INDEX IF NOT EXISTS idx_runs_status ON runs (status);
+    """,
+    ),
+    (
+        10,
+        """
+    CREATE TABLE IF NOT EXISTS file_fingerprints (
+        path TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        inode INTEGER NOT NULL,
+        sha256 TEXT NOT NULL,
+        recorded_ns INTEGER NOT NULL
+    );
+    """,
+    ),
+    (
+        11,
+        """
+    CREATE TABLE IF NOT EXISTS objects (
+        sha256 TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        refcount INTEGER NOT NULL DEFAULT 0,
+        created_at TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_objects_refcount ON objects (refcount);
+    CREATE TABLE IF NOT EXISTS object_refs (
+        path TEXT PRIMARY KEY,
+        sha256 TEXT NOT NULL,
+        created_at TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_object_refs_sha ON object_refs (sha256);
+    """,
+    ),
+    (
+        12,
+        """
+    ALTER TABLE runs ADD COLUMN queued_at TEXT;
+    ALTER TABLE runs ADD COLUMN queue_priority INTEGER NOT NULL DEFAULT 0;
+    """,
+    ),
+]
+
+
 class Database:
-    """Simple SQLite persistence layer for projects, runs, steps, jobs and artifacts."""
+    """Simple SQLite persistence layer for projects, runs, steps, jobs and artifacts.
 
-    def __init__(self, db_path: Path) -> None:
+    Writes go through one dedicated writer connection serialized by a lock. Reads use
+    a read-only connection per thread, so with WAL enabled they proceed concurrently
+    with each other and with the writer.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        synchronous: str | None = None,
+        cache_size_kib: int | None = None,
+        mmap_size: int | None = None,
+        busy_timeout_ms: int | None = None,
+        write_buffer_size: int | None = None,
+        write_buffer_interval: float | None = None,
+    ) -> None:
         self._db_path = db_path
+        self.synchronous = (synchronous or os.getenv("OPENFARS_SQLITE_SYNCHRONOUS", "NORMAL")).upper()
+        self.cache_size_kib = cache_size_kib or int(os.getenv("OPENFARS_SQLITE_CACHE_SIZE_KIB", "16384"))
+        self.mmap_size = mmap_size if mmap_size is not None else int(os.getenv("OPENFARS_SQLITE_MMAP_SIZE", "268435456"))
+        self.busy_timeout_ms = busy_timeout_ms or int(os.getenv("OPENFARS_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+        if self.synchronous not in {"OFF", "NORMAL", "FULL", "EXTRA"}:
+            raise ValueError(f"Invalid SQLite synchronous mode: {self.synchronous}")
+
         self._lock = threading.RLock()
-        self._conn = sqlite3.connect(db_path, check_same_thread=False)
-        self._conn.row_factory = sqlite3.Row
+        self._writer = sqlite3.connect(db_path, check_same_thread=False)
+        self._writer.row_factory = sqlite3.Row
+        self._apply_pragmas(self._writer)
+        self._writer.execute(f"PRAGMA synchronous={self.synchronous}")
+
+        self._read_uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+        self._local = threading.local()
+        self._readers: list[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+
+        # Write-behind buffer for job inserts and stats increments, flushed as one
+        # transaction when it reaches `write_buffer_size` entries or gets older than
+        # `write_buffer_interval` seconds, and on every explicit `flush()`. A timer
+        # enforces the age limit when no further write arrives to trigger it.
+        self.write_buffer_size = write_buffer_size or int(os.getenv("OPENFARS_WRITE_BUFFER_SIZE", "500"))
+        self.write_buffer_interval = (
+            write_buffer_interval
+            if write_buffer_interval is not None
+            else int(os.getenv("OPENFARS_WRITE_BUFFER_MS", "200")) / 1000
+        )
+        self._pending_jobs: list[tuple[Any, ...]] = []
+        self._pending_blobs: dict[str, tuple[str, int, str, bytes, str]] = {}
+        self._pending_metrics: list[tuple[Any, ...]] = []
+        self._pending_stats: dict[str, dict[str, float]] = {}
+        self._pending_since: float | None = None
+        self._flush_timer: threading.Timer | None = None
+        self._closed = False
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+        self.flush()
+        with self._readers_lock:
+            readers, self._readers = self._readers, []
+        for conn in readers:
+            conn.close()
+        with self._lock:
+            self._writer.close()
+
+    def _apply_pragmas(self, conn: sqlite3.Connection) -> None:
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.execute(f"PRAGMA cache_size={-int(self.cache_size_kib)}")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "reader", None)
+        if conn is None:
+            # check_same_thread is off only so close() can release readers from any
+            # thread; each reader is used exclusively by the thread that opened it.
+            conn = sqlite3.connect(self._read_uri, uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            self._apply_pragmas(conn)
+            conn.execute("PRAGMA query_only=ON")
+            self._local.reader = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
 
     def initialize(self) -> None:
-        with self._lock, self._conn:
-            self._conn.executescript(
-                """
-                PRAGMA journal_mode=WAL;
-
-                CREATE TABLE IF NOT EXISTS projects (
-                    id TEXT PRIMARY KEY,
-                    name TEXT NOT NULL,
-                    status TEXT NOT NULL,
-                    created_at TEXT NOT NULL,
-                    updated_at TEXT NOT NULL
-                );
-
-                CREATE TABLE IF NOT EXISTS runs (
-                    id TEXT PRIMARY KEY,
-                    project_id TEXT NOT NULL,
-                    status TEXT NOT NULL,
-                    current_step_index INTEGER NOT NULL DEFAULT 0,
-                    created_at TEXT NOT NULL,
-                    updated_at TEXT NOT NULL,
-                    started_at TEXT,
-                    ended_at TEXT,
-                    FOREIGN KEY(project_id) REFERENCES projects(id)
-                );
-
-                CREATE TABLE IF NOT EXISTS steps (
-                    id TEXT PRIMARY KEY,
-                    run_id TEXT NOT NULL,
-                    step_key TEXT NOT NULL,
-                    number INTEGER NOT NULL,
-                    title TEXT NOT NULL,
-                    status TEXT NOT NULL,
-                    started_at TEXT,
-                    ended_at TEXT,
-                    error_message TEXT,
-                    updated_at TEXT NOT NULL,
-                    UNIQUE(run_id, step_key),
-                    FOREIGN KEY(run_id) REFERENCES runs(id)
-                );
-
-                CREATE TABLE IF NOT EXISTS jobs (
-                    id TEXT PRIMARY KEY,
-                    run_id TEXT NOT NULL,
-                    step_id TEXT,
-                    time TEXT NOT NULL,
-                    title TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    status TEXT NOT NULL,
-                    worked_for TEXT NOT NULL,
-                    source TEXT NOT NULL,
-                    level TEXT NOT NULL,
-                    raw TEXT NOT NULL,
-                    created_at TEXT NOT NULL,
-                    FOREIGN KEY(run_id) REFERENCES runs(id)
-                );
-
-                CREATE TABLE IF NOT EXISTS artifacts (
-                    id TEXT PRIMARY KEY,
-                    run_id TEXT NOT NULL,
-                    step_id TEXT,
-                    path TEXT NOT NULL,
-                    size INTEGER NOT NULL,
-                    sha256 TEXT NOT NULL,
-                    created_at TEXT NOT NULL,
-                    FOREIGN KEY(run_id) REFERENCES runs(id)
-                );
-
-                CREATE TABLE IF NOT EXISTS stats (
-                    run_id TEXT PRIMARY KEY,
-                    hypothesis INTEGER NOT NULL DEFAULT 0,
-                    papers INTEGER NOT NULL DEFAULT 0,
-                    tokens INTEGER NOT NULL DEFAULT 0,
-                    cost_usd REAL NOT NULL DEFAULT 0,
-                    elapsed_seconds INTEGER NOT NULL DEFAULT 0,
-                    token_cost_usd REAL NOT NULL DEFAULT 0,
-                    gpu_hours REAL NOT NULL DEFAULT 0,
-                    updated_at TEXT NOT NULL,
-                    FOREIGN KEY(run_id) REFERENCES runs(id)
-                );
-                """
-            )
+        with self._lock:
+            self._writer.execute("PRAGMA journal_mode=WAL")
+            version = self._writer.execute("PRAGMA user_version").fetchone()[0]
+            for target, script in MIGRATIONS:
+                if target <= version:
+                    continue
+                try:
+                    self._writer.executescript(f"BEGIN;\n{script}\nPRAGMA user_version = {target};\nCOMMIT;")
+                except sqlite3.Error:
+                    if self._writer.in_transaction:
+                        self._writer.execute("ROLLBACK")
+                    raise
+
+    def schema_version(self) -> int:
+        return self._reader().execute("PRAGMA user_version").fetchone()[0]
 
     def create_project(self, name: str) -> dict[str, Any]:
         project_id = f"FA{uuid.uuid4().int % 1_000_000:06d}"
         ts = now_iso()
-        with self._lock, self._conn:
-            self._conn.execute(
+        with self._lock, self._writer:
+            self._writer.execute(
                 "INSERT INTO projects (id, name, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
                 (project_id, name, "in_progress", ts, ts),
             )
+            self._writer.execute(
+                "INSERT INTO project_rollups (project_id, updated_at) VALUES (?, ?)",
+                (project_id, ts),
+            )
         return self.get_project(project_id)
 
     def list_projects(self) -> list[dict[str, Any]]:
-        with self._lock:
-            rows = self._conn.execute(
-                "SELECT id, name, status, created_at, updated_at FROM projects ORDER BY updated_at DESC"
-            ).fetchall()
+        rows = self._reader().execute(
+            "SELECT id, name, status, created_at, updated_at FROM projects ORDER BY updated_at DESC"
+        ).fetchall()
         return [self._row_to_project(r) for r in rows]
 
     def get_project(self, project_id: str) -> dict[str, Any] | None:
-        with self._lock:
-            row = self._conn.execute(
-                "SELECT id, name, status, created_at, updated_at FROM projects WHERE id = ?", (project_id,)
-            ).fetchone()
+        row = self._reader().execute(
+            "SELECT id, name, status, created_at, updated_at FROM projects WHERE id = ?", (project_id,)
+        ).fetchone()
         return self._row_to_project(row) if row else None
 
     def update_project_status(self, project_id: str, status: str) -> None:
-        with self._lock, self._conn:
-            self._conn.execute(
+        with self._lock, self._writer:
+            self._writer.execute(
                 "UPDATE projects SET status = ?, updated_at = ? WHERE id = ?",
                 (status, now_iso(), project_id),
             )
 
     def create_run(self, project_id: str, steps: list[dict[str, Any]]) -> dict[str, Any]:
-        run_id = f"run_{uuid.uuid4().hex[:10]}"
+        return self.create_runs([project_id], steps)[0]
+
+    def create_runs(
+        self,
+        project_ids: list[str],
+        steps: list[dict[str, Any]],
+        step_cache: list[bool] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Create one run (with `steps`) per entry of `project_ids` in a single transaction.
+
+        `step_cache` optionally gives, per run, whether it may reuse cached step results.
+        """
         ts = now_iso()
-        with self._lock, self._conn:
-            self._conn.execute(
+        run_ids = [f"run_{uuid.uuid4().hex[:10]}" for _ in project_ids]
+        cache_flags = step_cache if step_cache is not None else [True] * len(project_ids)
+        projects = list(dict.fromkeys(project_ids))
+        with self._lock, self._writer:
+            self._writer.executemany(
                 """
-                INSERT INTO runs (id, project_id, status, current_step_index, created_at, updated_at, started_at, ended_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                INSERT INTO runs (
+                    id, project_id, status, current_step_index, created_at, updated_at, started_at, ended_at, step_cache
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
-                (run_id, project_id, "pending", 0, ts, ts, None, None),
+                [
+                    (run_id, project_id, "pending", 0, ts, ts, None, None, int(enabled))
+                    for run_id, project_id, enabled in zip(run_ids, project_ids, cache_flags)
+                ],
             )
-            for step in steps:
-                step_id = f"step_{uuid.uuid4().hex[:12]}"
-                self._conn.execute(
-                    """
-                    INSERT INTO steps (id, run_id, step_key, number, title, status, started_at, ended_at, error_message, updated_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (step_id, run_id, step["key"], step["number"], step["title"], "pending", None, None, None, ts),
-                )
-            self._conn.execute(
+            self._writer.executemany(
+                """
+                INSERT INTO steps (id, run_id, step_key, number, title, status, started_at, ended_at, error_message, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        f"step_{uuid.uuid4().hex[:12]}",
+                        run_id,
+                        step["key"],
+                        step["number"],
+                        step["title"],
+                        "pending",
+                        None,
+                        None,
+                        None,
+                        ts,
+                    )
+                    for run_id in run_ids
+                    for step in steps
+                ],
+            )
+            self._writer.executemany(
                 "INSERT INTO stats (run_id, updated_at) VALUES (?, ?)",
-                (run_id, ts),
+                [(run_id, ts) for run_id in run_ids],
             )
-            self._conn.execute(
+            self._writer.executemany(
                 "UPDATE projects SET status = ?, updated_at = ? WHERE id = ?",
-                ("in_progress", ts, project_id),
+                [("in_progress", ts, project_id) for project_id in projects],
+            )
+            self._writer.executemany(
+                f"""
+                UPDATE project_rollups SET runs = runs + ?, {ROLLUP_LATEST_ASSIGNMENT}, updated_at = ?
+                WHERE project_id = ?
+                """,
+                [(project_ids.count(project_id), ts, project_id) for project_id in projects],
             )
-        return self.get_run(run_id)
+        runs = self.get_runs(run_ids)
+        return [runs[run_id] for run_id in run_ids]
 
     def get_run(self, run_id: str) -> dict[str, Any] | None:
-        with self._lock:
-            row = self._conn.execute(
-                """
-                SELECT id, project_id, status, current_step_index, created_at, updated_at, started_at, ended_at
-                FROM runs WHERE id = ?
-                """,
-                (run_id,),
-            ).fetchone()
+        row = self._reader().execute(
+            """
+            SELECT id, project_id, status, current_step_index, created_at, updated_at, started_at, ended_at, step_cache
+            FROM runs WHERE id = ?
+            """,
+            (run_id,),
+        ).fetchone()
         return self._row_to_run(row) if row else None
 
+    def get_runs(self, run_ids: list[str]) -> dict[str, dict[str, Any]]:
+        rows = self._select_in(
+            """
+            SELECT id, project_id, status, current_step_index, created_at, updated_at, started_at, ended_at, step_cache
+            FROM runs WHERE id IN ({ids})
+            """,
+            run_ids,
+        )
+        return {row["id"]: self._row_to_run(row) for row in rows}
+
     def list_project_runs(self, project_id: str) -> list[dict[str, Any]]:
-        with self._lock:
-            rows = self._conn.execute(
-                """
-                SELECT id, project_id, status, current_step_index, created_at, updated_at, started_at, ended_at
-                FROM runs
-                WHERE project_id = ?
-                ORDER BY created_at DESC
-                """,
-                (project_id,),
-            ).fetchall()
+        rows = self._reader().execute(
+            """
+            SELECT id, project_id, status, current_step_index, created_at, updated_at, started_at, ended_at, step_cache
+            FROM runs
+            WHERE project_id = ?
+            ORDER BY created_at DESC
+            """,
+            (project_id,),
+        ).fetchall()
         return [self._row_to_run(r) for r in rows]
 
     def get_latest_run_for_project(self, project_id: str) -> dict[str, Any] | None:
@@ -194,34 +576,135 @@ class Database:
         return runs[0] if runs else None
 
     def update_run(self, run_id: str, **fields: Any) -> None:
-        if not fields:
+        self.update_runs({run_id: fields})
+
+    def update_runs(self, changes: dict[str, dict[str, Any]]) -> None:
+        """Apply per-run field updates in one transaction, batching runs that set the same fields."""
+        ts = now_iso()
+        groups: dict[tuple[str, ...], list[tuple[Any, ...]]] = {}
+        for run_id, fields in changes.items():
+            if fields:
+                groups.setdefault(tuple(fields), []).append((*fields.values(), ts, run_id))
+        if not groups:
             return
-        fields["updated_at"] = now_iso()
-        keys = ", ".join(f"{key} = ?" for key in fields)
-        values = list(fields.values()) + [run_id]
-        with self._lock, self._conn:
-            self._conn.execute(f"UPDATE runs SET {keys} WHERE id = ?", values)
+        refresh = [run_id for run_id, fields in changes.items() if "status" in fields or "current_step_index" in fields]
+        with self._lock, self._writer:
+            for keys, rows in groups.items():
+                assignments = ", ".join(f"{key} = ?" for key in (*keys, "updated_at"))
+                self._writer.executemany(f"UPDATE runs SET {assignments} WHERE id = ?", rows)
+            if len(refresh) == 1:
+                self._refresh_rollup_latest("SELECT project_id FROM runs WHERE id = ?", refresh[0])
+            elif refresh:
+                rows = self._select_in(
+                    "SELECT DISTINCT project_id FROM runs WHERE id IN ({ids})", refresh, conn=self._writer
+                )
+                for project_id in {row["project_id"] for row in rows}:
+                    self._refresh_rollup_latest("SELECT ?", project_id)
 
-    def list_steps(self, run_id: str) -> list[dict[str, Any]]:
+    def claim_orphaned_runs(self, worker_id: str, stale_before: str) -> list[dict[str, Any]]:
+        """Assign to `worker_id` every unfinished run whose worker is gone, and return those runs.
+
+        Unfinished means running, paused, or pending after having started or been
+        queued for a scheduler slot. A worker is gone when it has no heartbeat since
+        `stale_before`. Each returned run carries the priority it was queued with as
+        `queuePriority`. The candidates are selected and claimed by id in one
+        `BEGIN IMMEDIATE` transaction, so concurrent workers never share a run.
+        """
+        ts = now_iso()
         with self._lock:
-            rows = self._conn.execute(
+            self._writer.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._writer.execute(
+                    """
+                    SELECT id, project_id, status, current_step_index, created_at, updated_at, started_at, ended_at,
+                           step_cache, queue_priority
+                    FROM runs
+                    WHERE (status IN ('running', 'paused')
+                           OR (status = 'pending' AND (started_at IS NOT NULL OR queued_at IS NOT NULL)))
+                      AND (worker_id IS NULL OR worker_id NOT IN (SELECT id FROM workers WHERE heartbeat_at >= ?))
+                    ORDER BY created_at, rowid
+                    """,
+                    (stale_before,),
+                ).fetchall()
+                self._writer.executemany(
+                    "UPDATE runs SET worker_id = ?, updated_at = ? WHERE id = ?",
+                    [(worker_id, ts, row["id"]) for row in rows],
+                )
+                self._writer.commit()
+            except BaseException:
+                self._writer.rollback()
+                raise
+        return [{**self._row_to_run(row), "updatedAt": ts, "queuePriority": row["queue_priority"]} for row in rows]
+
+    def heartbeat_worker(self, worker_id: str) -> None:
+        ts = now_iso()
+        with self._lock, self._writer:
+            self._writer.execute(
                 """
-                SELECT id, run_id, step_key, number, title, status, started_at, ended_at, error_message
-                FROM steps WHERE run_id = ? ORDER BY number ASC
+                INSERT INTO workers (id, started_at, heartbeat_at) VALUES (?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at
                 """,
-                (run_id,),
-            ).fetchall()
+                (worker_id, ts, ts),
+            )
+
+    def remove_worker(self, worker_id: str) -> None:
+        with self._lock, self._writer:
+            self._writer.execute("DELETE FROM workers WHERE id = ?", (worker_id,))
+
+    def find_run_ids(
+        self,
+        run_ids: list[str] | None = None,
+        project_id: str | None = None,
+        statuses: list[str] | None = None,
+    ) -> list[str]:
+        """Ids of runs matching every given filter, in `run_ids` order or else oldest first."""
+        clauses: list[str] = []
+        params: list[Any] = []
+        if project_id is not None:
+            clauses.append("project_id = ?")
+            params.append(project_id)
+        if statuses is not None:
+            clauses.append(f"status IN ({', '.join('?' * len(statuses))})")
+            params.extend(statuses)
+        where = " AND ".join(clauses) or "1 = 1"
+        if run_ids is None:
+            sql = f"SELECT id FROM runs WHERE {where} ORDER BY created_at, rowid"
+            return [row["id"] for row in self._reader().execute(sql, params).fetchall()]
+        rows = self._select_in(f"SELECT id FROM runs WHERE {where} AND id IN ({{ids}})", run_ids, params)
+        found = {row["id"] for row in rows}
+        return [run_id for run_id in dict.fromkeys(run_ids) if run_id in found]
+
+    def list_steps(self, run_id: str) -> list[dict[str, Any]]:
+        rows = self._reader().execute(
+            """
+            SELECT id, run_id, step_key, number, title, status, started_at, ended_at, error_message
+            FROM steps WHERE run_id = ? ORDER BY number ASC
+            """,
+            (run_id,),
+        ).fetchall()
         return [self._row_to_step(r) for r in rows]
 
+    def list_steps_for_runs(self, run_ids: list[str]) -> dict[str, list[dict[str, Any]]]:
+        steps: dict[str, list[dict[str, Any]]] = {run_id: [] for run_id in run_ids}
+        rows = self._select_in(
+            """
+            SELECT id, run_id, step_key, number, title, status, started_at, ended_at, error_message
+            FROM steps WHERE run_id IN ({ids}) ORDER BY run_id, number ASC
+            """,
+            run_ids,
+        )
+        for row in rows:
+            steps[row["run_id"]].append(self._row_to_step(row))
+        return steps
+
     def get_step_by_key(self, run_id: str, step_key: str) -> dict[str, Any] | None:
-        with self._lock:
-            row = self._conn.execute(
-                """
-                SELECT id, run_id, step_key, number, title, status, started_at, ended_at, error_message
-                FROM steps WHERE run_id = ? AND step_key = ?
-                """,
-                (run_id, step_key),
-            ).fetchone()
+        row = self._reader().execute(
+            """
+            SELECT id, run_id, step_key, number, title, status, started_at, ended_at, error_message
+            FROM steps WHERE run_id = ? AND step_key = ?
+            """,
+            (run_id, step_key),
+        ).fetchone()
         return self._row_to_step(row) if row else None
 
     def update_step(self, step_id: str, **fields: Any) -> None:
@@ -230,13 +713,18 @@ class Database:
         fields["updated_at"] = now_iso()
         keys = ", ".join(f"{key} = ?" for key in fields)
         values = list(fields.values()) + [step_id]
-        with self._lock, self._conn:
-            self._conn.execute(f"UPDATE steps SET {keys} WHERE id = ?", values)
+        with self._lock, self._writer:
+            self._writer.execute(f"UPDATE steps SET {keys} WHERE id = ?", values)
+            if "status" in fields:
+                self._refresh_rollup_latest(
+                    "SELECT r.project_id FROM steps st JOIN runs r ON r.id = st.run_id WHERE st.id = ?",
+                    step_id,
+                )
 
     def reset_failed_steps_for_retry(self, run_id: str) -> None:
         ts = now_iso()
-        with self._lock, self._conn:
-            self._conn.execute(
+        with self._lock, self._writer:
+            self._writer.execute(
                 """
                 UPDATE steps
                 SET status = 'pending', error_message = NULL, started_at = NULL, ended_at = NULL, updated_at = ?
@@ -244,10 +732,11 @@ class Database:
                 """,
                 (ts, run_id),
             )
-            self._conn.execute(
+            self._writer.execute(
                 "UPDATE runs SET status = 'pending', ended_at = NULL, updated_at = ? WHERE id = ?",
                 (ts, run_id),
             )
+            self._refresh_rollup_latest("SELECT project_id FROM runs WHERE id = ?", run_id)
 
     def add_job(
         self,
@@ -264,94 +753,697 @@ class Database:
         job_id = f"job_{uuid.uuid4().hex[:12]}"
         ts = now_iso()
         wall_time = datetime.now().strftime("%H:%M")
-        with self._lock, self._conn:
-            self._conn.execute(
-                """
-                INSERT INTO jobs (id, run_id, step_id, time, title, content, status, worked_for, source, level, raw, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (job_id, run_id, step_id, wall_time, title, content, status, worked_for, source, level, raw, ts),
-            )
-        return self.get_job(job_id)
+        raw_ref = None
+        blob = None
+        if len(raw) > RAW_INLINE_MAX_CHARS:
+            raw_ref, size, encoding, data = encode_blob(raw)
+            blob = (raw_ref, size, encoding, data, ts)
+            raw = raw[:RAW_PREVIEW_CHARS]
+        row = (job_id, run_id, step_id, wall_time, title, content, status, worked_for, source, level, raw, raw_ref, ts)
+        with self._lock:
+            if blob is not None:
+                self._pending_blobs.setdefault(raw_ref, blob)
+            self._pending_jobs.append(row)
+            self._maybe_flush()
+        return {
+            "id": job_id,
+            "runId": run_id,
+            "stepId": step_id,
+            "time": wall_time,
+            "title": title,
+            "content": content,
+            "status": status,
+            "workedFor": worked_for,
+            "source": source,
+            "level": level,
+            "raw": raw,
+            "rawRef": raw_ref,
+            "createdAt": ts,
+        }
+
+    def get_job_raw(self, job_id: str) -> str | None:
+        """The full `raw` payload of a job, read from `blobs` if it was moved there."""
+        self._flush_pending_jobs()
+        row = self._reader().execute(
+            """
+            SELECT j.raw, b.encoding, b.data
+            FROM jobs j LEFT JOIN blobs b ON b.sha256 = j.raw_ref
+            WHERE j.id = ?
+            """,
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        return decode_blob(row["encoding"], row["data"]) if row["data"] is not None else row["raw"]
 
     def get_job(self, job_id: str) -> dict[str, Any] | None:
-        with self._lock:
-            row = self._conn.execute(
-                """
-                SELECT id, run_id, step_id, time, title, content, status, worked_for, source, level, raw, created_at
-                FROM jobs WHERE id = ?
-                """,
-                (job_id,),
-            ).fetchone()
+        self._flush_pending_jobs()
+        row = self._reader().execute(f"{self._job_query(True)} WHERE jobs.id = ?", (job_id,)).fetchone()
         return self._row_to_job(row) if row else None
 
-    def list_jobs(self, run_id: str, limit: int = 200) -> list[dict[str, Any]]:
-        with self._lock:
-            rows = self._conn.execute(
-                """
-                SELECT id, run_id, step_id, time, title, content, status, worked_for, source, level, raw, created_at
-                FROM jobs WHERE run_id = ? ORDER BY created_at DESC LIMIT ?
-                """,
-                (run_id, limit),
-            ).fetchall()
+    def list_jobs(
+        self,
+        run_id: str,
+        limit: int = 200,
+        before: tuple[str, str] | None = None,
+        after: tuple[str, str] | None = None,
+        step_id: str | None = None,
+        level: str | None = None,
+        status: str | None = None,
+        source: str | None = None,
+        include_raw: bool = True,
+    ) -> list[dict[str, Any]]:
+        """List jobs newest first, keyset-paginated on `(created_at, id)`.
+
+        `before` returns the page of jobs older than the given key, `after` the page
+        of jobs directly newer than it (still returned newest first).
+        """
+        self._flush_pending_jobs()
+        clauses = ["jobs.run_id = ?"]
+        params: list[Any] = [run_id]
+        for column, value in (("step_id", step_id), ("level", level), ("status", status), ("source", source)):
+            if value is not None:
+                clauses.append(f"jobs.{column} = ?")
+                params.append(value)
+        if before is not None:
+            clauses.append("(jobs.created_at, jobs.id) < (?, ?)")
+            params.extend(before)
+        if after is not None:
+            clauses.append("(jobs.created_at, jobs.id) > (?, ?)")
+            params.extend(after)
+        order = "ASC" if after is not None and before is None else "DESC"
+        rows = self._reader().execute(
+            f"""
+            {self._job_query(include_raw)} WHERE {" AND ".join(clauses)}
+            ORDER BY jobs.created_at {order}, jobs.id {order} LIMIT ?
+            """,
+            (*params, limit),
+        ).fetchall()
+        if order == "ASC":
+            rows.reverse()
         return [self._row_to_job(r) for r in rows]
 
+    def iter_jobs(
+        self,
+        run_id: str,
+        batch_size: int = 1000,
+        include_raw: bool = True,
+    ) -> Iterator[list[dict[str, Any]]]:
+        """All jobs of a run, oldest first, in batches of `batch_size` from one read snapshot."""
+        self._flush_pending_jobs()
+        sql = f"{self._job_query(include_raw)} WHERE jobs.run_id = ? ORDER BY jobs.created_at ASC, jobs.id ASC"
+        for rows in self._stream_rows(sql, (run_id,), batch_size):
+            yield [self._row_to_job(row) for row in rows]
+
     def add_artifact(self, run_id: str, step_id: str | None, path: str, size: int, sha256: str) -> dict[str, Any]:
-        artifact_id = f"artifact_{uuid.uuid4().hex[:12]}"
+        return self.add_artifacts(run_id, step_id, [(path, size, sha256)])[0]
+
+    def add_artifacts(
+        self,
+        run_id: str,
+        step_id: str | None,
+        files: list[tuple[str, int, str]],
+        fingerprints: list[tuple[str, int, int, int, str, int]] = (),
+        object_refs: list[tuple[str, str, int]] = (),
+    ) -> list[dict[str, Any]]:
+        """Insert `(path, size, sha256)` artifacts, file fingerprints and object refs in one transaction."""
         ts = now_iso()
-        with self._lock, self._conn:
-            self._conn.execute(
+        rows = [
+            (f"artifact_{uuid.uuid4().hex[:12]}", run_id, step_id, path, size, sha256, ts)
+            for path, size, sha256 in files
+        ]
+        with self._lock, self._writer:
+            self._writer.executemany(
                 """
                 INSERT INTO artifacts (id, run_id, step_id, path, size, sha256, created_at)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
                 """,
-                (artifact_id, run_id, step_id, path, size, sha256, ts),
+                rows,
             )
-        return self.get_artifact(artifact_id)
+            self._upsert_fingerprints(fingerprints)
+            self._put_object_refs(object_refs)
+        return [
+            {
+                "id": artifact_id,
+                "runId": run_id,
+                "stepId": step_id,
+                "path": path,
+                "size": size,
+                "sha256": sha256,
+                "createdAt": ts,
+            }
+            for artifact_id, _, _, path, size, sha256, _ in rows
+        ]
+
+    def get_fingerprints(self, paths: list[str]) -> dict[str, dict[str, Any]]:
+        rows = self._select_in(
+            "SELECT path, size, mtime_ns, inode, sha256, recorded_ns FROM file_fingerprints WHERE path IN ({ids})",
+            paths,
+        )
+        return {
+            row["path"]: {
+                "size": row["size"],
+                "mtimeNs": row["mtime_ns"],
+                "inode": row["inode"],
+                "sha256": row["sha256"],
+                "recordedNs": row["recorded_ns"],
+            }
+            for row in rows
+        }
+
+    def put_fingerprints(
+        self,
+        fingerprints: list[tuple[str, int, int, int, str, int]],
+        object_refs: list[tuple[str, str, int]] = (),
+    ) -> None:
+        """Upsert `(path, size, mtime_ns, inode, sha256, recorded_ns)` rows, plus object refs."""
+        if not fingerprints and not object_refs:
+            return
+        with self._lock, self._writer:
+            self._upsert_fingerprints(fingerprints)
+            self._put_object_refs(object_refs)
+
+    def put_object_refs(self, object_refs: list[tuple[str, str, int]]) -> None:
+        """Point each `(path, sha256, size)` file at its object, keeping refcounts in step."""
+        if not object_refs:
+            return
+        with self._lock, self._writer:
+            self._put_object_refs(object_refs)
+
+    def remove_object_refs(self, paths: list[str]) -> None:
+        if not paths:
+            return
+        with self._lock, self._writer:
+            rows = self._select_in("SELECT sha256 FROM object_refs WHERE path IN ({ids})", paths, conn=self._writer)
+            self._writer.executemany(
+                "UPDATE objects SET refcount = refcount - 1 WHERE sha256 = ?",
+                [(row["sha256"],) for row in rows],
+            )
+            for start in range(0, len(paths), IN_CLAUSE_CHUNK):
+                chunk = paths[start : start + IN_CLAUSE_CHUNK]
+                self._writer.execute(f"DELETE FROM object_refs WHERE path IN ({', '.join('?' * len(chunk))})", chunk)
+
+    def list_object_refs(self, prefix: str | None = None) -> list[tuple[str, str]]:
+        """`(path, sha256)` refs, optionally only those whose path starts with `prefix`."""
+        if prefix is None:
+            rows = self._reader().execute("SELECT path, sha256 FROM object_refs").fetchall()
+        else:
+            # Range scan on the primary key: every string with the prefix sorts in [prefix, prefix + U+10FFFF).
+            rows = self._reader().execute(
+                "SELECT path, sha256 FROM object_refs WHERE path >= ? AND path < ?",
+                (prefix, prefix + "\U0010ffff"),
+            ).fetchall()
+        return [(row["path"], row["sha256"]) for row in rows]
+
+    def list_collectable_objects(self, created_before: str) -> list[tuple[str, int]]:
+        """`(sha256, size)` of objects no file refers to and no step cache entry needs."""
+        rows = self._reader().execute(
+            """
+            SELECT sha256, size FROM objects
+            WHERE refcount <= 0 AND created_at < ?
+              AND sha256 NOT IN (
+                  SELECT json_extract(artifact.value, '$.sha256')
+                  FROM step_cache, json_each(step_cache.result, '$.artifacts') AS artifact
+              )
+            """,
+            (created_before,),
+        ).fetchall()
+        return [(row["sha256"], row["size"]) for row in rows]
+
+    def delete_objects(self, shas: list[str]) -> list[str]:
+        """Delete the rows of `shas` that are still unreferenced; return the ones deleted."""
+        deleted: list[str] = []
+        with self._lock, self._writer:
+            for sha256 in shas:
+                cursor = self._writer.execute("DELETE FROM objects WHERE sha256 = ? AND refcount <= 0", (sha256,))
+                if cursor.rowcount:
+                    deleted.append(sha256)
+        return deleted
+
+    def known_objects(self, shas: list[str]) -> set[str]:
+        rows = self._select_in("SELECT sha256 FROM objects WHERE sha256 IN ({ids})", shas)
+        return {row["sha256"] for row in rows}
+
+    def object_store_summary(self) -> dict[str, Any]:
+        row = self._reader().execute(
+            """
+            SELECT COUNT(*) AS objects, COALESCE(SUM(size), 0) AS stored_bytes,
+                   COALESCE(SUM(refcount), 0) AS refs, COALESCE(SUM(size * MAX(refcount, 1)), 0) AS logical_bytes
+            FROM objects
+            """
+        ).fetchone()
+        return {
+            "objects": row["objects"],
+            "storedBytes": row["stored_bytes"],
+            "refs": row["refs"],
+            "logicalBytes": row["logical_bytes"],
+        }
 
     def get_artifact(self, artifact_id: str) -> dict[str, Any] | None:
-        with self._lock:
-            row = self._conn.execute(
-                """
-                SELECT id, run_id, step_id, path, size, sha256, created_at
-                FROM artifacts WHERE id = ?
-                """,
-                (artifact_id,),
-            ).fetchone()
+        row = self._reader().execute(
+            """
+            SELECT id, run_id, step_id, path, size, sha256, created_at
+            FROM artifacts WHERE id = ?
+            """,
+            (artifact_id,),
+        ).fetchone()
         return self._row_to_artifact(row) if row else None
 
     def list_artifacts(self, run_id: str) -> list[dict[str, Any]]:
-        with self._lock:
-            rows = self._conn.execute(
-                """
-                SELECT id, run_id, step_id, path, size, sha256, created_at
-                FROM artifacts WHERE run_id = ? ORDER BY created_at DESC
-                """,
-                (run_id,),
-            ).fetchall()
+        rows = self._reader().execute(
+            """
+            SELECT id, run_id, step_id, path, size, sha256, created_at
+            FROM artifacts WHERE run_id = ? ORDER BY created_at DESC
+            """,
+            (run_id,),
+        ).fetchall()
         return [self._row_to_artifact(r) for r in rows]
 
+    def list_artifacts_for_runs(self, run_ids: list[str]) -> dict[str, list[dict[str, Any]]]:
+        artifacts: dict[str, list[dict[str, Any]]] = {run_id: [] for run_id in run_ids}
+        rows = self._select_in(
+            """
+            SELECT id, run_id, step_id, path, size, sha256, created_at
+            FROM artifacts WHERE run_id IN ({ids}) ORDER BY run_id, created_at DESC
+            """,
+            run_ids,
+        )
+        for row in rows:
+            artifacts[row["run_id"]].append(self._row_to_artifact(row))
+        return artifacts
+
     def get_stats(self, run_id: str) -> dict[str, Any] | None:
-        with self._lock:
-            row = self._conn.execute(
-                """
-                SELECT run_id, hypothesis, papers, tokens, cost_usd, elapsed_seconds, token_cost_usd, gpu_hours, updated_at
-                FROM stats WHERE run_id = ?
-                """,
-                (run_id,),
-            ).fetchone()
+        if run_id in self._pending_stats:
+            self.flush()
+        row = self._reader().execute(
+            """
+            SELECT run_id, hypothesis, papers, tokens, cost_usd, elapsed_seconds, token_cost_usd, gpu_hours, updated_at
+            FROM stats WHERE run_id = ?
+            """,
+            (run_id,),
+        ).fetchone()
         return self._row_to_stats(row) if row else None
 
+    def get_stats_for_runs(self, run_ids: list[str]) -> dict[str, dict[str, Any]]:
+        if any(run_id in self._pending_stats for run_id in run_ids):
+            self.flush()
+        rows = self._select_in(
+            """
+            SELECT run_id, hypothesis, papers, tokens, cost_usd, elapsed_seconds, token_cost_usd, gpu_hours, updated_at
+            FROM stats WHERE run_id IN ({ids})
+            """,
+            run_ids,
+        )
+        return {row["run_id"]: self._row_to_stats(row) for row in rows}
+
     def update_stats(self, run_id: str, **fields: Any) -> dict[str, Any] | None:
         if not fields:
             return self.get_stats(run_id)
+        if run_id in self._pending_stats:
+            # Buffered deltas predate this absolute write; apply them first so it wins.
+            self.flush()
         fields["updated_at"] = now_iso()
         keys = ", ".join(f"{key} = ?" for key in fields)
         values = list(fields.values()) + [run_id]
-        with self._lock, self._conn:
-            self._conn.execute(f"UPDATE stats SET {keys} WHERE run_id = ?", values)
+        with self._lock, self._writer:
+            self._writer.execute(f"UPDATE stats SET {keys} WHERE run_id = ?", values)
+            self._refresh_rollup_totals(run_id)
+        return self.get_stats(run_id)
+
+    def increment_stats(self, run_id: str, **deltas: float) -> None:
+        """Buffer additive stats deltas; they are applied SQL-side on the next flush."""
+        unknown = set(deltas) - set(STATS_COUNTERS)
+        if unknown:
+            raise ValueError(f"Unknown stats counters: {sorted(unknown)}")
+        with self._lock:
+            pending = self._pending_stats.setdefault(run_id, dict.fromkeys(STATS_COUNTERS, 0))
+            for key, value in deltas.items():
+                pending[key] += value
+            self._maybe_flush()
+
+    def append_run_events(self, events: list[tuple[str, int, str, str, str]]) -> None:
+        """Persist `(run_id, seq, event, message, created_at)` rows; duplicates are ignored."""
+        if not events:
+            return
+        with self._lock, self._writer:
+            self._writer.executemany(
+                """
+                INSERT OR IGNORE INTO run_events (run_id, seq, event, message, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                events,
+            )
+
+    def append_run_event_sequenced(
+        self,
+        run_id: str,
+        event: str,
+        created_at: str,
+        origin: str,
+        encode: Callable[[int], str],
+    ) -> tuple[int, str]:
+        """Allocate the next seq for `run_id` and insert the event in one write transaction.
+
+        `BEGIN IMMEDIATE` takes SQLite's write lock up front, so concurrent processes
+        sharing the file cannot allocate the same seq.
+        """
+        with self._lock:
+            self._writer.execute("BEGIN IMMEDIATE")
+            try:
+                seq = self._writer.execute(
+                    "SELECT COALESCE(MAX(seq), 0) + 1 FROM run_events WHERE run_id = ?", (run_id,)
+                ).fetchone()[0]
+                message = encode(seq)
+                self._writer.execute(
+                    """
+                    INSERT INTO run_events (run_id, seq, event, message, created_at, origin)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    (run_id, seq, event, message, created_at, origin),
+                )
+                self._writer.commit()
+            except BaseException:
+                self._writer.rollback()
+                raise
+        return seq, message
+
+    def list_events_after_id(
+        self,
+        after_id: int,
+        exclude_origin: str | None = None,
+        limit: int = 1000,
+    ) -> list[tuple[int, str, str, str]]:
+        """`(id, run_id, event, message)` rows in insertion order, for tailing the log."""
+        rows = self._reader().execute(
+            """
+            SELECT id, run_id, event, message FROM run_events
+            WHERE id > ? AND origin != ? ORDER BY id ASC LIMIT ?
+            """,
+            (after_id, exclude_origin or "", limit),
+        ).fetchall()
+        return [(row["id"], row["run_id"], row["event"], row["message"]) for row in rows]
+
+    def max_event_id(self) -> int:
+        row = self._reader().execute("SELECT MAX(id) FROM run_events").fetchone()
+        return row[0] or 0
+
+    def list_run_events(self, run_id: str, after_seq: int, limit: int = 10_000) -> list[tuple[int, str]]:
+        rows = self._reader().execute(
+            """
+            SELECT seq, message FROM run_events
+            WHERE run_id = ? AND seq > ? ORDER BY seq ASC LIMIT ?
+            """,
+            (run_id, after_seq, limit),
+        ).fetchall()
+        return [(row["seq"], row["message"]) for row in rows]
+
+    def iter_run_events(self, run_id: str, batch_size: int = 1000) -> Iterator[list[tuple[int, str]]]:
+        """All persisted events of a run as `(seq, message)`, in seq order and in batches."""
+        sql = "SELECT seq, message FROM run_events WHERE run_id = ? ORDER BY seq ASC"
+        for rows in self._stream_rows(sql, (run_id,), batch_size):
+            yield [(row["seq"], row["message"]) for row in rows]
+
+    def max_event_seq(self, run_id: str) -> int:
+        row = self._reader().execute("SELECT MAX(seq) FROM run_events WHERE run_id = ?", (run_id,)).fetchone()
+        return row[0] or 0
+
+    def record_step_metrics(self, run_id: str, step_id: str | None, step_key: str, attempt: int, **deltas: float) -> None:
+        """Append a step attempt to the metrics ledger and add it to the run's stats.
+
+        Both land in the same flush transaction, so `stats` always equals the ledger sum.
+        """
+        row = (run_id, step_id, step_key, attempt, *(deltas.get(key, 0) for key in STATS_COUNTERS), now_iso())
+        with self._lock:
+            self._pending_metrics.append(row)
+            self.increment_stats(run_id, **deltas)
+
+    def recompute_stats(self, run_id: str) -> dict[str, Any] | None:
+        """Rebuild a run's stats row from the metrics ledger."""
+        self.flush()
+        sums = ", ".join(f"COALESCE(SUM({key}), 0)" for key in STATS_COUNTERS)
+        with self._lock, self._writer:
+            self._writer.execute(
+                f"""
+                UPDATE stats SET ({", ".join(STATS_COUNTERS)}, updated_at) =
+                    (SELECT {sums}, ? FROM step_metrics WHERE run_id = ?)
+                WHERE run_id = ?
+                """,
+                (now_iso(), run_id, run_id),
+            )
+            self._refresh_rollup_totals(run_id)
         return self.get_stats(run_id)
 
+    def aggregate_stats(self, project_id: str | None = None) -> dict[str, Any]:
+        """Roll up stats across all runs, or across the runs of one project."""
+        self.flush()
+        sums = ", ".join(f"COALESCE(SUM(s.{key}), 0) AS {key}" for key in STATS_COUNTERS)
+        where = "WHERE r.project_id = ?" if project_id is not None else ""
+        row = self._reader().execute(
+            f"""
+            SELECT COUNT(*) AS runs, {sums}, MAX(s.updated_at) AS updated_at
+            FROM stats s JOIN runs r ON r.id = s.run_id
+            {where}
+            """,
+            (project_id,) if project_id is not None else (),
+        ).fetchone()
+        return {"runs": row["runs"], **self._row_to_stats_totals(row)}
+
+    def has_step_metrics(self, run_id: str, step_key: str, attempt: int) -> bool:
+        """Whether the ledger holds `attempt` of the step, i.e. its outcome was recorded."""
+        self.flush()
+        row = self._reader().execute(
+            "SELECT 1 FROM step_metrics WHERE run_id = ? AND step_key = ? AND attempt = ? LIMIT 1",
+            (run_id, step_key, attempt),
+        ).fetchone()
+        return row is not None
+
+    def list_step_metrics(self, run_id: str) -> list[dict[str, Any]]:
+        """Per-step totals from the ledger, in first-recorded order."""
+        self.flush()
+        sums = ", ".join(f"SUM({key}) AS {key}" for key in STATS_COUNTERS)
+        rows = self._reader().execute(
+            f"""
+            SELECT step_key, COUNT(*) AS attempts, {sums}, MAX(created_at) AS updated_at
+            FROM step_metrics WHERE run_id = ?
+            GROUP BY step_key ORDER BY MIN(id)
+            """,
+            (run_id,),
+        ).fetchall()
+        return [{"stepKey": r["step_key"], "attempts": r["attempts"], **self._row_to_stats_totals(r)} for r in rows]
+
+    def list_project_summaries(self) -> list[dict[str, Any]]:
+        """Every project with its latest run, current step and stats totals, in one query."""
+        self.flush()
+        rows = self._reader().execute(
+            f"""
+            SELECT p.id, p.name, p.status, p.created_at, p.updated_at,
+                   pr.runs, pr.latest_run_id, pr.latest_run_status, pr.latest_run_created_at,
+                   pr.current_step_key, pr.current_step_title, pr.current_step_number, pr.current_step_status,
+                   {", ".join(f"pr.{key}" for key in STATS_COUNTERS)}, pr.updated_at AS rollup_updated_at
+            FROM projects p JOIN project_rollups pr ON pr.project_id = p.id
+            ORDER BY p.updated_at DESC
+            """
+        ).fetchall()
+        return [self._row_to_project_summary(row) for row in rows]
+
+    def get_step_cache_entry(self, key: str) -> dict[str, Any] | None:
+        row = self._reader().execute(
+            "SELECT key, step_key, runner_version, result, hits, created_at, last_used_at FROM step_cache WHERE key = ?",
+            (key,),
+        ).fetchone()
+        return self._row_to_step_cache_entry(row) if row else None
+
+    def put_step_cache_entry(self, key: str, step_key: str, runner_version: str, result: dict[str, Any]) -> None:
+        ts = now_iso()
+        with self._lock, self._writer:
+            self._writer.execute(
+                """
+                INSERT INTO step_cache (key, step_key, runner_version, result, hits, created_at, last_used_at)
+                VALUES (?, ?, ?, ?, 0, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    result = excluded.result, created_at = excluded.created_at, last_used_at = excluded.last_used_at
+                """,
+                (key, step_key, runner_version, json.dumps(result, ensure_ascii=False), ts, ts),
+            )
+
+    def touch_step_cache_entry(self, key: str) -> None:
+        with self._lock, self._writer:
+            self._writer.execute(
+                "UPDATE step_cache SET hits = hits + 1, last_used_at = ? WHERE key = ?",
+                (now_iso(), key),
+            )
+
+    def delete_step_cache_entry(self, key: str) -> None:
+        with self._lock, self._writer:
+            self._writer.execute("DELETE FROM step_cache WHERE key = ?", (key,))
+
+    def evict_step_cache(self, created_before: str, max_entries: int) -> int:
+        """Drop entries created before `created_before`, then least recently used ones beyond `max_entries`."""
+        with self._lock, self._writer:
+            expired = self._writer.execute("DELETE FROM step_cache WHERE created_at < ?", (created_before,)).rowcount
+            overflow = self._writer.execute(
+                """
+                DELETE FROM step_cache WHERE key IN (
+                    SELECT key FROM step_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (max_entries,),
+            ).rowcount
+        return expired + overflow
+
+    def step_cache_summary(self) -> dict[str, Any]:
+        row = self._reader().execute("SELECT COUNT(*) AS entries, COALESCE(SUM(hits), 0) AS hits FROM step_cache").fetchone()
+        return {"entries": row["entries"], "hits": row["hits"]}
+
+    def _upsert_fingerprints(self, fingerprints: list[tuple[str, int, int, int, str, int]]) -> None:
+        # Called inside a writer transaction.
+        self._writer.executemany(
+            """
+            INSERT INTO file_fingerprints (path, size, mtime_ns, inode, sha256, recorded_ns)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(path) DO UPDATE SET
+                size = excluded.size, mtime_ns = excluded.mtime_ns, inode = excluded.inode,
+                sha256 = excluded.sha256, recorded_ns = excluded.recorded_ns
+            """,
+            fingerprints,
+        )
+
+    def _put_object_refs(self, object_refs: list[tuple[str, str, int]]) -> None:
+        # Called inside a writer transaction. A path moving to new content releases its old object.
+        ts = now_iso()
+        for path, sha256, size in object_refs:
+            previous = self._writer.execute("SELECT sha256 FROM object_refs WHERE path = ?", (path,)).fetchone()
+            if previous is not None and previous["sha256"] == sha256:
+                continue
+            if previous is not None:
+                self._writer.execute("UPDATE objects SET refcount = refcount - 1 WHERE sha256 = ?", (previous["sha256"],))
+            self._writer.execute(
+                "INSERT OR REPLACE INTO object_refs (path, sha256, created_at) VALUES (?, ?, ?)",
+                (path, sha256, ts),
+            )
+            self._writer.execute(
+                """
+                INSERT INTO objects (sha256, size, refcount, created_at) VALUES (?, ?, 1, ?)
+                ON CONFLICT(sha256) DO UPDATE SET refcount = refcount + 1
+                """,
+                (sha256, size, ts),
+            )
+
+    def _refresh_rollup_latest(self, project_query: str, key: str) -> None:
+        # Called inside a writer transaction; `project_query` selects the project to refresh.
+        self._writer.execute(
+            f"UPDATE project_rollups SET {ROLLUP_LATEST_ASSIGNMENT}, updated_at = ? WHERE project_id = ({project_query})",
+            (now_iso(), key),
+        )
+
+    def _refresh_rollup_totals(self, run_id: str) -> None:
+        # Absolute stats writes cannot be applied as deltas; re-sum the run's project instead.
+        self._writer.execute(
+            f"""
+            UPDATE project_rollups SET {ROLLUP_TOTALS_ASSIGNMENT}, updated_at = ?
+            WHERE project_id = (SELECT project_id FROM runs WHERE id = ?)
+            """,
+            (now_iso(), run_id),
+        )
+
+    def _stream_rows(self, sql: str, params: tuple[Any, ...], batch_size: int) -> Iterator[list[sqlite3.Row]]:
+        # Exports use their own connection: a streaming response may resume the generator
+        # on different threads, and a long read must not tie up the thread's reader. The
+        # single read transaction keeps the export a consistent snapshot.
+        conn = sqlite3.connect(self._read_uri, uri=True, check_same_thread=False)
+        try:
+            conn.row_factory = sqlite3.Row
+            self._apply_pragmas(conn)
+            conn.execute("PRAGMA query_only=ON")
+            conn.execute("BEGIN")
+            cursor = conn.execute(sql, params)
+            while rows := cursor.fetchmany(batch_size):
+                yield rows
+        finally:
+            conn.close()
+
+    def _select_in(
+        self,
+        sql: str,
+        ids: list[str],
+        params: list[Any] | tuple[Any, ...] = (),
+        conn: sqlite3.Connection | None = None,
+    ) -> list[sqlite3.Row]:
+        """Run `sql` with its `{ids}` placeholder expanded, in chunks of `IN_CLAUSE_CHUNK` ids.
+
+        `params` bind the placeholders that precede `{ids}`.
+        """
+        conn = conn or self._reader()
+        rows: list[sqlite3.Row] = []
+        for start in range(0, len(ids), IN_CLAUSE_CHUNK):
+            chunk = ids[start : start + IN_CLAUSE_CHUNK]
+            rows.extend(conn.execute(sql.format(ids=", ".join("?" * len(chunk))), [*params, *chunk]).fetchall())
+        return rows
+
+    def flush(self) -> None:
+        """Write all buffered job inserts and stats deltas in one transaction."""
+        with self._lock:
+            if not self._pending_jobs and not self._pending_stats:
+                return
+            jobs, self._pending_jobs = self._pending_jobs, []
+            blobs, self._pending_blobs = self._pending_blobs, {}
+            metrics, self._pending_metrics = self._pending_metrics, []
+            stats, self._pending_stats = self._pending_stats, {}
+            self._pending_since = None
+            ts = now_iso()
+            assignments = ", ".join(f"{key} = {key} + ?" for key in STATS_COUNTERS)
+            with self._writer:
+                # Identical payloads (e.g. a task spec logged on every attempt) are stored once.
+                self._writer.executemany(
+                    "INSERT OR IGNORE INTO blobs (sha256, size, encoding, data, created_at) VALUES (?, ?, ?, ?, ?)",
+                    blobs.values(),
+                )
+                self._writer.executemany(
+                    f"INSERT INTO jobs ({JOB_COLUMNS}) VALUES ({', '.join('?' * 13)})",
+                    jobs,
+                )
+                self._writer.executemany(
+                    f"""
+                    INSERT INTO step_metrics (run_id, step_id, step_key, attempt, {", ".join(STATS_COUNTERS)}, created_at)
+                    VALUES (?, ?, ?, ?, {", ".join("?" for _ in STATS_COUNTERS)}, ?)
+                    """,
+                    metrics,
+                )
+                rows = [(*(deltas[key] for key in STATS_COUNTERS), ts, run_id) for run_id, deltas in stats.items()]
+                self._writer.executemany(f"UPDATE stats SET {assignments}, updated_at = ? WHERE run_id = ?", rows)
+                self._writer.executemany(
+                    f"""
+                    UPDATE project_rollups SET {assignments}, updated_at = ?
+                    WHERE project_id = (SELECT project_id FROM runs WHERE id = ?)
+                    """,
+                    rows,
+                )
+
+    def _flush_pending_jobs(self) -> None:
+        # Reads flush first so callers always see the jobs they have appended.
+        if self._pending_jobs:
+            self.flush()
+
+    def _maybe_flush(self) -> None:
+        now = time.monotonic()
+        if self._pending_since is None:
+            self._pending_since = now
+        pending = len(self._pending_jobs) + len(self._pending_stats)
+        if pending >= self.write_buffer_size or now - self._pending_since >= self.write_buffer_interval:
+            self.flush()
+        elif self._flush_timer is None and not self._closed:
+            # Fires at most `write_buffer_interval` after the oldest buffered write.
+            delay = self.write_buffer_interval - (now - self._pending_since)
+            self._flush_timer = threading.Timer(delay, self._flush_due)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _flush_due(self) -> None:
+        with self._lock:
+            self._flush_timer = None
+            if not self._closed:
+                self.flush()
+
     @staticmethod
     def _row_to_project(row: sqlite3.Row) -> dict[str, Any]:
         return {
@@ -373,6 +1465,7 @@ class Database:
             "updatedAt": row["updated_at"],
             "startedAt": row["started_at"],
             "endedAt": row["ended_at"],
+            "stepCache": bool(row["step_cache"]),
         }
 
     @staticmethod
@@ -389,8 +1482,23 @@ class Database:
             "errorMessage": row["error_message"],
         }
 
+    @staticmethod
+    def _job_query(include_raw: bool) -> str:
+        """`SELECT ... FROM jobs`, joining `blobs` so `raw` is the full payload when included."""
+        columns = ", ".join(f"jobs.{column}" for column in JOB_COLUMNS.split(", "))
+        if not include_raw:
+            return f"SELECT {columns.replace(', jobs.raw,', ',')} FROM jobs"
+        return (
+            f"SELECT {columns}, blobs.encoding AS raw_encoding, blobs.data AS raw_data "
+            "FROM jobs LEFT JOIN blobs ON blobs.sha256 = jobs.raw_ref"
+        )
+
     @staticmethod
     def _row_to_job(row: sqlite3.Row) -> dict[str, Any]:
+        raw = {}
+        if "raw" in row.keys():
+            data = row["raw_data"]
+            raw["raw"] = decode_blob(row["raw_encoding"], data) if data is not None else row["raw"]
         return {
             "id": row["id"],
             "runId": row["run_id"],
@@ -402,7 +1510,8 @@ class Database:
             "workedFor": row["worked_for"],
             "source": row["source"],
             "level": row["level"],
-            "raw": row["raw"],
+            **raw,
+            "rawRef": row["raw_ref"],
             "createdAt": row["created_at"],
         }
 
@@ -419,9 +1528,20 @@ class Database:
         }
 
     @staticmethod
-    def _row_to_stats(row: sqlite3.Row) -> dict[str, Any]:
+    def _row_to_step_cache_entry(row: sqlite3.Row) -> dict[str, Any]:
+        return {
+            "key": row["key"],
+            "stepKey": row["step_key"],
+            "runnerVersion": row["runner_version"],
+            "result": json.loads(row["result"]),
+            "hits": row["hits"],
+            "createdAt": row["created_at"],
+            "lastUsedAt": row["last_used_at"],
+        }
+
+    @staticmethod
+    def _row_to_stats_totals(row: sqlite3.Row) -> dict[str, Any]:
         return {
-            "runId": row["run_id"],
             "hypothesis": row["hypothesis"],
             "papers": row["papers"],
             "tokens": row["tokens"],
@@ -431,3 +1551,42 @@ class Database:
             "gpuHours": row["gpu_hours"],
             "updatedAt": row["updated_at"],
         }
+
+    @staticmethod
+    def _row_to_project_summary(row: sqlite3.Row) -> dict[str, Any]:
+        latest_run = None
+        if row["latest_run_id"] is not None:
+            latest_run = {
+                "id": row["latest_run_id"],
+                "status": row["latest_run_status"],
+                "createdAt": row["latest_run_created_at"],
+            }
+        current_step = None
+        if row["current_step_key"] is not None:
+            current_step = {
+                "stepKey": row["current_step_key"],
+                "title": row["current_step_title"],
+                "number": row["current_step_number"],
+                "status": row["current_step_status"],
+            }
+        totals = {
+            "hypothesis": row["hypothesis"],
+            "papers": row["papers"],
+            "tokens": row["tokens"],
+            "costUsd": row["cost_usd"],
+            "elapsedSeconds": row["elapsed_seconds"],
+            "tokenCostUsd": row["token_cost_usd"],
+            "gpuHours": row["gpu_hours"],
+            "updatedAt": row["rollup_updated_at"],
+        }
+        return {
+            "project": Database._row_to_project(row),
+            "runs": row["runs"],
+            "latestRun": latest_run,
+            "currentStep": current_step,
+            "totals": totals,
+        }
+
+    @staticmethod
+    def _row_to_stats(row: sqlite3.Row) -> dict[str, Any]:
+        return {"runId": row["run_id"], **Database._row_to_stats_totals(row)}
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import os
 
 import pytest
@@ -36,3 +37,200 @@ async def test_api_end_to_end_flow(tmp_path) -> None:
 
     jobs = db.list_jobs(run["id"])
     assert len(jobs) >= 8
+
+    # Independent steps (no mutual dependency) execute concurrently.
+    by_key = {step["stepKey"]: step for step in steps}
+    assert by_key["literature_review"]["startedAt"] < by_key["topic_scoping"]["endedAt"]
+    assert by_key["hypothesis_generation"]["startedAt"] >= by_key["literature_review"]["endedAt"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_runs_keep_event_loop_responsive(tmp_path) -> None:
+    os.environ["OPENFARS_CODEX_MODE"] = "mock"
+
+    db = Database(tmp_path / "openfars_test.db")
+    db.initialize()
+    orchestrator = RunOrchestrator(
+        db=db,
+        event_bus=EventBus(),
+        workspace_root=tmp_path / "workspace",
+        max_step_workers=4,
+    )
+
+    project = db.create_project("Concurrent Project")
+    run_ids = [orchestrator.create_run(project["id"])["id"] for _ in range(3)]
+    runs = asyncio.gather(*(orchestrator._execute_run(run_id) for run_id in run_ids))  # noqa: SLF001
+
+    loop = asyncio.get_running_loop()
+    max_lag = 0.0
+    while not runs.done():
+        before = loop.time()
+        await asyncio.sleep(0.01)
+        max_lag = max(max_lag, loop.time() - before - 0.01)
+    await runs
+    orchestrator.shutdown()
+
+    # Mock steps sleep 0.25s each; running them inline would stall the loop that long.
+    assert max_lag < 0.2
+    assert all(db.get_run(run_id)["status"] == "completed" for run_id in run_ids)
+
+
+@pytest.mark.asyncio
+async def test_bulk_control_pauses_and_cancels_selected_runs(tmp_path) -> None:
+    os.environ["OPENFARS_CODEX_MODE"] = "mock"
+
+    db = Database(tmp_path / "openfars_test.db")
+    db.initialize()
+    orchestrator = RunOrchestrator(
+        db=db,
+        event_bus=EventBus(),
+        workspace_root=tmp_path / "workspace",
+        max_running_runs=1,
+    )
+    project = db.create_project("Sweep")
+    run_ids = [run["id"] for run in orchestrator.create_runs([project["id"]] * 4)]
+    for run_id in run_ids:
+        orchestrator.start_run(run_id)
+    assert [orchestrator.scheduler.is_queued(run_id) for run_id in run_ids] == [False, True, True, True]
+
+    await orchestrator.apply_control_many(run_ids[1:3], "pause")
+    assert [db.get_run(run_id)["status"] for run_id in run_ids[1:3]] == ["paused", "paused"]
+    assert not orchestrator.scheduler.is_queued(run_ids[1])
+
+    await orchestrator.apply_control_many(run_ids, "cancel")
+    await asyncio.sleep(0.3)
+    orchestrator.shutdown()
+    assert {db.get_run(run_id)["status"] for run_id in run_ids} == {"failed"}
+    assert not any(orchestrator.scheduler.is_queued(run_id) for run_id in run_ids)
+
+
+@pytest.mark.asyncio
+async def test_queue_position_updates_are_held_until_published(tmp_path) -> None:
+    os.environ["OPENFARS_CODEX_MODE"] = "mock"
+
+    db = Database(tmp_path / "openfars_test.db")
+    db.initialize()
+    bus = EventBus()
+    orchestrator = RunOrchestrator(db=db, event_bus=bus, workspace_root=tmp_path / "workspace", max_running_runs=1)
+    queued: list[tuple[str, int]] = []
+    bus.add_listener(
+        lambda run_id, event, payload: queued.append((run_id, payload["queue"]["position"]))
+        if event == "run_queued"
+        else None
+    )
+    project = db.create_project("Queue")
+    run_ids = [run["id"] for run in orchestrator.create_runs([project["id"]] * 4)]
+    for run_id in run_ids:
+        orchestrator.start_run(run_id)
+
+    # One publishing task per refresh, referenced until it finishes.
+    assert len(orchestrator._background_tasks) == 3  # noqa: SLF001
+    await asyncio.gather(*orchestrator._background_tasks)  # noqa: SLF001
+    assert not orchestrator._background_tasks  # noqa: SLF001
+    assert queued == [(run_ids[1], 1), (run_ids[2], 2), (run_ids[3], 3)]
+
+    await orchestrator.apply_control_many(run_ids, "cancel")
+    await asyncio.sleep(0.3)
+    orchestrator.shutdown()
+
+@pytest.mark.asyncio
+async def test_step_exception_fails_the_run_and_cancels_sibling_steps(tmp_path) -> None:
+    os.environ["OPENFARS_CODEX_MODE"] = "mock"
+
+    db = Database(tmp_path / "openfars_test.db")
+    db.initialize()
+    orchestrator = RunOrchestrator(db=db, event_bus=EventBus(), workspace_root=tmp_path / "workspace")
+    run = orchestrator.create_run(db.create_project("Crash")["id"])
+    events: list[tuple[str, dict]] = []
+    orchestrator.event_bus.add_listener(lambda _run_id, event, payload: events.append((event, payload)))
+
+    async def crash(_run, _run_id, _step_id, step_key, _attempt):
+        if step_key == "literature_review":
+            raise RuntimeError("boom")
+        await asyncio.sleep(30)
+
+    orchestrator._execute_step_cached = crash  # noqa: SLF001
+    await asyncio.wait_for(orchestrator._execute_run(run["id"]), timeout=5)  # noqa: SLF001
+    orchestrator.shutdown()
+
+    assert db.get_run(run["id"])["status"] == "failed"
+    [reason] = [payload["reason"] for event, payload in events if event == "run_failed"]
+    assert reason == "literature_review raised RuntimeError: boom"
+    steps = {step["stepKey"]: step for step in db.list_steps(run["id"])}
+    assert steps["literature_review"]["status"] == "error"
+    assert (steps["topic_scoping"]["status"], steps["topic_scoping"]["errorMessage"]) == ("error", "cancelled")
+
+
+@pytest.mark.asyncio
+async def test_pausing_a_running_run_frees_its_slot(tmp_path) -> None:
+    os.environ["OPENFARS_CODEX_MODE"] = "mock"
+
+    db = Database(tmp_path / "openfars_test.db")
+    db.initialize()
+    orchestrator = RunOrchestrator(
+        db=db,
+        event_bus=EventBus(),
+        workspace_root=tmp_path / "workspace",
+        max_running_runs=1,
+    )
+    project = db.create_project("Pause")
+    first, second = (run["id"] for run in orchestrator.create_runs([project["id"]] * 2))
+    orchestrator.start_run(first)
+    orchestrator.start_run(second)
+    assert orchestrator.scheduler.is_running(first) and orchestrator.scheduler.is_queued(second)
+
+    await orchestrator.apply_control_many([first], "pause")
+    assert orchestrator.scheduler.is_running(second)
+
+    await orchestrator.apply_control_many([first], "resume")
+    assert db.get_run(first)["status"] == "pending" and orchestrator.scheduler.is_queued(first)
+    for _ in range(200):
+        if {db.get_run(run_id)["status"] for run_id in (first, second)} == {"completed"}:
+            break
+        await asyncio.sleep(0.05)
+    orchestrator.shutdown()
+    assert {db.get_run(run_id)["status"] for run_id in (first, second)} == {"completed"}
+    assert orchestrator.scheduler.queue_info(first)["running"] == 0
+
+
+@pytest.mark.asyncio
+async def test_rerun_reuses_cached_step_results_unless_opted_out(tmp_path) -> None:
+    os.environ["OPENFARS_CODEX_MODE"] = "mock"
+
+    db = Database(tmp_path / "openfars_test.db")
+    db.initialize()
+    orchestrator = RunOrchestrator(db=db, event_bus=EventBus(), workspace_root=tmp_path / "workspace")
+    project = db.create_project("Cached")
+
+    first = orchestrator.create_run(project["id"])
+    await orchestrator._execute_run(first["id"])  # noqa: SLF001
+    assert orchestrator.step_cache.stats()["entries"] == 8
+
+    second = orchestrator.create_run(project["id"])
+    await orchestrator._execute_run(second["id"])  # noqa: SLF001
+    assert db.get_run(second["id"])["status"] == "completed"
+    stats = orchestrator.step_cache.stats()
+    # The first run looked up code_and_execute twice: its first attempt fails and is retried.
+    assert (stats["hits"], stats["misses"]) == (8, 9)
+    assert stats["savedTokens"] == db.get_stats(first["id"])["tokens"] - 120_000  # the failed first attempt is not cached
+    assert db.get_stats(second["id"])["tokens"] == 0
+    assert sorted(item["sha256"] for item in db.list_artifacts(second["id"])) == sorted(
+        item["sha256"] for item in db.list_artifacts(first["id"])
+    )
+    assert all(job["source"] == "step-cache" for job in db.list_jobs(second["id"]))
+    # Both runs' artifacts are hardlinks of the same stored objects.
+    objects = orchestrator.artifacts.object_stats()
+    assert objects["logicalBytes"] == 2 * objects["storedBytes"] > 0
+
+    opted_out = orchestrator.create_run(project["id"], step_cache=False)
+    assert opted_out["stepCache"] is False
+    await orchestrator._execute_run(opted_out["id"])  # noqa: SLF001
+    assert orchestrator.step_cache.stats()["hits"] == 8
+    assert db.get_stats(opted_out["id"])["tokens"] > 0
+
+    # Identical steps in another project never reuse this project's results.
+    other = orchestrator.create_run(db.create_project("Other")["id"])
+    await orchestrator._execute_run(other["id"])  # noqa: SLF001
+    orchestrator.shutdown()
+    assert orchestrator.step_cache.stats()["hits"] == 8
+    assert db.get_stats(other["id"])["tokens"] > 0
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import hashlib
+import os
+
+from backend.artifact_manager.manager import ArtifactManager, file_sha256
+from backend.storage import Database
+
+
+def test_register_hashes_concurrently_in_one_transaction(tmp_path) -> None:
+    db = Database(tmp_path / "openfars_test.db")
+    db.initialize()
+    project = db.create_project("Artifacts")
+    run = db.create_run(project["id"], [{"key": "a", "number": 1, "title": "A"}])
+    step_dir = tmp_path / "workspace" / "a"
+    step_dir.mkdir(parents=True)
+    paths = []
+    for index in range(5):
+        path = step_dir / f"out_{index}.bin"
+        path.write_bytes(os.urandom(3 * 1024 * 1024 + index))
+        paths.append(path)
+
+    manager = ArtifactManager(db, artifact_root=tmp_path, max_workers=3)
+    artifacts = manager.register(run["id"], None, paths)
+    manager.shutdown()
+
+    assert [item["path"] for item in artifacts] == [f"workspace/a/out_{index}.bin" for index in range(5)]
+    assert [item["sha256"] for item in artifacts] == [hashlib.sha256(path.read_bytes()).hexdigest() for path in paths]
+    assert sorted(item["id"] for item in db.list_artifacts(run["id"])) == sorted(item["id"] for item in artifacts)
+    assert file_sha256(paths[0], buffer_size=7) == artifacts[0]["sha256"]
+    db.close()
+
+
+def test_fingerprints_skip_rehashing_unchanged_files(tmp_path) -> None:
+    db = Database(tmp_path / "openfars_test.db")
+    db.initialize()
+    manager = ArtifactManager(db, artifact_root=tmp_path)
+    settled, fresh = tmp_path / "settled.txt", tmp_path / "fresh.txt"
+    settled.write_text("same", encoding="utf-8")
+    fresh.write_text("new", encoding="utf-8")
+    os.utime(settled, ns=(1_000_000_000, 1_000_000_000))
+
+    first = manager.digests([settled, fresh])
+    second = manager.digests([settled, fresh])
+    assert first == second
+    # The settled file is reused; the fresh one is modified within the racy window of
+    # its first hash, so it is hashed again before its fingerprint is trusted.
+    assert (manager.hashed, manager.reused) == (3, 1)
+
+    settled.write_text("diff", encoding="utf-8")
+    os.utime(settled, ns=(2_000_000_000, 2_000_000_000))
+    changed = manager.digest(settled)
+    assert changed.sha256 == hashlib.sha256(b"diff").hexdigest()
+    assert (manager.hashed, manager.reused) == (4, 1)
+    manager.shutdown()
+    db.close()
+
+
+def test_object_store_dedupes_links_and_collects_garbage(tmp_path) -> None:
+    db = Database(tmp_path / "openfars_test.db")
+    db.initialize()
+    project = db.create_project("Objects")
+    run = db.create_run(project["id"], [{"key": "a", "number": 1, "title": "A"}])
+    manager = ArtifactManager(db, artifact_root=tmp_path, object_root=tmp_path / "objects")
+    first_dir, second_dir = tmp_path / "workspace" / "run_1", tmp_path / "workspace" / "run_2"
+    first_dir.mkdir(parents=True)
+    second_dir.mkdir(parents=True)
+    (first_dir / "report.json").write_text('{"ok": true}', encoding="utf-8")
+    (second_dir / "report.json").write_text('{"ok": true}', encoding="utf-8")
+
+    manager.register(run["id"], None, [first_dir / "report.json", second_dir / "report.json"])
+    assert os.path.samefile(first_dir / "report.json", second_dir / "report.json")
+    assert (first_dir / "report.json").stat().st_mode & 0o777 == 0o444
+    stats = manager.object_stats()
+    assert (stats["objects"], stats["refs"], stats["savedBytes"]) == (1, 2, 12)
+
+    sha256 = hashlib.sha256(b'{"ok": true}').hexdigest()
+    assert manager.materialize(sha256, 12, tmp_path / "workspace" / "run_3" / "report.json")
+    assert manager.object_stats()["refs"] == 3
+
+    # A step about to run again gets private, writable copies of its files.
+    manager.release(second_dir)
+    assert not os.path.samefile(first_dir / "report.json", second_dir / "report.json")
+    (second_dir / "report.json").write_text("{}", encoding="utf-8")
+    assert (first_dir / "report.json").read_text(encoding="utf-8") == '{"ok": true}'
+
+    # Objects live as long as a workspace file links them, then GC reclaims them.
+    assert manager.collect_garbage(grace_seconds=0)["objectsDeleted"] == 0
+    (first_dir / "report.json").unlink()
+    (tmp_path / "workspace" / "run_3" / "report.json").unlink()
+    assert manager.collect_garbage(grace_seconds=0) == {"refsDropped": 2, "objectsDeleted": 1, "bytesFreed": 12}
+    assert manager.object_stats()["objects"] == 0
+    assert not manager.materialize(sha256, 12, tmp_path / "workspace" / "run_4" / "report.json")
+    manager.shutdown()
+    db.close()
+
+
+def test_object_store_quarantines_corrupt_objects_and_keeps_shared_ones(tmp_path) -> None:
+    db = Database(tmp_path / "openfars_test.db")
+    db.initialize()
+    manager = ArtifactManager(db, artifact_root=tmp_path, object_root=tmp_path / "objects")
+    first, second = tmp_path / "first.json", tmp_path / "second.json"
+    first.write_text('{"ok": true}', encoding="utf-8")
+    second.write_text('{"ok": true}', encoding="utf-8")
+    sha256 = hashlib.sha256(b'{"ok": true}').hexdigest()
+    manager.ingest([first])
+
+    # Same size, different bytes: a size check alone would share the damage.
+    os.chmod(first, 0o644)
+    first.write_text('{"no": true}', encoding="utf-8")
+    manager.ingest([second])
+    stored = manager.objects.object_path(sha256)
+    assert hashlib.sha256(stored.read_bytes()).hexdigest() == sha256
+    assert os.path.samefile(second, stored) and not os.path.samefile(first, stored)
+    assert len(list((tmp_path / "objects" / "quarantine").iterdir())) == 1
+
+    # An object whose refs are gone but that a file still links is not deleted.
+    db.remove_object_refs([str(second.resolve())])
+    assert manager.collect_garbage(grace_seconds=0)["objectsDeleted"] == 0
+    assert stored.is_file() and second.read_text(encoding="utf-8") == '{"ok": true}'
+    manager.shutdown()
+    db.close()
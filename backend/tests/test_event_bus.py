@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+
+import pytest
+
+from backend.event_backends import EventBackend, InMemoryEventBackend, SQLiteEventBackend
+from backend.event_bus import EventBus
+from backend.storage import Database
+
+
+class FakeSocket:
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+        self.sent: list[dict] = []
+        self.closed_with: int | None = None
+        self.release = asyncio.Event()
+        if delay == 0:
+            self.release.set()
+
+    async def send_text(self, text: str) -> None:
+        await self.release.wait()
+        await asyncio.sleep(self.delay)
+        self.sent.append(json.loads(text))
+
+    async def close(self, code: int = 1000) -> None:
+        self.closed_with = code
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_does_not_block_publish() -> None:
+    bus = EventBus(max_queue=100)
+    fast, slow = FakeSocket(), FakeSocket(delay=10)
+    await bus.subscribe("run_1", fast)
+    await bus.subscribe("run_1", slow)
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    for index in range(20):
+        await bus.publish("run_1", "job_log_appended", {"job": {"id": f"job_{index}"}})
+    assert loop.time() - started < 0.1
+
+    await asyncio.sleep(0.05)
+    assert [item["payload"]["job"]["id"] for item in fast.sent] == [f"job_{index}" for index in range(20)]
+    assert slow.sent == []
+    bus.close()
+
+
+@pytest.mark.asyncio
+async def test_overflow_policies() -> None:
+    dropping = EventBus(max_queue=3, overflow="drop_oldest")
+    socket = FakeSocket()
+    socket.release.clear()
+    await dropping.subscribe("run_1", socket)
+    await dropping.publish("run_1", "job_log_appended", {"job": {"id": "job_0"}})
+    await asyncio.sleep(0)
+    for index in range(1, 6):
+        await dropping.publish("run_1", "job_log_appended", {"job": {"id": f"job_{index}"}})
+    socket.release.set()
+    await asyncio.sleep(0.01)
+    # The first message was already in flight; the queue kept only the newest three.
+    assert [item["payload"]["job"]["id"] for item in socket.sent] == ["job_0", "job_3", "job_4", "job_5"]
+    dropping.close()
+
+    coalescing = EventBus(max_queue=2, overflow="coalesce")
+    socket = FakeSocket()
+    socket.release.clear()
+    await coalescing.subscribe("run_1", socket)
+    await coalescing.publish("run_1", "job_log_appended", {"job": {"id": "in_flight"}})
+    await asyncio.sleep(0)
+    await coalescing.publish("run_1", "stats_updated", {"stats": {"runId": "run_1", "papers": 1}})
+    await coalescing.publish("run_1", "job_log_appended", {"job": {"id": "job_1"}})
+    await coalescing.publish("run_1", "stats_updated", {"stats": {"runId": "run_1", "papers": 2}})
+    socket.release.set()
+    await asyncio.sleep(0.01)
+    assert [item["event"] for item in socket.sent] == ["job_log_appended", "job_log_appended", "stats_updated"]
+    assert socket.sent[-1]["payload"]["stats"]["papers"] == 2
+    coalescing.close()
+
+    disconnecting = EventBus(max_queue=1, overflow="disconnect")
+    socket = FakeSocket()
+    socket.release.clear()
+    await disconnecting.subscribe("run_1", socket)
+    for index in range(3):
+        await disconnecting.publish("run_1", "job_log_appended", {"job": {"id": f"job_{index}"}})
+    await asyncio.sleep(0.01)
+    assert socket.closed_with == 1013
+    assert disconnecting.subscriber_count("run_1") == 0
+
+
+@pytest.mark.asyncio
+async def test_replay_from_memory_and_spilled_events(tmp_path) -> None:
+    db = Database(tmp_path / "openfars_test.db")
+    db.initialize()
+    bus = EventBus(replay_size=4, event_store=db)
+
+    for index in range(12):
+        await bus.publish("run_1", "job_log_appended", {"job": {"id": f"job_{index}"}})
+    assert bus.current_seq("run_1") == 12
+    assert db.max_event_seq("run_1") > 0
+
+    missed = bus.replay("run_1", since=2)
+    assert missed is not None
+    assert [json.loads(text)["seq"] for text in missed] == list(range(3, 13))
+    assert bus.replay("run_1", since=12) == []
+    assert bus.replay("run_1", since=20) is None
+
+    # A restarted bus continues the sequence from the spilled events.
+    bus.close()
+    restarted = EventBus(replay_size=4, event_store=db)
+    assert restarted.current_seq("run_1") == 12
+    assert len(restarted.replay("run_1", since=0) or []) == 12
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_forgets_the_oldest_finished_runs() -> None:
+    backend = InMemoryEventBackend(replay_size=4, finished_retained=2)
+    bus = EventBus(backend=backend)
+
+    for run_id in ("run_1", "run_2", "run_3"):
+        await bus.publish(run_id, "step_updated", {"run": {"id": run_id}})
+        await bus.publish(run_id, "run_completed", {"run": {"id": run_id}})
+    # A retried run is live again and is not evicted with the finished ones.
+    await bus.publish("run_2", "step_updated", {"run": {"id": "run_2"}})
+    await bus.publish("run_4", "run_failed", {"run": {"id": "run_4"}})
+
+    assert set(backend._seq) == set(backend._rings) == {"run_2", "run_3", "run_4"}  # noqa: SLF001
+    assert len(bus.replay("run_2", since=0) or []) == 3
+    assert bus.current_seq("run_1") == 0
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_delivers_across_processes(tmp_path) -> None:
+    path = tmp_path / "openfars_test.db"
+    Database(path).initialize()
+    # Two Database/EventBus pairs on one file stand in for two uvicorn workers.
+    db_a, db_b = Database(path), Database(path)
+    worker_a = EventBus(backend=SQLiteEventBackend(db_a, poll_interval=0.01))
+    worker_b = EventBus(backend=SQLiteEventBackend(db_b, poll_interval=0.01))
+    await worker_a.start()
+    await worker_b.start()
+
+    socket = FakeSocket()
+    await worker_b.subscribe("run_1", socket)
+    await worker_a.publish("run_1", "step_updated", {"step": {"id": "s1"}})
+    await worker_b.publish("run_1", "step_updated", {"step": {"id": "s2"}})
+    await worker_a.publish("run_1", "run_completed", {"run": {"id": "run_1"}})
+    await asyncio.sleep(0.1)
+
+    assert [(item["seq"], item["event"]) for item in sorted(socket.sent, key=lambda item: item["seq"])] == [
+        (1, "step_updated"),
+        (2, "step_updated"),
+        (3, "run_completed"),
+    ]
+    assert worker_a.current_seq("run_1") == 3
+    assert len(worker_b.replay("run_1", since=1) or []) == 2
+
+    worker_a.close()
+    worker_b.close()
+    db_a.close()
+    db_b.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_tail_survives_database_errors(tmp_path) -> None:
+    path = tmp_path / "openfars_test.db"
+    Database(path).initialize()
+    db_a, db_b = Database(path), Database(path)
+    worker_a = EventBus(backend=SQLiteEventBackend(db_a, poll_interval=0.01))
+    worker_b = EventBus(backend=SQLiteEventBackend(db_b, poll_interval=0.01))
+    await worker_b.start()
+
+    failures = iter([sqlite3.OperationalError("database is locked")] * 2)
+    list_events_after_id = db_b.list_events_after_id
+
+    def flaky(*args, **kwargs):
+        error = next(failures, None)
+        if error is not None:
+            raise error
+        return list_events_after_id(*args, **kwargs)
+
+    db_b.list_events_after_id = flaky
+    socket = FakeSocket()
+    await worker_b.subscribe("run_1", socket)
+    await worker_a.publish("run_1", "step_updated", {"step": {"id": "s1"}})
+    for _ in range(50):
+        if socket.sent:
+            break
+        await asyncio.sleep(0.02)
+    assert [item["seq"] for item in socket.sent] == [1]
+
+    worker_a.close()
+    worker_b.close()
+    db_a.close()
+    db_b.close()
+
+
+def test_event_backends_must_implement_sequencing() -> None:
+    class Incomplete(EventBackend):
+        def append(self, run_id, event, timestamp, encode):
+            return 1, encode(1)
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+@pytest.mark.asyncio
+async def test_batched_subscriber_coalesces_and_sends_deltas() -> None:
+    bus = EventBus(max_queue=100)
+    socket = FakeSocket()
+    subscriber = await bus.subscribe("run_1", socket, batched=True, window=0.02)
+    step = {"id": "s1", "status": "pending", "progress": 0, "title": "Topic Scoping"}
+    subscriber.send({"event": "snapshot", "seq": 0, "payload": {"run": {"id": "run_1"}, "steps": [step]}})
+
+    await bus.publish("run_1", "step_updated", {"step": {**step, "status": "running"}})
+    await bus.publish("run_1", "job_log_appended", {"job": {"id": "j1"}})
+    await bus.publish("run_1", "step_updated", {"step": {**step, "status": "running", "progress": 40}})
+    await asyncio.sleep(0.05)
+
+    assert [message["event"] for message in socket.sent] == ["snapshot", "batch"]
+    events = socket.sent[1]["events"]
+    assert [(item["seq"], item["event"]) for item in events] == [(2, "job_log_appended"), (3, "step_updated")]
+    assert events[1]["partial"] == ["step"]
+    assert events[1]["payload"]["step"] == {"id": "s1", "status": "running", "progress": 40}
+
+    await bus.publish("run_1", "step_updated", {"step": {**step, "status": "completed", "progress": 100}})
+    await asyncio.sleep(0.05)
+    assert socket.sent[2]["events"][0]["payload"]["step"] == {"id": "s1", "status": "completed", "progress": 100}
+    bus.close()
+
+
+@pytest.mark.asyncio
+async def test_batched_subscriber_sends_full_entities_after_dropping_a_frame() -> None:
+    bus = EventBus(max_queue=1, overflow="drop_oldest")
+    socket = FakeSocket(delay=0.001)
+    socket.release.clear()
+    subscriber = await bus.subscribe("run_1", socket, batched=True, window=0.01)
+    step = {"id": "s1", "status": "pending", "progress": 0, "title": "Topic Scoping"}
+    subscriber.send({"event": "snapshot", "seq": 0, "payload": {"run": {"id": "run_1"}, "steps": [step]}})
+    await asyncio.sleep(0.02)  # The writer holds the snapshot; the queue is empty again.
+
+    await bus.publish("run_1", "step_updated", {"step": {**step, "status": "running"}})
+    await asyncio.sleep(0.03)
+    await bus.publish("run_1", "step_updated", {"step": {**step, "status": "running", "progress": 40}})
+    await asyncio.sleep(0.03)
+    assert subscriber.dropped == 1
+
+    socket.release.set()
+    await asyncio.sleep(0.05)
+    # The frame with `status: running` was dropped, so the next one carries the whole step.
+    assert [message["event"] for message in socket.sent] == ["snapshot", "batch"]
+    [event] = socket.sent[1]["events"]
+    assert "partial" not in event
+    assert event["payload"]["step"] == {**step, "status": "running", "progress": 40}
+
+    await bus.publish("run_1", "step_updated", {"step": {**step, "status": "running", "progress": 60}})
+    await asyncio.sleep(0.05)
+    assert socket.sent[2]["events"][0]["payload"]["step"] == {"id": "s1", "progress": 60}
+    bus.close()
+
+
+@pytest.mark.asyncio
+async def test_project_subscription_receives_each_event_once(tmp_path) -> None:
+    db = Database(tmp_path / "openfars_test.db")
+    db.initialize()
+    project = db.create_project("Wall")
+    run = db.create_run(project["id"], [])
+    bus = EventBus(event_store=db)
+    socket = FakeSocket()
+    await bus.subscribe_project(project["id"], socket)
+    await bus.subscribe(run["id"], socket)
+
+    # Unbound runs are resolved through the store on their first event.
+    await bus.publish(run["id"], "run_started", {"run": run})
+    bus.bind_run("run_other", "another_project")
+    await bus.publish("run_other", "run_started", {"run": {"id": "run_other"}})
+    await asyncio.sleep(0.01)
+    assert [(item["runId"], item["event"]) for item in socket.sent] == [(run["id"], "run_started")]
+
+    await bus.unsubscribe(run["id"], socket)
+    await bus.publish(run["id"], "run_completed", {"run": run})
+    await asyncio.sleep(0.01)
+    assert [item["event"] for item in socket.sent] == ["run_started", "run_completed"]
+    bus.close()
+    db.close()
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import pytest
 
-from backend.codex_runner.parser import parse_openfars_result
+from backend.codex_runner.parser import ResultBlockScanner, parse_openfars_result
 
 
 def test_parse_openfars_result_success() -> None:
@@ -22,3 +22,52 @@ noise
 def test_parse_openfars_result_missing_block() -> None:
     with pytest.raises(ValueError, match="Missing"):
         parse_openfars_result("no result")
+
+
+def test_result_block_scanner_keeps_last_complete_block() -> None:
+    scanner = ResultBlockScanner()
+    lines = [
+        "noise\n",
+        '<openfars_result>{"status":"failed","summary":"first"}</openfars_result>\n',
+        "<openfars_result>\n",
+        '{"status":"success","summary":"second","metrics":{"nested":{"a":1}}}\n',
+        "</openfars_result>\n",
+        "<openfars_result>\n",
+        '{"status":"success","summary":"truncated"\n',
+    ]
+    for line in lines:
+        scanner.feed_line(line)
+
+    parsed = scanner.result()
+    assert parsed.summary == "second"
+    assert parsed.metrics == {"nested": {"a": 1}}
+
+
+def test_result_block_scanner_handles_tags_split_across_chunks() -> None:
+    raw = (
+        "prose mentioning <openfars_result> without closing it\n"
+        '<openfars_result>{"status":"success","summary":"chunked","artifacts":["out.md"]}</openfars_result>'
+        "trailing noise <openf"
+    )
+    for size in (1, 3, 7, 64):
+        scanner = ResultBlockScanner(max_block_chars=200)
+        for start in range(0, len(raw), size):
+            scanner.feed(raw[start : start + size])
+        assert scanner.result().summary == "chunked"
+        assert scanner.result().artifacts == ["out.md"]
+        assert len(scanner._carry) < len("</openfars_result>")  # noqa: SLF001
+
+
+def test_result_block_scanner_rejects_blocks_failing_schema() -> None:
+    scanner = ResultBlockScanner(max_block_chars=50)
+    scanner.feed('<openfars_result>{"status":"success","artifacts":[1]}</openfars_result>')
+    with pytest.raises(ValueError, match="artifacts"):
+        scanner.result()
+
+    scanner.feed('<openfars_result>{"status":"done"}</openfars_result>')
+    scanner.feed('<openfars_result>{"status":"success","summary":"' + "x" * 100 + '"}</openfars_result>')
+    with pytest.raises(ValueError, match="size limit"):
+        scanner.result()
+
+    scanner.feed('<openfars_result>{"status":"failed","summary":"ok"}</openfars_result>')
+    assert scanner.result().status == "failed"
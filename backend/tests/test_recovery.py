@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sqlite3
+
+import pytest
+
+from backend.event_bus import EventBus
+from backend.orchestrator.engine import RunOrchestrator
+from backend.orchestrator.recovery import RunRecovery
+from backend.storage import Database, now_iso
+
+
+@pytest.mark.asyncio
+async def test_recovery_resumes_orphaned_runs_from_checkpoints(tmp_path) -> None:
+    os.environ["OPENFARS_CODEX_MODE"] = "mock"
+
+    db = Database(tmp_path / "openfars_test.db")
+    db.initialize()
+    workspace = tmp_path / "workspace"
+    orchestrator = RunOrchestrator(db=db, event_bus=EventBus(), workspace_root=workspace)
+    project = db.create_project("Restarted")
+    orphan, paused, alive = orchestrator.create_runs([project["id"]] * 3)
+
+    # State left behind by a worker that died while two steps of `orphan` were in flight.
+    db.update_runs(
+        {
+            orphan["id"]: {"status": "running", "started_at": now_iso(), "worker_id": "worker_dead"},
+            paused["id"]: {"status": "paused", "started_at": now_iso(), "worker_id": "worker_dead"},
+            alive["id"]: {"status": "running", "started_at": now_iso(), "worker_id": "worker_alive"},
+        }
+    )
+    db.heartbeat_worker("worker_alive")
+    steps = {step["stepKey"]: step for step in db.list_steps(orphan["id"])}
+    db.update_step(steps["topic_scoping"]["id"], status="completed", started_at="t0", ended_at="t1")
+    db.update_step(steps["literature_review"]["id"], status="running", started_at="t0")
+    db.update_step(steps["hypothesis_generation"]["id"], status="running", started_at="t0")
+    # literature_review finished and recorded its metrics, but not its artifact or status.
+    review_dir = workspace / project["id"] / orphan["id"] / "literature_review"
+    review_dir.mkdir(parents=True)
+    (review_dir / "notes.md").write_text("notes", encoding="utf-8")
+    checkpoint = {"step": "literature_review", "attempt": 1, "status": "success", "summary": "ok", "artifacts": ["notes.md"]}
+    (review_dir / "step_state.json").write_text(json.dumps(checkpoint), encoding="utf-8")
+    db.record_step_metrics(orphan["id"], steps["literature_review"]["id"], "literature_review", 1, tokens=5)
+
+    recovery = RunRecovery(orchestrator, heartbeat_interval=60)
+    assert await recovery.start() == [orphan["id"], paused["id"]]
+    await orchestrator._controls[orphan["id"]].task  # noqa: SLF001
+    recovery.close()
+    orchestrator.shutdown()
+
+    assert db.get_run(orphan["id"])["status"] == "completed"
+    assert db.get_run(paused["id"])["status"] == "paused"
+    assert db.get_run(alive["id"])["status"] == "running"
+    after = {step["stepKey"]: step for step in db.list_steps(orphan["id"])}
+    assert after["topic_scoping"]["startedAt"] == "t0"
+    attempts = {item["stepKey"]: item["attempts"] for item in db.list_step_metrics(orphan["id"])}
+    assert "topic_scoping" not in attempts
+    assert attempts["literature_review"] == 1
+    assert attempts["hypothesis_generation"] == 1
+    assert any(item["path"].endswith("literature_review/notes.md") for item in db.list_artifacts(orphan["id"]))
+
+    # Nothing is left to claim once the runs belong to a live worker.
+    db.heartbeat_worker(orchestrator.worker_id)
+    assert db.claim_orphaned_runs("worker_other", "0") == []
+    db.close()
+
+
+def test_claim_returns_only_the_claimed_runs(tmp_path, monkeypatch) -> None:
+    db = Database(tmp_path / "openfars_test.db")
+    db.initialize()
+    project = db.create_project("Claims")
+    own, orphan = (db.create_run(project["id"], [{"key": "a", "number": 1, "title": "A"}]) for _ in range(2))
+    # Every write lands in the same clock tick as the claim.
+    monkeypatch.setattr("backend.storage.now_iso", lambda: "2030-01-01T00:00:00+00:00")
+    db.heartbeat_worker("worker_self")
+    db.update_runs(
+        {
+            own["id"]: {"status": "running", "worker_id": "worker_self"},
+            orphan["id"]: {"status": "running", "worker_id": "worker_dead"},
+        }
+    )
+
+    claimed = db.claim_orphaned_runs("worker_self", "2029-01-01T00:00:00+00:00")
+    assert [run["id"] for run in claimed] == [orphan["id"]]
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_recovery_resubmits_runs_that_were_still_queued(tmp_path) -> None:
+    os.environ["OPENFARS_CODEX_MODE"] = "mock"
+
+    db = Database(tmp_path / "openfars_test.db")
+    db.initialize()
+    stopped = RunOrchestrator(db=db, event_bus=EventBus(), workspace_root=tmp_path / "workspace", max_running_runs=1)
+    project = db.create_project("Queued")
+    run_ids = [run["id"] for run in stopped.create_runs([project["id"]] * 3)]
+    stopped.start_runs(run_ids, [0, 1, 5])
+    assert [stopped.scheduler.is_queued(run_id) for run_id in run_ids] == [True, True, False]
+    # The worker stops before anything executes: the launched task never runs.
+    stopped._controls[run_ids[2]].task.cancel()  # noqa: SLF001
+    stopped.shutdown()
+
+    orchestrator = RunOrchestrator(
+        db=db, event_bus=EventBus(), workspace_root=tmp_path / "workspace", max_running_runs=1
+    )
+    recovery = RunRecovery(orchestrator, heartbeat_interval=60)
+    assert await recovery.start() == run_ids
+    # The higher-priority queued run is dispatched first; the rest wait in the queue.
+    assert orchestrator.scheduler.is_running(run_ids[2])
+    assert orchestrator.scheduler.queue_position(run_ids[1]) == 1
+    assert orchestrator.scheduler.queue_position(run_ids[0]) == 2
+
+    await orchestrator.apply_control_many(run_ids, "cancel")
+    await asyncio.sleep(0.3)
+    recovery.close()
+    orchestrator.shutdown()
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_keeps_running_after_a_failed_beat(tmp_path) -> None:
+    db = Database(tmp_path / "openfars_test.db")
+    db.initialize()
+    orchestrator = RunOrchestrator(db=db, event_bus=EventBus(), workspace_root=tmp_path / "workspace")
+    recovery = RunRecovery(orchestrator, heartbeat_interval=0.02)
+    await recovery.start()
+
+    beats: list[str] = []
+    heartbeat = db.heartbeat_worker
+
+    def flaky_heartbeat(worker_id: str) -> None:
+        beats.append("attempt")
+        if len(beats) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        heartbeat(worker_id)
+        beats.append("landed")
+
+    db.heartbeat_worker = flaky_heartbeat
+    for _ in range(100):
+        if "landed" in beats:
+            break
+        await asyncio.sleep(0.01)
+    assert beats[:3] == ["attempt", "attempt", "landed"]
+    assert not recovery._heartbeat_task.done()  # noqa: SLF001
+    recovery.close()
+    orchestrator.shutdown()
+    db.close()
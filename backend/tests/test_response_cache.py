@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from backend.api.response_cache import RunResponseCache, etag_matches
+
+
+def test_cached_response_is_reused_until_the_run_changes() -> None:
+    cache = RunResponseCache(max_entries=2)
+    builds: list[str] = []
+
+    def build() -> dict:
+        builds.append("steps")
+        return {"steps": [{"id": "s1", "status": "pending"}]}
+
+    first = cache.get_or_build("run_1", "steps", build)
+    assert cache.get_or_build("run_1", "steps", build) is first
+    assert len(builds) == 1
+    assert first is not None and first.body == b'{"steps":[{"id":"s1","status":"pending"}]}'
+
+    cache.on_event("run_1", "step_updated", {})
+    second = cache.get_or_build("run_1", "steps", build)
+    assert second is not None and second.etag != first.etag
+    assert len(builds) == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    # Missing runs are not cached; the LRU keeps at most `max_entries` bodies.
+    assert cache.get_or_build("run_2", "run", lambda: None) is None
+    cache.get_or_build("run_2", "run", lambda: {"run": {}})
+    cache.get_or_build("run_3", "run", lambda: {"run": {}})
+    cache.get_or_build("run_1", "steps", build)
+    assert len(builds) == 3
+
+
+def test_etag_matching_accepts_lists_weak_tags_and_wildcard() -> None:
+    assert etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches(None, '"b"')
+    assert not etag_matches('"c"', '"b"')
+
+
+def test_run_versions_are_bounded_without_revalidating_stale_etags() -> None:
+    cache = RunResponseCache(max_entries=2)
+    cache.on_event("run_1", "step_updated", {})
+    first = cache.get_or_build("run_1", "run", lambda: {"run": {"status": "running"}})
+    assert first is not None
+
+    for run_id in ("run_2", "run_3", "run_4"):
+        cache.on_event(run_id, "step_updated", {})
+    assert len(cache._versions) == 2  # noqa: SLF001
+
+    # run_1's version was evicted: it is rebuilt under an ETag it never had before.
+    rebuilt = cache.get_or_build("run_1", "run", lambda: {"run": {"status": "running"}})
+    assert rebuilt is not None and rebuilt.etag != first.etag
+    cache.on_event("run_1", "run_completed", {})
+    changed = cache.get_or_build("run_1", "run", lambda: {"run": {"status": "completed"}})
+    assert changed is not None and changed.etag not in {first.etag, rebuilt.etag}
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import gzip
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.api.app import create_app
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENFARS_CODEX_MODE", "mock")
+    monkeypatch.setenv("OPENFARS_DB_PATH", str(tmp_path / "openfars_test.db"))
+    monkeypatch.setenv("OPENFARS_WORKSPACE_ROOT", str(tmp_path / "workspace"))
+    with TestClient(create_app()) as test_client:
+        yield test_client
+
+
+def test_job_exports_include_full_raw_payloads_moved_to_blobs(client) -> None:
+    db = client.app.state.db
+    project = db.create_project("Export")
+    run = db.create_run(project["id"], [{"key": "a", "number": 1, "title": "A"}])
+    spec = '{"task": "' + "analyse " * 500 + '"}'
+    db.add_job(run["id"], None, "Job", "spec", "running", "<1s", "codex", "info", spec)
+    db.add_job(run["id"], None, "Job", "small", "running", "<1s", "codex", "info", "short")
+
+    export = client.get(f"/api/runs/{run['id']}/jobs/export", params={"includeRaw": True})
+    assert export.status_code == 200
+    assert [json.loads(line)["raw"] for line in export.text.splitlines()] == [spec, "short"]
+
+    jobs = client.get(f"/api/runs/{run['id']}/jobs", params={"includeRaw": True}).json()["jobs"]
+    assert sorted(job["raw"] for job in jobs) == sorted([spec, "short"])
+
+
+def test_stream_rejects_malformed_control_messages_and_cleans_up(client) -> None:
+    db = client.app.state.db
+    run = db.create_run(db.create_project("Stream")["id"], [{"key": "a", "number": 1, "title": "A"}])
+    bus = client.app.state.event_bus
+
+    with client.websocket_connect("/ws/stream") as websocket:
+        websocket.send_text('{"action": "subscribe", "runIds": "abc"}')
+        assert websocket.receive_json() == {"event": "error", "message": "runIds must be a list of strings"}
+        websocket.send_text(json.dumps({"action": "subscribe", "runIds": [run["id"]], "since": {run["id"]: "abc"}}))
+        assert websocket.receive_json()["message"] == "since must map run ids to integer sequence numbers"
+
+        # The connection survives malformed messages.
+        websocket.send_text(json.dumps({"action": "subscribe", "runIds": [run["id"]]}))
+        assert websocket.receive_json()["event"] == "subscribed"
+        assert websocket.receive_json()["event"] == "snapshot"
+        assert bus.subscriber_count(run["id"]) == 1
+
+    for _ in range(100):
+        if bus.subscriber_count(run["id"]) == 0:
+            break
+        time.sleep(0.01)
+    assert bus.subscriber_count(run["id"]) == 0
+
+
+def test_run_reads_answer_304_until_the_run_changes(client) -> None:
+    project = client.post("/api/projects", json={"name": "ETags"}).json()["project"]
+    run = client.post(f"/api/projects/{project['id']}/runs", json={"autoStart": False}).json()["run"]
+
+    first = client.get(f"/api/runs/{run['id']}")
+    assert first.status_code == 200 and first.headers["Cache-Control"] == "no-cache"
+    etag = first.headers["ETag"]
+    unchanged = client.get(f"/api/runs/{run['id']}", headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304 and unchanged.content == b""
+    assert client.get(f"/api/runs/{run['id']}", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+    client.post(f"/api/runs/{run['id']}/control", json={"action": "cancel"})
+    changed = client.get(f"/api/runs/{run['id']}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+    assert changed.json()["run"]["status"] == "failed"
+    assert client.get("/api/runs/missing", headers={"If-None-Match": etag}).status_code == 404
+
+
+def test_gzip_job_export_streams_compressed_ndjson(client) -> None:
+    db = client.app.state.db
+    run = db.create_run(db.create_project("Gzip")["id"], [{"key": "a", "number": 1, "title": "A"}])
+    for index in range(3):
+        db.add_job(run["id"], None, "Job", f"line {index}", "running", "<1s", "codex", "info", "raw")
+
+    export = client.get(f"/api/runs/{run['id']}/jobs/export", params={"gzip": True, "includeRaw": False})
+    assert export.headers["content-type"] == "application/gzip"
+    assert export.headers["content-disposition"] == f'attachment; filename="{run["id"]}-jobs.ndjson.gz"'
+    jobs = [json.loads(line) for line in gzip.decompress(export.content).decode("utf-8").splitlines()]
+    assert [job["content"] for job in jobs] == ["line 0", "line 1", "line 2"]
+    assert all("raw" not in job for job in jobs)
+    assert client.get("/api/runs/missing/jobs/export", params={"gzip": True}).status_code == 404
+
+
+def test_batch_run_creation_and_control(client) -> None:
+    project = client.post("/api/projects", json={"name": "Batch"}).json()["project"]
+    spec = {"projectId": project["id"], "count": 3, "autoStart": False}
+
+    runs = client.post("/api/runs/batch", json={"runs": [spec]}).json()["runs"]
+    assert len(runs) == 3 and {run["status"] for run in runs} == {"pending"}
+    too_many = client.post("/api/runs/batch", json={"runs": [{**spec, "count": 1000}, spec]})
+    assert too_many.status_code == 400
+    missing = client.post("/api/runs/batch", json={"runs": [{**spec, "projectId": "nope"}]})
+    assert missing.status_code == 404 and "nope" in missing.json()["detail"]
+
+    assert client.post("/api/runs/control/batch", json={"action": "cancel"}).status_code == 400
+    paused = client.post(
+        "/api/runs/control/batch",
+        json={"action": "pause", "runIds": [runs[0]["id"]]},
+    ).json()
+    assert paused == {"action": "pause", "runIds": [runs[0]["id"]]}
+    cancelled = client.post(
+        "/api/runs/control/batch",
+        json={"action": "cancel", "projectId": project["id"], "status": ["pending"]},
+    ).json()
+    assert sorted(cancelled["runIds"]) == sorted(run["id"] for run in runs[1:])
+    statuses = {run["id"]: client.get(f"/api/runs/{run['id']}").json()["run"]["status"] for run in runs}
+    assert statuses == {runs[0]["id"]: "paused", runs[1]["id"]: "failed", runs[2]["id"]: "failed"}
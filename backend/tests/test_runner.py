@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import json
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from backend.codex_runner.runner import CodexRunner, write_task_spec
+from backend.event_bus import EventBus
+from backend.orchestrator.engine import RunOrchestrator
+from backend.storage import Database
+
+FAKE_CODEX = """#!{python}
+import sys
+import time
+
+for index in range(5):
+    print(f"progress line {{index}}", flush=True)
+print("warming up", file=sys.stderr, flush=True)
+time.sleep(0.3)
+print("<openfars_result>")
+print('{{"status": "success", "summary": "early", "artifacts": [], "metrics": {{}}, "next_inputs": {{}}}}')
+print("</openfars_result>")
+print('<openfars_result>{{"status": "success", "summary": "final", "artifacts": [], '
+      '"metrics": {{"tokens": 7}}, "next_inputs": {{}}}}</openfars_result>')
+"""
+
+
+def _fake_codex(tmp_path: Path) -> str:
+    script = tmp_path / "fake_codex"
+    script.write_text(FAKE_CODEX.format(python=sys.executable), encoding="utf-8")
+    script.chmod(0o755)
+    return str(script)
+
+
+@pytest.mark.asyncio
+async def test_streaming_runner_emits_logs_before_exit(tmp_path) -> None:
+    runner = CodexRunner()
+    runner.mode = "real"
+    runner.command = _fake_codex(tmp_path)
+    runner.log_flush_interval = 0.05
+    assert runner.streams_output()
+
+    batches: list[list[dict[str, str]]] = []
+
+    async def on_logs(logs: list[dict[str, str]]) -> None:
+        batches.append(logs)
+
+    result = await runner.run_step_streaming(
+        task_file=write_task_spec(tmp_path, {"goal": "test"}),
+        workspace_dir=tmp_path,
+        on_logs=on_logs,
+    )
+
+    assert result.status == "success"
+    assert result.summary == "final"
+    assert result.metrics == {"tokens": 7}
+
+    streamed = [log for batch in batches for log in batch]
+    # Progress lines are flushed while the process sleeps, not only at exit.
+    assert len(batches) >= 2
+    assert "progress line 0" in streamed[0]["raw"]
+    assert any(log["level"] == "warning" and "warming up" in log["raw"] for log in streamed)
+    assert result.logs[-1]["content"] == "Codex CLI execution finished"
+
+
+@pytest.mark.asyncio
+async def test_streaming_runner_reports_missing_result_block(tmp_path) -> None:
+    script = tmp_path / "silent_codex"
+    script.write_text(f"#!{sys.executable}\nprint('no structured output')\n", encoding="utf-8")
+    script.chmod(0o755)
+
+    runner = CodexRunner()
+    runner.mode = "real"
+    runner.command = str(script)
+
+    result = await runner.run_step_streaming(
+        task_file=write_task_spec(tmp_path, {"goal": "test"}),
+        workspace_dir=tmp_path,
+    )
+
+    assert result.status == "failed"
+    assert result.retriable
+    assert "Missing" in result.summary
+    assert any("no structured output" in log["raw"] for log in result.logs)
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_prepares_streamed_steps_off_the_event_loop(tmp_path) -> None:
+    db = Database(tmp_path / "openfars_test.db")
+    db.initialize()
+    orchestrator = RunOrchestrator(db=db, event_bus=EventBus(), workspace_root=tmp_path / "workspace")
+    orchestrator.runner.mode = "real"
+    orchestrator.runner.command = _fake_codex(tmp_path)
+    run = orchestrator.create_run(db.create_project("Streaming")["id"])
+    step = db.list_steps(run["id"])[0]
+
+    loop_thread = threading.get_ident()
+    write_threads: list[int] = []
+    prepare = orchestrator._prepare_step  # noqa: SLF001
+
+    def tracking_prepare(*args):
+        write_threads.append(threading.get_ident())
+        return prepare(*args)
+
+    orchestrator._prepare_step = tracking_prepare  # noqa: SLF001
+    result = await orchestrator._execute_step_off_loop(  # noqa: SLF001
+        run, run["id"], step["id"], step["stepKey"], attempt=1
+    )
+
+    workspace_dir = orchestrator.step_workspace(run, run["id"], step["stepKey"])
+    assert result.summary == "final"
+    assert write_threads and loop_thread not in write_threads
+    assert json.loads((workspace_dir / "task_spec.json").read_text(encoding="utf-8"))["context"]["run_id"] == run["id"]
+    assert json.loads((workspace_dir / "step_state.json").read_text(encoding="utf-8"))["summary"] == "final"
+    assert any("progress line 0" in job["content"] for job in db.list_jobs(run["id"]))
+    orchestrator.shutdown()
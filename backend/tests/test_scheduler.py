@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from backend.orchestrator.scheduler import RunScheduler
+
+
+class FakeLauncher:
+    def __init__(self) -> None:
+        self.started: list[str] = []
+        self.gates: dict[str, asyncio.Event] = {}
+
+    def __call__(self, run_id: str) -> asyncio.Task[None]:
+        self.started.append(run_id)
+        gate = self.gates.setdefault(run_id, asyncio.Event())
+        return asyncio.create_task(gate.wait())
+
+    async def finish(self, run_id: str) -> None:
+        self.gates[run_id].set()
+        # Let the task complete and its done callback dispatch the next run.
+        for _ in range(3):
+            await asyncio.sleep(0)
+
+    async def finish_all(self) -> None:
+        while any(not gate.is_set() for gate in self.gates.values()):
+            for run_id, gate in list(self.gates.items()):
+                if not gate.is_set():
+                    await self.finish(run_id)
+
+
+@pytest.mark.asyncio
+async def test_scheduler_enforces_global_and_project_limits() -> None:
+    launcher = FakeLauncher()
+    scheduler = RunScheduler(launch=launcher, max_running=3, max_running_per_project=2)
+
+    for index in range(4):
+        scheduler.submit(f"a{index}", "project_a")
+    scheduler.submit("b0", "project_b")
+
+    assert launcher.started == ["a0", "a1", "b0"]
+    assert scheduler.queue_position("a2") == 1
+    assert scheduler.queue_position("a3") == 2
+    assert scheduler.queue_info("a2")["state"] == "queued"
+
+    await launcher.finish("b0")
+    # project_a is at its per-project cap, so the free slot stays idle.
+    assert launcher.started == ["a0", "a1", "b0"]
+
+    await launcher.finish("a0")
+    assert launcher.started == ["a0", "a1", "b0", "a2"]
+    assert scheduler.queue_position("a3") == 1
+    await launcher.finish_all()
+
+
+@pytest.mark.asyncio
+async def test_scheduler_fair_share_and_priority() -> None:
+    launcher = FakeLauncher()
+    reported: list[dict[str, int]] = []
+    scheduler = RunScheduler(
+        launch=launcher,
+        max_running=2,
+        max_running_per_project=5,
+        on_positions_changed=reported.append,
+    )
+
+    scheduler.submit("a0", "project_a")
+    scheduler.submit("a1", "project_a")
+    scheduler.submit("a2", "project_a")
+    scheduler.submit("a3", "project_a", priority=10)
+    scheduler.submit("b0", "project_b")
+
+    # Fair share puts project_b ahead of project_a's backlog; priority orders within a project.
+    assert [scheduler.queue_position(run_id) for run_id in ("b0", "a3", "a2")] == [1, 2, 3]
+    assert reported[-1] == {"b0": 1, "a3": 2, "a2": 3}
+
+    assert scheduler.remove("a3")
+    assert scheduler.queue_position("a2") == 2
+
+    await launcher.finish("a0")
+    assert launcher.started == ["a0", "a1", "b0"]
+    await launcher.finish_all()
+
+
+@pytest.mark.asyncio
+async def test_suspended_runs_free_their_slot_and_resume_through_the_queue() -> None:
+    launcher = FakeLauncher()
+    resumed: list[str] = []
+    scheduler = RunScheduler(launch=launcher, max_running=1, max_running_per_project=5, resume=resumed.append)
+
+    scheduler.submit("a0", "project_a")
+    scheduler.submit("a1", "project_a")
+    assert scheduler.suspend("a0")
+    assert launcher.started == ["a0", "a1"]
+    assert scheduler.queue_info("a0")["state"] == "paused"
+
+    # Resuming waits for a slot and wakes the existing task instead of launching another.
+    scheduler.submit("a0", "project_a")
+    assert scheduler.queue_position("a0") == 1 and resumed == []
+    await launcher.finish("a1")
+    assert resumed == ["a0"] and launcher.started == ["a0", "a1"]
+    assert scheduler.is_running("a0")
+
+    await launcher.finish("a0")
+    assert scheduler.queue_info("a0")["state"] == "idle"
+    assert scheduler.queue_info("a0")["running"] == 0
@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+import json
+
+from backend.serialization import FastJSONResponse, dumps, loads
+
+
+def test_fast_json_round_trips_like_stdlib() -> None:
+    payload = {"jobs": [{"id": "j1", "content": "résumé ✓", "size": 3, "ratio": 0.5, "raw": None}], "ok": True}
+
+    assert loads(dumps(payload)) == payload
+    assert json.loads(FastJSONResponse(payload).body) == payload
+    assert FastJSONResponse(payload).headers["content-type"] == "application/json"
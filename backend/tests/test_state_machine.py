@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import pytest
+
+from backend.orchestrator.state_machine import STEP_DEFINITIONS, StepDefinition, topological_order
+
+
+def test_step_definitions_are_topologically_ordered() -> None:
+    ordered = [step.key for step in topological_order(STEP_DEFINITIONS)]
+    for step in STEP_DEFINITIONS:
+        assert all(ordered.index(dep) < ordered.index(step.key) for dep in step.depends_on)
+
+
+def test_topological_order_rejects_cycles() -> None:
+    steps = [
+        StepDefinition("a", 1, "A", False, ("b",)),
+        StepDefinition("b", 2, "B", False, ("a",)),
+    ]
+    with pytest.raises(ValueError, match="cycle"):
+        topological_order(steps)
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from backend.artifact_manager.manager import ArtifactManager
+from backend.codex_runner.runner import StepExecutionResult
+from backend.orchestrator.step_cache import StepCache, step_cache_key
+from backend.storage import Database
+
+
+def _spec(run_id: str, project_id: str = "FA1") -> dict:
+    return {"goal": "Complete step a", "context": {"run_id": run_id, "project_id": project_id, "step": "a"}}
+
+
+def test_step_cache_keys_ignore_run_context_but_not_inputs() -> None:
+    key = step_cache_key(_spec("run_1"), [("a", "f" * 64)], "openfars-runner/1 mock")
+    assert key == step_cache_key(_spec("run_2"), [("a", "f" * 64)], "openfars-runner/1 mock")
+    assert key != step_cache_key(_spec("run_1"), [("a", "e" * 64)], "openfars-runner/1 mock")
+    assert key != step_cache_key(_spec("run_1"), [("a", "f" * 64)], "openfars-runner/2 mock")
+    assert key != step_cache_key(_spec("run_1", "FA2"), [("a", "f" * 64)], "openfars-runner/1 mock")
+
+
+def test_step_cache_keys_change_with_any_spec_field() -> None:
+    spec = {**_spec("run_1"), "constraints": {"budget_usd": 100}, "allowed_actions": ["read"]}
+    key = step_cache_key(spec, [], "openfars-runner/1 mock")
+    for changed in (
+        {**spec, "goal": "Complete step a thoroughly"},
+        {**spec, "constraints": {"budget_usd": 50}},
+        {**spec, "allowed_actions": ["read", "write"]},
+        {**spec, "context": {**spec["context"], "step": "b"}},
+    ):
+        assert step_cache_key(changed, [], "openfars-runner/1 mock") != key
+
+
+def test_step_cache_restores_artifacts_and_drops_stale_entries(tmp_path) -> None:
+    db = Database(tmp_path / "openfars_test.db")
+    db.initialize()
+    cache = StepCache(db, ArtifactManager(db, tmp_path, tmp_path / "objects"), enabled=True, max_entries=2)
+    source_dir = tmp_path / "workspace" / "run_1" / "a"
+    source_dir.mkdir(parents=True)
+    (source_dir / "report.json").write_text("{}", encoding="utf-8")
+    result = StepExecutionResult("success", "done", [], [source_dir / "report.json"], {"tokens": 10}, False)
+
+    cache.store("k1", "a", "v1", source_dir, result)
+    hit = cache.lookup("k1", tmp_path / "workspace" / "run_2" / "a")
+    assert hit is not None and hit.summary == "done"
+    assert hit.artifacts[0].read_text(encoding="utf-8") == "{}"
+
+    # A cached artifact that changed on disk invalidates the entry.
+    (source_dir / "report.json").write_text('{"edited": true}', encoding="utf-8")
+    assert cache.lookup("k1", tmp_path / "workspace" / "run_3" / "a") is None
+    assert db.get_step_cache_entry("k1") is None
+
+    for key in ("k2", "k3", "k4"):
+        cache.store(key, "a", "v1", source_dir, StepExecutionResult("success", key, [], [], {}, False))
+    assert db.step_cache_summary()["entries"] == 2 and db.get_step_cache_entry("k2") is None
+
+    expired = StepCache(db, ArtifactManager(db, tmp_path, tmp_path / "objects"), enabled=True, ttl_seconds=1)
+    with db._writer:  # noqa: SLF001
+        db._writer.execute("UPDATE step_cache SET created_at = '2000-01-01T00:00:00+00:00'")  # noqa: SLF001
+    assert expired.lookup("k4", source_dir) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["savedTokens"]) == (1, 1, 1, 10)
+    db.close()
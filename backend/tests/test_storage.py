@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.storage import MIGRATIONS, RAW_PREVIEW_CHARS, Database, decode_job_cursor, encode_job_cursor
+
+
+def test_reader_connections_see_committed_writes_across_threads(tmp_path) -> None:
+    db = Database(tmp_path / "openfars_test.db", synchronous="normal", cache_size_kib=2048, mmap_size=0)
+    db.initialize()
+    project = db.create_project("Readers")
+    run = db.create_run(project["id"], [{"key": "a", "number": 1, "title": "A"}])
+
+    def read_status(_: int) -> str:
+        current = db.get_run(run["id"])
+        assert current is not None
+        return current["status"]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        assert set(pool.map(read_status, range(8))) == {"pending"}
+        db.update_run(run["id"], status="running")
+        assert set(pool.map(read_status, range(8))) == {"running"}
+
+    assert db.synchronous == "NORMAL"
+    db.close()
+
+
+def test_write_behind_buffer_flushes_after_max_delay_without_more_writes(tmp_path) -> None:
+    db = Database(tmp_path / "openfars_test.db", write_buffer_size=1000, write_buffer_interval=0.1)
+    db.initialize()
+    project = db.create_project("Idle")
+    run = db.create_run(project["id"], [{"key": "a", "number": 1, "title": "A"}])
+
+    db.add_job(run["id"], None, "Log", "burst", "running", "<1s", "test", "info", "")
+    db.increment_stats(run["id"], tokens=7)
+    assert db._reader().execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 0  # noqa: SLF001
+
+    # No further write arrives; the buffered rows still become visible to raw readers.
+    for _ in range(50):
+        time.sleep(0.05)
+        if db._reader().execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 1:  # noqa: SLF001
+            break
+    assert db._reader().execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 1  # noqa: SLF001
+    assert db._reader().execute("SELECT tokens FROM stats").fetchone()[0] == 7  # noqa: SLF001
+    db.close()
+
+
+def test_write_behind_buffer_coalesces_jobs_and_stats(tmp_path) -> None:
+    db = Database(tmp_path / "openfars_test.db", write_buffer_size=1000, write_buffer_interval=60)
+    db.initialize()
+    project = db.create_project("Buffered")
+    run = db.create_run(project["id"], [{"key": "a", "number": 1, "title": "A"}])
+
+    for index in range(50):
+        job = db.add_job(run["id"], None, "Log", f"line {index}", "running", "<1s", "test", "info", "")
+        assert job["content"] == f"line {index}"
+    db.increment_stats(run["id"], tokens=100, cost_usd=0.5)
+    db.increment_stats(run["id"], tokens=50, papers=2)
+
+    # Nothing has reached SQLite yet; the raw table is still empty.
+    assert db._reader().execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 0  # noqa: SLF001
+
+    # Reads flush the buffer so callers see their own writes.
+    assert len(db.list_jobs(run["id"])) == 50
+    stats = db.get_stats(run["id"])
+    assert stats is not None
+    assert stats["tokens"] == 150
+    assert stats["papers"] == 2
+    assert stats["costUsd"] == 0.5
+    db.close()
+
+
+def test_migrations_are_versioned_and_idempotent(tmp_path) -> None:
+    db = Database(tmp_path / "openfars_test.db")
+    db.initialize()
+    db.initialize()
+    assert db.schema_version() == MIGRATIONS[-1][0]
+
+    plan = db._reader().execute(  # noqa: SLF001
+        "EXPLAIN QUERY PLAN SELECT id FROM jobs WHERE run_id = ? ORDER BY created_at DESC LIMIT 200",
+        ("run_x",),
+    ).fetchall()
+    assert any("idx_jobs_run_created" in row["detail"] for row in plan)
+    db.close()
+
+
+def test_list_jobs_keyset_pagination_and_filters(tmp_path) -> None:
+    db = Database(tmp_path / "openfars_test.db")
+    db.initialize()
+    project = db.create_project("Paging")
+    run = db.create_run(project["id"], [{"key": "a", "number": 1, "title": "A"}])
+    for index in range(25):
+        level = "warning" if index % 5 == 0 else "info"
+        db.add_job(run["id"], None, "Log", f"line {index}", "running", "<1s", "test", level, "x" * 100)
+
+    first = db.list_jobs(run["id"], limit=10)
+    assert [job["content"] for job in first] == [f"line {index}" for index in range(24, 14, -1)]
+
+    cursor = decode_job_cursor(encode_job_cursor(first[-1]))
+    second = db.list_jobs(run["id"], limit=10, before=cursor, include_raw=False)
+    assert [job["content"] for job in second] == [f"line {index}" for index in range(14, 4, -1)]
+    assert "raw" not in second[0]
+
+    newer = db.list_jobs(run["id"], limit=3, after=(second[0]["createdAt"], second[0]["id"]))
+    assert [job["content"] for job in newer] == ["line 17", "line 16", "line 15"]
+
+    warnings = db.list_jobs(run["id"], level="warning")
+    assert [job["content"] for job in warnings] == ["line 20", "line 15", "line 10", "line 5", "line 0"]
+    db.close()
+
+
+def test_step_metrics_ledger_matches_stats_and_rolls_up(tmp_path) -> None:
+    db = Database(tmp_path / "openfars_test.db")
+    db.initialize()
+    project = db.create_project("Ledger")
+    runs = [db.create_run(project["id"], [{"key": "a", "number": 1, "title": "A"}]) for _ in range(2)]
+
+    for run in runs:
+        db.record_step_metrics(run["id"], None, "a", 1, tokens=100, cost_usd=0.25)
+        db.record_step_metrics(run["id"], None, "a", 2, tokens=50, papers=3)
+        db.record_step_metrics(run["id"], None, "b", 1, tokens=10)
+
+    first = runs[0]["id"]
+    assert db.get_stats(first)["tokens"] == 160
+    db.update_stats(first, tokens=0, papers=0)
+    recomputed = db.recompute_stats(first)
+    assert recomputed["tokens"] == 160
+    assert recomputed["papers"] == 3
+
+    steps = db.list_step_metrics(first)
+    assert [(item["stepKey"], item["attempts"], item["tokens"]) for item in steps] == [("a", 2, 150), ("b", 1, 10)]
+
+    totals = db.aggregate_stats(project["id"])
+    assert totals["runs"] == 2
+    assert totals["tokens"] == 320
+    assert totals["costUsd"] == 0.5
+    db.close()
+
+
+def test_batched_run_reads_match_single_run_reads(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr("backend.storage.IN_CLAUSE_CHUNK", 2)
+    db = Database(tmp_path / "openfars_test.db")
+    db.initialize()
+    project = db.create_project("Wall")
+    runs = [db.create_run(project["id"], [{"key": "a", "number": 1, "title": "A"}]) for _ in range(5)]
+    run_ids = [run["id"] for run in runs] + ["missing"]
+    db.increment_stats(runs[0]["id"], papers=3)
+
+    assert set(db.get_runs(run_ids)) == {run["id"] for run in runs}
+    steps = db.list_steps_for_runs(run_ids)
+    assert all(steps[run["id"]] == db.list_steps(run["id"]) for run in runs)
+    assert steps["missing"] == []
+    assert db.get_stats_for_runs(run_ids)[runs[0]["id"]]["papers"] == 3
+    assert db.list_artifacts_for_runs(run_ids)[runs[1]["id"]] == []
+    db.close()
+
+
+def test_project_rollups_track_latest_run_step_and_totals(tmp_path) -> None:
+    db = Database(tmp_path / "openfars_test.db")
+    db.initialize()
+    steps = [{"key": "a", "number": 1, "title": "A"}, {"key": "b", "number": 2, "title": "B"}]
+    project = db.create_project("Rollups")
+    first = db.create_run(project["id"], steps)
+    db.increment_stats(first["id"], papers=2, tokens=100)
+    second = db.create_run(project["id"], steps)
+    db.update_run(second["id"], status="running", current_step_index=1)
+    db.update_step(db.get_step_by_key(second["id"], "b")["id"], status="running")
+    db.increment_stats(second["id"], papers=1)
+    db.update_stats(first["id"], tokens=40)
+
+    (summary,) = db.list_project_summaries()
+    assert summary["runs"] == 2
+    assert summary["latestRun"]["id"] == second["id"]
+    assert summary["latestRun"]["status"] == "running"
+    assert summary["currentStep"] == {"stepKey": "b", "title": "B", "number": 2, "status": "running"}
+    totals = db.aggregate_stats(project["id"])
+    assert (summary["totals"]["papers"], summary["totals"]["tokens"]) == (totals["papers"], totals["tokens"]) == (3, 40)
+
+    # The backfill migration rebuilds the same rollup from the source tables.
+    db._writer.executescript("DROP TABLE project_rollups;" + dict(MIGRATIONS)[6])  # noqa: SLF001
+    (backfilled,) = db.list_project_summaries()
+    for key in ("runs", "latestRun", "currentStep"):
+        assert backfilled[key] == summary[key]
+    assert (backfilled["totals"]["papers"], backfilled["totals"]["tokens"]) == (3, 40)
+    db.close()
+
+
+def test_bulk_run_creation_and_updates(tmp_path) -> None:
+    db = Database(tmp_path / "openfars_test.db")
+    db.initialize()
+    steps = [{"key": "a", "number": 1, "title": "A"}, {"key": "b", "number": 2, "title": "B"}]
+    first, second = db.create_project("One"), db.create_project("Two")
+    runs = db.create_runs([first["id"], first["id"], second["id"]], steps)
+
+    assert [run["projectId"] for run in runs] == [first["id"], first["id"], second["id"]]
+    assert all(len(db.list_steps(run["id"])) == 2 for run in runs)
+    assert {summary["project"]["id"]: summary["runs"] for summary in db.list_project_summaries()} == {
+        first["id"]: 2,
+        second["id"]: 1,
+    }
+
+    db.update_runs({runs[0]["id"]: {"status": "paused"}, runs[2]["id"]: {"status": "paused"}})
+    assert db.find_run_ids(statuses=["paused"]) == [runs[0]["id"], runs[2]["id"]]
+    assert db.find_run_ids(project_id=first["id"], statuses=["paused"]) == [runs[0]["id"]]
+    assert db.find_run_ids([runs[2]["id"], "missing", runs[1]["id"]]) == [runs[2]["id"], runs[1]["id"]]
+    summaries = {summary["project"]["id"]: summary for summary in db.list_project_summaries()}
+    assert summaries[second["id"]]["latestRun"]["status"] == "paused"
+    db.close()
+
+
+def test_iter_jobs_streams_every_job_oldest_first_in_batches(tmp_path) -> None:
+    db = Database(tmp_path / "openfars_test.db", write_buffer_size=1000, write_buffer_interval=60)
+    db.initialize()
+    project = db.create_project("Export")
+    run = db.create_run(project["id"], [{"key": "a", "number": 1, "title": "A"}])
+    for index in range(25):
+        db.add_job(run["id"], None, "Job", f"line {index}", "running", "<1s", "codex", "info", "raw")
+
+    # Buffered jobs are flushed before the export snapshot is taken.
+    batches = list(db.iter_jobs(run["id"], batch_size=10, include_raw=False))
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    jobs = [job for batch in batches for job in batch]
+    assert [job["content"] for job in jobs] == [f"line {index}" for index in range(25)]
+    assert "raw" not in jobs[0]
+
+    db.append_run_events([(run["id"], seq, "step_updated", f'{{"seq":{seq}}}', "ts") for seq in (1, 2, 3)])
+    assert [seq for batch in db.iter_run_events(run["id"], batch_size=2) for seq, _ in batch] == [1, 2, 3]
+    db.close()
+
+
+def test_large_raw_payloads_move_to_deduplicated_compressed_blobs(tmp_path) -> None:
+    db = Database(tmp_path / "openfars_test.db")
+    db.initialize()
+    project = db.create_project("Blobs")
+    run = db.create_run(project["id"], [{"key": "a", "number": 1, "title": "A"}])
+    spec = '{"task": "' + "analyse " * 500 + '"}'
+
+    small = db.add_job(run["id"], None, "Job", "small", "running", "<1s", "codex", "info", "short")
+    first = db.add_job(run["id"], None, "Job", "spec", "running", "<1s", "codex", "info", spec)
+    second = db.add_job(run["id"], None, "Job", "spec again", "running", "<1s", "codex", "info", spec)
+
+    assert small["rawRef"] is None and small["raw"] == "short"
+    assert first["rawRef"] == second["rawRef"] and len(first["raw"]) == RAW_PREVIEW_CHARS
+    assert db.get_job_raw(first["id"]) == spec
+    assert db.get_job_raw(small["id"]) == "short"
+    assert db.get_job_raw("missing") is None
+    assert db.get_job(second["id"])["rawRef"] == first["rawRef"]
+
+    (count, size, stored) = db._reader().execute(  # noqa: SLF001
+        "SELECT COUNT(*), SUM(size), SUM(LENGTH(data)) FROM blobs"
+    ).fetchone()
+    assert count == 1 and size == len(spec) and stored < size / 10
+    db.close()
@@ -30,6 +30,17 @@ export async function getProjects(): Promise<Project[]> {
   return data.projects;
 }
 
+export interface ProjectSummary extends Project {
+  latestRun: Pick<Run, 'id' | 'status' | 'createdAt'> | null;
+  currentStep: { stepKey: string; title: string; number: number; status: string } | null;
+  stats: Omit<Stats, 'runId'> & { projectId: string; runs: number };
+}
+
+export async function getProjectSummaries(): Promise<ProjectSummary[]> {
+  const data = await requestJson<ApiResponse<ProjectSummary[]>>('/api/projects/summary');
+  return data.projects;
+}
+
 export async function createProject(name: string): Promise<Project> {
   const data = await requestJson<ApiResponse<Project>>('/api/projects', {
     method: 'POST',
@@ -66,6 +77,14 @@ export async function getJobs(runId: string): Promise<Job[]> {
   return data.jobs;
 }
 
+export async function getJobRaw(jobId: string): Promise<string> {
+  const response = await fetch(`${API_BASE}/api/jobs/${jobId}/raw`);
+  if (!response.ok) {
+    throw new Error(`Request failed ${response.status}: ${await response.text()}`);
+  }
+  return response.text();
+}
+
 export async function getArtifacts(runId: string): Promise<Artifact[]> {
   const data = await requestJson<ApiResponse<Artifact[]>>(`/api/runs/${runId}/artifacts`);
   return data.artifacts;
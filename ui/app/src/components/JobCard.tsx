@@ -1,7 +1,8 @@
-import { useMemo, useState } from 'react';
+import { useEffect, useMemo, useState } from 'react';
 import { motion } from 'framer-motion';
 import { ChevronDown, Clock, Copy, Monitor } from 'lucide-react';
 import type { Job } from '@/types';
+import { getJobRaw } from '@/api/client';
 import { Button } from '@/components/ui/button';
 import { PulsingDot } from './PulsingDot';
 
@@ -13,15 +14,37 @@ interface JobCardProps {
 export function JobCard({ job, index }: JobCardProps) {
   const [expanded, setExpanded] = useState(false);
   const [copied, setCopied] = useState(false);
+  const [fullRaw, setFullRaw] = useState<string | null>(null);
 
+  // Large payloads arrive as a preview and snapshots omit `raw` entirely; load the
+  // full text the first time details open.
+  const needsRaw = job.raw === undefined || Boolean(job.rawRef);
+  useEffect(() => {
+    if (!expanded || !needsRaw || fullRaw !== null) {
+      return;
+    }
+    let cancelled = false;
+    getJobRaw(job.id)
+      .then((text) => {
+        if (!cancelled) {
+          setFullRaw(text);
+        }
+      })
+      .catch(() => undefined);
+    return () => {
+      cancelled = true;
+    };
+  }, [expanded, job.id, needsRaw, fullRaw]);
+
+  const raw = fullRaw ?? job.raw ?? '';
   const formattedRaw = useMemo(() => {
     try {
-      const parsed = JSON.parse(job.raw);
+      const parsed = JSON.parse(raw);
       return JSON.stringify(parsed, null, 2);
     } catch {
-      return job.raw;
+      return raw;
     }
-  }, [job.raw]);
+  }, [raw]);
 
   const handleCopyRaw = async () => {
     try {
@@ -7,7 +7,7 @@ import {
   getArtifacts,
   getJobs,
   getLatestRun,
-  getProjects,
+  getProjectSummaries,
   getRun,
   getStats,
   getSteps,
@@ -60,6 +60,8 @@ export function useRunStore() {
   const [error, setError] = useState<string | null>(null);
 
   const wsRef = useRef<RunWebSocketClient | null>(null);
+  // Latest run id per project, from the project summaries; avoids a request per project switch.
+  const latestRunIdsRef = useRef<Map<string, string | null>>(new Map());
 
   const disconnectWebsocket = useCallback(() => {
     if (wsRef.current) {
@@ -184,24 +186,27 @@ export function useRunStore() {
 
   const loadLatestRunForProject = useCallback(
     async (projectId: string) => {
-      const nextRun = await getLatestRun(projectId);
-      if (!nextRun) {
+      const known = latestRunIdsRef.current.get(projectId);
+      const runId = known !== undefined ? known : ((await getLatestRun(projectId))?.id ?? null);
+      if (!runId) {
         clearRunState();
         return;
       }
-      await hydrateRun(nextRun.id);
+      await hydrateRun(runId);
     },
     [clearRunState, hydrateRun],
   );
 
   const reloadProjects = useCallback(async (): Promise<Project[]> => {
-    const list = await getProjects();
+    const list = await getProjectSummaries();
+    latestRunIdsRef.current = new Map(list.map((summary) => [summary.id, summary.latestRun?.id ?? null]));
     if (list.length > 0) {
       setProjects(list);
       return list;
     }
 
     const seed = await createProject('OpenFARS Demo Project');
+    latestRunIdsRef.current.set(seed.id, null);
     const seededList = [seed];
     setProjects(seededList);
     return seededList;
@@ -267,6 +272,7 @@ export function useRunStore() {
     setError(null);
     try {
       const project = await createProject(`OpenFARS-${Date.now().toString().slice(-6)}`);
+      latestRunIdsRef.current.set(project.id, null);
       setProjects((current) => [project, ...current]);
       setSelectedProjectId(project.id);
       setPaperTitle(`${project.name} - OpenFARS Autonomous Research Pipeline`);
@@ -286,6 +292,7 @@ export function useRunStore() {
     setError(null);
     try {
       const nextRun = await createRun(selectedProjectId, true);
+      latestRunIdsRef.current.set(selectedProjectId, nextRun.id);
       await hydrateRun(nextRun.id);
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Failed to start test run');
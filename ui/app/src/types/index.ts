@@ -49,7 +49,10 @@ export interface Job {
   workedFor: string;
   source: string;
   level: string;
-  raw: string;
+  // Omitted from run snapshots; JobCard fetches it via getJobRaw when details open.
+  raw?: string;
+  // Set when `raw` is only a preview; the full payload is fetched via getJobRaw.
+  rawRef?: string | null;
   createdAt: string;
 }
 
@@ -78,6 +81,7 @@ export interface Run {
   updatedAt: string;
   startedAt?: string | null;
   endedAt?: string | null;
+  stepCache?: boolean;
 }
 
 // 产物